@@ -0,0 +1,52 @@
+from typing import List, Optional
+
+from motor.motor_asyncio import AsyncIOMotorClient
+
+from app.core.config import MONGO_URL, DB_NAME
+from app.DataBase import MONGO_CLIENT_OPTIONS
+
+# ------------------- Async MongoDB (Motor) -------------------
+# Used by async routes so Mongo I/O never blocks the event loop. The client is
+# opened at startup and closed at shutdown (app/main.py); get_async_db() also
+# opens it lazily for scripts. Collection names match app/DataBase.py.
+
+DOCTORS = "doctor"
+DOCTOR_SPECIALISTS = "doctor_specialists"
+PATIENTS = "patient"
+AUDIT_REVIEWS = "audit_patient"
+PATIENT_VISITS = "patient_visits"
+OTP_CODES = "otp_codes"
+DOCTOR_DAILY_STATS = "doctor_daily_stats"
+
+_client: Optional[AsyncIOMotorClient] = None
+
+
+def connect_async_db() -> AsyncIOMotorClient:
+    global _client
+    if _client is None:
+        _client = AsyncIOMotorClient(MONGO_URL, **MONGO_CLIENT_OPTIONS)
+    return _client
+
+
+def close_async_db():
+    global _client
+    if _client is not None:
+        _client.close()
+        _client = None
+
+
+def get_async_db():
+    return connect_async_db()[DB_NAME]
+
+
+def async_col(name: str):
+    return get_async_db()[name]
+
+
+async def find_all(name: str, query: dict, projection: Optional[dict] = None,
+                   sort: Optional[list] = None) -> List[dict]:
+    """Materialize a query's results (for bounded result sets)."""
+    cursor = async_col(name).find(query, projection)
+    if sort:
+        cursor = cursor.sort(sort)
+    return await cursor.to_list(length=None)
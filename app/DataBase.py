@@ -1,7 +1,21 @@
 from pymongo import MongoClient
-from app.core.config import MONGO_URL,DB_NAME
+from app.core.config import (
+    MONGO_URL, DB_NAME, MONGO_MAX_POOL_SIZE, MONGO_MIN_POOL_SIZE, MONGO_MAX_IDLE_TIME_MS,
+    MONGO_SERVER_SELECTION_TIMEOUT_MS, MONGO_CONNECT_TIMEOUT_MS, MONGO_SOCKET_TIMEOUT_MS,
+)
 import certifi
-client = MongoClient(MONGO_URL,tlsCAFile=certifi.where())
+
+# Shared by the sync client (services, run_io) and the async client (app/AsyncDataBase.py)
+MONGO_CLIENT_OPTIONS = {
+    "tlsCAFile": certifi.where(),
+    "maxPoolSize": MONGO_MAX_POOL_SIZE,
+    "minPoolSize": MONGO_MIN_POOL_SIZE,
+    "maxIdleTimeMS": MONGO_MAX_IDLE_TIME_MS,
+    "serverSelectionTimeoutMS": MONGO_SERVER_SELECTION_TIMEOUT_MS,
+    "connectTimeoutMS": MONGO_CONNECT_TIMEOUT_MS,
+    "socketTimeoutMS": MONGO_SOCKET_TIMEOUT_MS,
+}
+client = MongoClient(MONGO_URL, **MONGO_CLIENT_OPTIONS)
 db = client[DB_NAME]
 
 
@@ -27,4 +41,10 @@ audit_review_col =db["audit_patient"]
 # clean_db()
 patient_history_col = db["patient_history"]
 patient_visits_col = db["patient_visits"]
-doctor_assignment_col = db["doctor_assignments"]
\ No newline at end of file
+doctor_assignment_col = db["doctor_assignments"]
+audio_jobs_col = db["audio_jobs"]
+transcript_cache_col = db["transcript_cache"]
+llm_cache_col = db["llm_cache"]
+llm_quota_col = db["llm_quota"]
+otp_codes_col = db["otp_codes"]
+doctor_daily_stats_col = db["doctor_daily_stats"]
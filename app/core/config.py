@@ -24,4 +24,124 @@ CLOUDINARY_API_SECRET: str = os.getenv("CLOUDINARY_API_SECRET", "")
 UPLOAD_FOLDER: str = "temp_audio"
 os.makedirs(UPLOAD_FOLDER, exist_ok=True) 
 MAX_FILE_SIZE: int = 10 * 1024 * 1024  # 10MB
-ALLOWED_AUDIO_EXTENSIONS: set = {".mp3", ".wav", ".m4a", ".webm", ".ogg"}
\ No newline at end of file
+ALLOWED_AUDIO_EXTENSIONS: set = {".mp3", ".wav", ".m4a", ".webm", ".ogg"}
+
+# Embedding cache (query strings -> vectors)
+EMBEDDING_CACHE_SIZE: int = int(os.getenv("EMBEDDING_CACHE_SIZE", "4096"))
+EMBEDDING_CACHE_DIR: str = os.getenv("EMBEDDING_CACHE_DIR", "")  # empty = no on-disk spill
+
+# Sentence embedding models (shared via app/utils/model_registry.py)
+EMBEDDING_MODEL_NAME: str = os.getenv("EMBEDDING_MODEL_NAME", "all-MiniLM-L6-v2")
+EMBEDDING_DEVICE: str = os.getenv("EMBEDDING_DEVICE", "cpu")
+EMBEDDING_NUM_THREADS: int = int(os.getenv("EMBEDDING_NUM_THREADS", "0"))  # 0 = torch default
+PRELOAD_EMBEDDING_MODEL: bool = os.getenv("PRELOAD_EMBEDDING_MODEL", "true").lower() == "true"
+
+
+# Batch triage: patients packed into a single LLM prompt
+TRIAGE_BATCH_SIZE: int = int(os.getenv("TRIAGE_BATCH_SIZE", "20"))
+TRIAGE_MAX_PATIENTS: int = int(os.getenv("TRIAGE_MAX_PATIENTS", "500"))
+
+# Audio pipeline concurrency
+AUDIO_PROCESS_WORKERS: int = int(os.getenv("AUDIO_PROCESS_WORKERS", "2"))
+IO_THREAD_WORKERS: int = int(os.getenv("IO_THREAD_WORKERS", "16"))
+MAX_CONCURRENT_TRANSCRIPTIONS: int = int(os.getenv("MAX_CONCURRENT_TRANSCRIPTIONS", "2"))
+
+# Audio analysis job queue (POST /patient/audio_jobs)
+AUDIO_JOB_WORKERS: int = int(os.getenv("AUDIO_JOB_WORKERS", "2"))
+AUDIO_JOB_QUEUE_SIZE: int = int(os.getenv("AUDIO_JOB_QUEUE_SIZE", "100"))
+AUDIO_JOB_STALE_SECONDS: int = int(os.getenv("AUDIO_JOB_STALE_SECONDS", "1800"))  # no update for this long = interrupted
+AUDIO_JOB_WS_MAX_SECONDS: int = int(os.getenv("AUDIO_JOB_WS_MAX_SECONDS", "1800"))  # job WebSocket lifetime cap
+
+# Per-request audio working directories (empty = /dev/shm when available, else UPLOAD_FOLDER)
+AUDIO_WORK_ROOT: str = os.getenv("AUDIO_WORK_ROOT", "")
+
+# Decode/denoise audio in memory and feed Whisper a NumPy buffer (no intermediate WAVs)
+AUDIO_IN_MEMORY_PIPELINE: bool = os.getenv("AUDIO_IN_MEMORY_PIPELINE", "true").lower() == "true"
+
+# Whisper transcription engine (faster-whisper / CTranslate2)
+WHISPER_MODEL_SIZE: str = os.getenv("WHISPER_MODEL_SIZE", "small")
+WHISPER_DEVICE: str = os.getenv("WHISPER_DEVICE", "cpu")
+WHISPER_COMPUTE_TYPE: str = os.getenv("WHISPER_COMPUTE_TYPE", "int8")  # int8 | int8_float32 | float32 ...
+WHISPER_CPU_THREADS: int = int(os.getenv("WHISPER_CPU_THREADS", "0"))  # 0 = CTranslate2 default
+WHISPER_NUM_WORKERS: int = int(os.getenv("WHISPER_NUM_WORKERS", str(MAX_CONCURRENT_TRANSCRIPTIONS)))
+WHISPER_BEAM_SIZE: int = int(os.getenv("WHISPER_BEAM_SIZE", "5"))
+WHISPER_VAD_FILTER: bool = os.getenv("WHISPER_VAD_FILTER", "true").lower() == "true"
+WHISPER_LANGUAGE: str = os.getenv("WHISPER_LANGUAGE", "")  # empty = auto-detect
+WHISPER_WARMUP: bool = os.getenv("WHISPER_WARMUP", "true").lower() == "true"
+
+# Streaming transcription (WebSocket /patient/audio_ws)
+STREAM_MIN_CHUNK_SECONDS: float = float(os.getenv("STREAM_MIN_CHUNK_SECONDS", "1.0"))
+STREAM_MAX_CHUNK_SECONDS: float = float(os.getenv("STREAM_MAX_CHUNK_SECONDS", "5.0"))
+STREAM_MAX_SESSION_SECONDS: float = float(os.getenv("STREAM_MAX_SESSION_SECONDS", "600"))
+
+# Content-addressed transcript cache (duplicate uploads skip Whisper + Gemini)
+TRANSCRIPT_CACHE_ENABLED: bool = os.getenv("TRANSCRIPT_CACHE_ENABLED", "true").lower() == "true"
+TRANSCRIPT_CACHE_TTL_SECONDS: int = int(os.getenv("TRANSCRIPT_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+TRANSCRIPT_PIPELINE_VERSION: str = os.getenv("TRANSCRIPT_PIPELINE_VERSION", "1")  # bump to invalidate
+
+# LLM response cache (call_gemini_api_async)
+LLM_CACHE_ENABLED: bool = os.getenv("LLM_CACHE_ENABLED", "true").lower() == "true"
+LLM_CACHE_SIZE: int = int(os.getenv("LLM_CACHE_SIZE", "2048"))
+LLM_CACHE_BACKEND: str = os.getenv("LLM_CACHE_BACKEND", "memory")  # memory | mongo (memory LRU in front)
+LLM_CACHE_DEFAULT_TTL: int = int(os.getenv("LLM_CACHE_DEFAULT_TTL", "3600"))
+
+# Async Gemini client (REST, pooled connections)
+GEMINI_API_BASE_URL: str = os.getenv("GEMINI_API_BASE_URL", "https://generativelanguage.googleapis.com")  # point at a stub server in tests
+LLM_TIMEOUT_SECONDS: float = float(os.getenv("LLM_TIMEOUT_SECONDS", "30"))
+LLM_MAX_RETRIES: int = int(os.getenv("LLM_MAX_RETRIES", "3"))
+LLM_BACKOFF_BASE_SECONDS: float = float(os.getenv("LLM_BACKOFF_BASE_SECONDS", "0.5"))
+LLM_BACKOFF_MAX_SECONDS: float = float(os.getenv("LLM_BACKOFF_MAX_SECONDS", "8"))
+LLM_MAX_CONCURRENCY: int = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+
+# LLM quota router (shared per-model RPM/RPD budget)
+LLM_QUOTA_BACKEND: str = os.getenv("LLM_QUOTA_BACKEND", "mongo")  # mongo | memory
+LLM_QUOTA_TIMEZONE: str = os.getenv("LLM_QUOTA_TIMEZONE", "America/Los_Angeles")  # Gemini daily quotas reset at Pacific midnight
+LLM_UTILIZATION_RATIO: float = float(os.getenv("LLM_UTILIZATION_RATIO", "0.8"))
+
+# LLM request hedging (second model fired when the primary is slow)
+LLM_HEDGE_ENABLED: bool = os.getenv("LLM_HEDGE_ENABLED", "false").lower() == "true"
+LLM_HEDGE_CALL_SITES: list = [s.strip() for s in os.getenv("LLM_HEDGE_CALL_SITES", "extract_context,risk_analysis,extract_and_triage").split(",") if s.strip()]
+LLM_HEDGE_PERCENTILE: float = float(os.getenv("LLM_HEDGE_PERCENTILE", "95"))
+LLM_HEDGE_MIN_SAMPLES: int = int(os.getenv("LLM_HEDGE_MIN_SAMPLES", "20"))
+LLM_HEDGE_DEFAULT_DELAY_SECONDS: float = float(os.getenv("LLM_HEDGE_DEFAULT_DELAY_SECONDS", "4"))  # until enough samples
+LLM_HEDGE_MIN_DELAY_SECONDS: float = float(os.getenv("LLM_HEDGE_MIN_DELAY_SECONDS", "0.5"))
+
+# Audio triage: one fused extract+triage LLM call instead of two sequential calls
+AUDIO_FUSED_TRIAGE: bool = os.getenv("AUDIO_FUSED_TRIAGE", "false").lower() == "true"
+
+# Local speaker separation (skips the extract_context LLM call when confident)
+LOCAL_SPEAKER_SEPARATION: bool = os.getenv("LOCAL_SPEAKER_SEPARATION", "true").lower() == "true"
+LOCAL_SPEAKER_MIN_CONFIDENCE: float = float(os.getenv("LOCAL_SPEAKER_MIN_CONFIDENCE", "0.9"))
+LOCAL_SPEAKER_CLASSIFIER: bool = os.getenv("LOCAL_SPEAKER_CLASSIFIER", "false").lower() == "true"
+LOCAL_SPEAKER_CLASSIFIER_CSV: str = os.getenv(
+    "LOCAL_SPEAKER_CLASSIFIER_CSV",
+    os.path.join("app", "vector_database", "MTS-Dialog-Augmented-TrainingSet-1-En-FR-EN-2402-Pairs.csv"),
+)
+
+# Patient knowledge base (versioned on-disk FAISS layout, see app/vector_database/kb_store.py)
+KB_DIR: str = os.getenv("KB_DIR", "patient_kb")
+KB_LEGACY_PICKLE: str = os.getenv("KB_LEGACY_PICKLE", "patient_kb.pkl")  # migrated on first load
+KB_VERIFY_CHECKSUM: bool = os.getenv("KB_VERIFY_CHECKSUM", "false").lower() == "true"
+
+# Patient KB index type and search knobs (see app/vector_database/kb_index.py)
+KB_INDEX_TYPE: str = os.getenv("KB_INDEX_TYPE", "auto")  # auto | flat | ivf_flat | ivf_pq | hnsw
+KB_NPROBE: int = int(os.getenv("KB_NPROBE", "16"))  # IVF lists scanned per query
+KB_EF_SEARCH: int = int(os.getenv("KB_EF_SEARCH", "64"))  # HNSW candidate list size
+
+# MongoDB connection pool (sync client and async Motor client)
+MONGO_MAX_POOL_SIZE: int = int(os.getenv("MONGO_MAX_POOL_SIZE", "100"))
+MONGO_MIN_POOL_SIZE: int = int(os.getenv("MONGO_MIN_POOL_SIZE", "0"))
+MONGO_MAX_IDLE_TIME_MS: int = int(os.getenv("MONGO_MAX_IDLE_TIME_MS", "60000"))
+MONGO_SERVER_SELECTION_TIMEOUT_MS: int = int(os.getenv("MONGO_SERVER_SELECTION_TIMEOUT_MS", "5000"))
+MONGO_CONNECT_TIMEOUT_MS: int = int(os.getenv("MONGO_CONNECT_TIMEOUT_MS", "5000"))
+MONGO_SOCKET_TIMEOUT_MS: int = int(os.getenv("MONGO_SOCKET_TIMEOUT_MS", "20000"))
+
+# Mongo index management (app/db_indexes.py) and OTP expiry
+DB_ENSURE_INDEXES_ON_STARTUP: bool = os.getenv("DB_ENSURE_INDEXES_ON_STARTUP", "true").lower() == "true"
+OTP_TTL_SECONDS: int = int(os.getenv("OTP_TTL_SECONDS", "600"))
+AUDIO_JOB_TTL_SECONDS: int = int(os.getenv("AUDIO_JOB_TTL_SECONDS", str(7 * 24 * 3600)))
+
+# Doctor analytics (GET /doctor/analytics, doctor_daily_stats rollup)
+DOCTOR_ANALYTICS_DEFAULT_DAYS: int = int(os.getenv("DOCTOR_ANALYTICS_DEFAULT_DAYS", "30"))
+DOCTOR_ANALYTICS_MAX_DAYS: int = int(os.getenv("DOCTOR_ANALYTICS_MAX_DAYS", "366"))
+DOCTOR_ANALYTICS_TOP_DISEASES: int = int(os.getenv("DOCTOR_ANALYTICS_TOP_DISEASES", "20"))
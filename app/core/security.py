@@ -1,14 +1,18 @@
 from jose import jwt, JWTError
 from fastapi import WebSocket
-from app.core.config import SECRET_KEY
+from app.core.config import SECRET_KEY, ALGORITHM
 
 def verify_token(token: str):
     """
     Validate JWT token and extract payload.
     """
+    if token and token.startswith("Bearer "):
+        token = token.split(" ")[1]
+
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=["HS256"])
-        patient_id = payload.get("patient_id")
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        # Login tokens carry user_id; older patient tokens carried patient_id
+        patient_id = payload.get("patient_id") or payload.get("user_id")
 
         if not patient_id:
             raise ValueError("Missing patient_id in token")
@@ -16,3 +20,15 @@ def verify_token(token: str):
 
     except JWTError:
         raise ValueError("Invalid or expired JWT")
+
+
+async def verify_websocket_token(websocket: WebSocket, token: str):
+    """
+    Validate the JWT passed to a WebSocket endpoint.
+    Closes the socket with 1008 (policy violation) and returns None when invalid.
+    """
+    try:
+        return verify_token(token)
+    except ValueError:
+        await websocket.close(code=1008)
+        return None
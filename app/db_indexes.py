@@ -0,0 +1,217 @@
+"""
+Idempotent MongoDB index management and startup migrations.
+
+Runs at startup (DB_ENSURE_INDEXES_ON_STARTUP) and from the CLI:
+
+    python -m app.db_indexes            # ensure indexes + run migrations
+    python -m app.db_indexes --check    # explain hot queries, fail on COLLSCAN
+    python -m app.db_indexes --rebuild-doctor-stats   # recompute closed days of doctor_daily_stats
+"""
+import argparse
+import sys
+from datetime import datetime, timedelta
+
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from pymongo.errors import OperationFailure
+
+from app.DataBase import (
+    db, doctors_col, doctor_specialists_col, patients_col, audit_review_col, patient_visits_col,
+    doctor_assignment_col, audio_jobs_col, transcript_cache_col, llm_cache_col, llm_quota_col, otp_codes_col,
+    doctor_daily_stats_col,
+)
+from app.services.doctor_stats import backfill_doctor_stats
+from app.core.config import TRANSCRIPT_CACHE_TTL_SECONDS, OTP_TTL_SECONDS, AUDIO_JOB_TTL_SECONDS
+
+# ------------------- Index Declarations -------------------
+INDEXES = {
+    doctors_col: [
+        IndexModel([("email", ASCENDING)], name="email_unique", unique=True),
+    ],
+    patients_col: [
+        IndexModel([("email", ASCENDING)], name="email_unique", unique=True),
+        IndexModel([("created_at", DESCENDING), ("_id", DESCENDING)], name="created_at"),
+    ],
+    doctor_specialists_col: [
+        IndexModel([("specialist", ASCENDING)], name="specialist"),
+        IndexModel([("doctor_id", ASCENDING)], name="doctor_id"),
+    ],
+    audit_review_col: [
+        # Trailing _id: keyset pages sort on (created_at, _id) without an in-memory sort
+        IndexModel([("alert.doctor_id", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)],
+                   name="doctor_created_at"),
+        IndexModel([("patient_id", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)],
+                   name="patient_created_at"),
+        IndexModel([("urgency", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)],
+                   name="urgency_created_at"),
+        IndexModel([("created_at", DESCENDING), ("_id", DESCENDING)], name="created_at"),
+    ],
+    patient_visits_col: [
+        IndexModel([("doctor_assigned", ASCENDING), ("visit_date", DESCENDING)], name="doctor_visit_date"),
+        IndexModel([("patient_id", ASCENDING), ("visit_date", DESCENDING)], name="patient_visit_date"),
+        IndexModel([("doctor_assigned", ASCENDING), ("_id", DESCENDING)], name="doctor_id_desc"),
+    ],
+    doctor_assignment_col: [
+        IndexModel([("doctor_id", ASCENDING)], name="doctor_id"),
+    ],
+    audio_jobs_col: [
+        IndexModel([("job_id", ASCENDING)], name="job_id_unique", unique=True),
+        IndexModel([("created_at", ASCENDING)], name="created_at_ttl", expireAfterSeconds=AUDIO_JOB_TTL_SECONDS),
+    ],
+    # TTL indexes: cache/quota documents carry their own expires_at
+    transcript_cache_col: [
+        IndexModel([("created_at", ASCENDING)], name="created_at_ttl", expireAfterSeconds=TRANSCRIPT_CACHE_TTL_SECONDS),
+    ],
+    llm_cache_col: [
+        IndexModel([("expires_at", ASCENDING)], name="expires_at_ttl", expireAfterSeconds=0),
+    ],
+    llm_quota_col: [
+        IndexModel([("expires_at", ASCENDING)], name="expires_at_ttl", expireAfterSeconds=0),
+    ],
+    otp_codes_col: [
+        IndexModel([("expires_at", ASCENDING)], name="expires_at_ttl", expireAfterSeconds=0),
+    ],
+    doctor_daily_stats_col: [
+        IndexModel([("doctor_id", ASCENDING), ("day", ASCENDING)], name="doctor_day"),
+    ],
+}
+
+# (collection, filter, sort) for every hot query; --check asserts none is a COLLSCAN
+HOT_QUERIES = [
+    (doctors_col, {"email": "probe@example.com"}, None),
+    (patients_col, {"email": "probe@example.com"}, None),
+    (doctor_specialists_col, {"specialist": "probe"}, None),
+    (doctor_specialists_col, {"doctor_id": "probe"}, None),
+    (patient_visits_col, {"patient_id": "probe"}, None),
+    (patient_visits_col, {"doctor_assigned": "probe"}, None),
+    (audit_review_col, {"alert.doctor_id": "probe"}, [("created_at", DESCENDING)]),
+    (audit_review_col, {"patient_id": "probe"}, [("created_at", DESCENDING)]),
+    (audit_review_col, {"urgency": "high"}, [("created_at", DESCENDING)]),
+    (audio_jobs_col, {"job_id": "probe"}, None),
+    (doctor_daily_stats_col, {"doctor_id": "probe", "day": {"$gte": datetime(2000, 1, 1)}}, None),
+]
+
+# Index-option conflict codes: same keys/name, different options
+INDEX_CONFLICT_CODES = {85, 86}
+# Same name, different key pattern (e.g. a declaration that gained a trailing _id)
+INDEX_KEY_SPECS_CONFLICT = 86
+
+
+# ------------------- Ensure -------------------
+def _update_ttl(col, model: IndexModel):
+    """Existing TTL index with a different expireAfterSeconds: change it in place."""
+    doc = model.document
+    db.command("collMod", col.name, index={"keyPattern": dict(doc["key"]),
+                                          "expireAfterSeconds": doc["expireAfterSeconds"]})
+    print(f"Updated TTL of {col.name}.{doc['name']} to {doc['expireAfterSeconds']}s")
+
+
+def _rebuild_index(col, model: IndexModel):
+    """Existing index under this name has other keys: drop it and build the declared one."""
+    doc = model.document
+    try:
+        col.drop_index(doc["name"])
+    except OperationFailure as e:
+        # IndexNotFound: another worker dropped it first
+        if e.code != 27:
+            raise
+    col.create_indexes([model])
+    print(f"Rebuilt index {col.name}.{doc['name']} with keys {dict(doc['key'])}")
+
+
+def ensure_indexes() -> dict:
+    """Create missing indexes. Safe to run repeatedly. Returns {collection: [index names]}."""
+    report = {}
+    for col, models in INDEXES.items():
+        existing = col.index_information()
+        for model in models:
+            doc = model.document
+            try:
+                col.create_indexes([model])
+            except OperationFailure as e:
+                if e.code in INDEX_CONFLICT_CODES and "expireAfterSeconds" in doc:
+                    _update_ttl(col, model)
+                elif e.code == INDEX_KEY_SPECS_CONFLICT and not doc.get("unique"):
+                    # Plain index: safe to rebuild (a unique one could fail on existing data)
+                    _rebuild_index(col, model)
+                elif e.code == 11000:
+                    # Unique index over existing duplicates: report, keep serving
+                    print(f"Cannot create unique index {col.name}.{doc['name']}: duplicate values exist")
+                    continue
+                elif e.code in INDEX_CONFLICT_CODES:
+                    print(f"Index {col.name}.{doc['name']} conflicts with an existing index: {e}")
+                    continue
+                else:
+                    raise
+            if doc["name"] not in existing:
+                print(f"Created index {col.name}.{doc['name']}")
+            report.setdefault(col.name, []).append(doc["name"])
+    return report
+
+
+# ------------------- Migrations -------------------
+def migrate_user_otps() -> int:
+    """Move pending OTPs from user documents into otp_codes (TTL-expired)."""
+    moved = 0
+    expires_at = datetime.utcnow() + timedelta(seconds=OTP_TTL_SECONDS)
+    for col, role in ((doctors_col, "doctor"), (patients_col, "patient")):
+        for user in col.find({"otp": {"$nin": [None, ""]}}, {"email": 1, "otp": 1}):
+            otp_codes_col.update_one(
+                {"_id": f"{role}:{user['email']}"},
+                {"$setOnInsert": {"email": user["email"], "role": role, "otp": str(user["otp"]),
+                                  "expires_at": expires_at}},
+                upsert=True,
+            )
+            moved += 1
+        col.update_many({"otp": {"$exists": True}}, {"$unset": {"otp": ""}})
+    if moved:
+        print(f"Moved {moved} pending OTPs to otp_codes")
+    return moved
+
+
+def run_migrations():
+    ensure_indexes()
+    migrate_user_otps()
+
+
+# ------------------- Explain Check -------------------
+def _plan_stages(plan: dict):
+    yield plan.get("stage")
+    for key in ("inputStage", "queryPlan"):
+        if key in plan:
+            yield from _plan_stages(plan[key])
+    for child in plan.get("inputStages", []):
+        yield from _plan_stages(child)
+
+
+def check_hot_queries() -> list:
+    """Returns [(collection, filter, stages)] for hot queries whose winning plan scans the collection."""
+    failures = []
+    for col, query, sort in HOT_QUERIES:
+        cursor = col.find(query).limit(1)
+        if sort:
+            cursor = cursor.sort(sort)
+        winning = cursor.explain()["queryPlanner"]["winningPlan"]
+        stages = list(_plan_stages(winning))
+        status = "COLLSCAN" if "COLLSCAN" in stages else "ok"
+        print(f"{status:<9} {col.name}: {query} sort={sort} -> {' <- '.join(s for s in stages if s)}")
+        if status != "ok":
+            failures.append((col.name, query, stages))
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--check", action="store_true", help="explain hot queries; exit 1 on COLLSCAN")
+    parser.add_argument("--rebuild-doctor-stats", action="store_true",
+                        help="recompute the doctor_daily_stats rollup from audit_patient")
+    args = parser.parse_args()
+
+    run_migrations()
+    if args.rebuild_doctor_stats:
+        backfill_doctor_stats()
+    if args.check and check_hot_queries():
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
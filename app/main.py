@@ -10,6 +10,16 @@ from app.routes.doctor_dashboard import router as doctor_dashboard_router
 from app.routes.doctor_dashboard import router as doctor_dashboard_router
 from app.routes.patient_dashboard import router as patient_dashboard_router
 from app.routes.admin_dashboard import router as admin_dashboard_router
+from app.services.matcher import build_specialist_index
+from app.utils.model_registry import preload_models
+from app.core.config import PRELOAD_EMBEDDING_MODEL, WHISPER_WARMUP
+from app.utils.audio_transcribe import warmup_whisper
+from app.utils.executors import shutdown_executors
+from app.services.audio_jobs import start_job_workers, stop_job_workers
+from app.utils.llm_client import close_llm_client
+from app.AsyncDataBase import connect_async_db, close_async_db
+from app.db_indexes import run_migrations
+from app.core.config import DB_ENSURE_INDEXES_ON_STARTUP
 
 app = FastAPI(title="HomeCare Hospital API")
 
@@ -27,6 +37,41 @@ app.include_router(doctor_dashboard_router)
 app.include_router(patient_dashboard_router)
 app.include_router(admin_dashboard_router)
 
+# ------------------- Startup -------------------
+@app.on_event("startup")
+def ensure_db_indexes():
+    # Idempotent: creates missing indexes, moves pending OTPs to otp_codes
+    if DB_ENSURE_INDEXES_ON_STARTUP:
+        run_migrations()
+
+@app.on_event("startup")
+def warm_specialist_index():
+    if PRELOAD_EMBEDDING_MODEL:
+        preload_models()
+    # Encode every specialist once so matching is a single matrix-vector product
+    build_specialist_index()
+
+@app.on_event("startup")
+def warm_whisper():
+    if WHISPER_WARMUP:
+        warmup_whisper()
+
+@app.on_event("startup")
+async def open_async_db():
+    # Created inside the running loop; pool settings in app/DataBase.py
+    connect_async_db()
+
+@app.on_event("startup")
+async def start_audio_job_workers():
+    await start_job_workers()
+
+@app.on_event("shutdown")
+async def stop_worker_pools():
+    await stop_job_workers()
+    await close_llm_client()
+    close_async_db()
+    shutdown_executors()
+
 # ✅ Root GET route
 @app.get("/")
 def root():
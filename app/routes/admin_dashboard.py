@@ -1,28 +1,194 @@
-from fastapi import APIRouter
-from app.DataBase import patients_col, patient_visits_col, audit_review_col
+from datetime import datetime
+from typing import Optional
+from bson import ObjectId
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from app.AsyncDataBase import async_col, AUDIT_REVIEWS, PATIENTS, PATIENT_VISITS
+from app.utils.pagination import fetch_page, parse_fields, MAX_PAGE_SIZE
+from app.utils.export import ndjson_stream, csv_stream, gzip_stream
+from app.utils.embedding_cache import cache_stats
+from app.utils.model_registry import loaded_models
+from app.utils.audio_transcribe import get_transcription_metrics
+from app.services.transcript_cache import transcript_cache_stats
+from app.utils.llm_cache import llm_cache_stats
+from app.utils.model_router import router as model_router, CALL_CLASS_MODELS
+from app.utils.llm_hedge import hedge_stats
+from app.utils.speaker_separation import separation_stats
+from app.utils.executors import run_io
+from app.services.text_profilling import Risk_Analysis_Batch
+from app.schemas.medical_schemas import TriageBatchRequest
+from app.core.config import TRIAGE_MAX_PATIENTS
 
 router = APIRouter(prefix="/admin", tags=["AdminDashboard"])
 
+# ------------------- Paginated Lists -------------------
+# ?limit=&cursor= (keyset, newest first), ?fields=a,b for a projection,
+# filters pushed down to Mongo; pass next_cursor back to get the next page.
+AUDIT_FIELDS = {"patient_id", "patient_name", "patient_email", "voice_url", "transcript", "keywords",
+                "detected_disease", "visit_reason", "consultation_type", "alert", "urgency", "created_at"}
+PATIENT_FIELDS = {"name", "email", "phone", "role", "age", "gender", "symptoms", "is_verified", "created_at"}
+PATIENT_SENSITIVE = {"password": 0, "confirm_password": 0, "otp": 0}
+VISIT_FIELDS = {"patient_id", "patient_email", "visit_date", "visit_reason", "consultation_type",
+                "symptoms_reported", "diagnosis_given", "doctor_assigned", "status"}
+
+
+def _date_range(field: str, date_from: Optional[datetime], date_to: Optional[datetime]) -> dict:
+    bounds = {}
+    if date_from:
+        bounds["$gte"] = ObjectId.from_datetime(date_from) if field == "_id" else date_from
+    if date_to:
+        bounds["$lt"] = ObjectId.from_datetime(date_to) if field == "_id" else date_to
+    return {field: bounds} if bounds else {}
+
+
 @router.get("/audit-reviews")
-async def get_all_audit_reviews():
+async def get_all_audit_reviews(
+    limit: int = Query(50, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    urgency: Optional[str] = None,
+    doctor_id: Optional[str] = None,
+):
     """
-    Returns all audit review logs for admin.
+    Returns audit review logs for admin, newest first, one page at a time.
     """
-    audits = list(audit_review_col.find({}, {"_id": 0}))
-    return {"total_audits": len(audits), "audits": audits}
+    query = _date_range("created_at", date_from, date_to)
+    if urgency:
+        query["urgency"] = urgency.lower()
+    if doctor_id:
+        query["alert.doctor_id"] = doctor_id
+
+    page = await fetch_page(async_col(AUDIT_REVIEWS), query, "created_at", limit, cursor,
+                            parse_fields(fields, AUDIT_FIELDS))
+    return {"total_audits": page["total"], "audits": page["items"], "next_cursor": page["next_cursor"]}
 
 @router.get("/patients")
-async def get_all_patients():
+async def get_all_patients(
+    limit: int = Query(50, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+):
     """
-    Returns all patients without sensitive data.
+    Returns patients without sensitive data, newest first, one page at a time.
     """
-    patients = list(patients_col.find({}, {"_id": 0, "password": 0, "confirm_password": 0, "otp": 0}))
-    return {"total_patients": len(patients), "patients": patients}
+    query = _date_range("created_at", date_from, date_to)
+    page = await fetch_page(async_col(PATIENTS), query, "created_at", limit, cursor,
+                            parse_fields(fields, PATIENT_FIELDS), exclude=PATIENT_SENSITIVE)
+    return {"total_patients": page["total"], "patients": page["items"], "next_cursor": page["next_cursor"]}
 
 @router.get("/patient-visits")
-async def get_all_patient_visits():
+async def get_all_patient_visits(
+    limit: int = Query(50, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    doctor_id: Optional[str] = None,
+):
+    """
+    Returns patient visits for admin monitoring, newest first, one page at a time.
+    Visits carry no created_at, so order and date filters use the _id timestamp.
+    """
+    query = _date_range("_id", date_from, date_to)
+    if doctor_id:
+        query["doctor_assigned"] = doctor_id
+
+    page = await fetch_page(async_col(PATIENT_VISITS), query, "_id", limit, cursor,
+                            parse_fields(fields, VISIT_FIELDS))
+    return {"total_visits": page["total"], "visits": page["items"], "next_cursor": page["next_cursor"]}
+
+# ------------------- Streaming Export -------------------
+EXPORT_DATASETS = {
+    "audit-reviews": {
+        "collection": AUDIT_REVIEWS,
+        "date_field": "created_at",
+        "columns": ["patient_id", "patient_name", "patient_email", "voice_url", "transcript", "keywords",
+                    "detected_disease", "visit_reason", "consultation_type", "urgency", "alert.doctor_id",
+                    "alert.specialist", "alert.sent", "alert.method", "alert.timestamp", "created_at"],
+    },
+    "patient-visits": {
+        "collection": PATIENT_VISITS,
+        "date_field": "_id",
+        "columns": ["patient_id", "patient_email", "visit_date", "visit_reason", "consultation_type",
+                    "symptoms_reported", "diagnosis_given", "doctor_assigned", "status"],
+    },
+}
+
+
+@router.get("/export/{dataset}")
+async def export_dataset(
+    dataset: str,
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    batch_size: int = Query(500, ge=1, le=10000),
+    gzip: bool = False,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+):
+    """
+    Full dump of audit-reviews or patient-visits as NDJSON or CSV, streamed
+    from a Mongo cursor (constant memory); optional gzip and date range.
     """
-    Returns all patient visits for admin monitoring.
+    spec = EXPORT_DATASETS.get(dataset)
+    if spec is None:
+        raise HTTPException(status_code=404, detail=f"Unknown dataset: {dataset}")
+
+    query = _date_range(spec["date_field"], date_from, date_to)
+    # Order on the filtered field (+ _id) so its index serves both: no blocking SORT mid-stream
+    sort = [("_id", 1)] if spec["date_field"] == "_id" else [(spec["date_field"], 1), ("_id", 1)]
+    cursor = async_col(spec["collection"]).find(query, {"_id": 0}, batch_size=batch_size).sort(sort)
+
+    if format == "csv":
+        body, media_type = csv_stream(cursor, spec["columns"], batch_size), "text/csv"
+    else:
+        body, media_type = ndjson_stream(cursor, batch_size), "application/x-ndjson"
+
+    filename = f"{dataset}-{datetime.utcnow():%Y%m%dT%H%M%S}.{format}"
+    if gzip:
+        body, media_type, filename = gzip_stream(body), "application/gzip", filename + ".gz"
+
+    return StreamingResponse(body, media_type=media_type,
+                             headers={"Content-Disposition": f'attachment; filename="{filename}"'})
+
+@router.get("/metrics")
+async def get_metrics():
+    """
+    Returns in-process performance counters (caches, model usage).
     """
-    visits = list(patient_visits_col.find({}, {"_id": 0}))
-    return {"total_visits": len(visits), "visits": visits}
\ No newline at end of file
+    return {
+        "embedding_cache": cache_stats(),
+        "embedding_models": loaded_models(),
+        "transcription": get_transcription_metrics(),
+        "transcript_cache": transcript_cache_stats(),
+        "llm_cache": llm_cache_stats(),
+        "llm_quota": await run_io(model_router.stats),
+        "llm_hedging": hedge_stats(),
+        "speaker_separation": separation_stats(),
+    }
+
+
+@router.post("/triage-batch")
+async def triage_batch(data: TriageBatchRequest):
+    """
+    Triage a backlog of patient descriptions in batched LLM calls.
+    """
+    if not data.patients:
+        raise HTTPException(status_code=400, detail="No patients supplied")
+    if len(data.patients) > TRIAGE_MAX_PATIENTS:
+        raise HTTPException(status_code=413, detail=f"At most {TRIAGE_MAX_PATIENTS} patients per request")
+    batch_models = CALL_CLASS_MODELS["risk_analysis_batch"]
+    if data.model_preference and data.model_preference not in batch_models:
+        raise HTTPException(status_code=400,
+                            detail=f"model_preference must be one of: {', '.join(batch_models)}")
+
+    patients = [p.dict() for p in data.patients]
+    analyses = await Risk_Analysis_Batch(patients, data.model_preference)
+
+    results = [
+        {"patient_index": idx, "patient_id": patient.get("patient_id"), "analysis": analysis}
+        for idx, (patient, analysis) in enumerate(zip(patients, analyses))
+    ]
+    return {"total_patients": len(results), "results": results}
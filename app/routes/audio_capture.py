@@ -1,19 +1,27 @@
-from fastapi import APIRouter, UploadFile, File, Query, HTTPException
+from fastapi import APIRouter, UploadFile, File, Query, HTTPException, WebSocket, WebSocketDisconnect
 from datetime import datetime
 from bson import ObjectId
-import uuid, os
-
-from app.DataBase import patients_col, audit_review_col
-from app.services.auth_service import get_doctor_info_by_id, get_user_info_by_token, get_patient_info_by_id
-from app.utils.voice_upload import upload_file
-from app.services.text_profilling import Risk_Analysis
-from app.services.email_service import send_Alert_message_doctor
-from app.services.pateint_context_from_audio import get_patient_context_from_audio
-from app.schemas.audit_schemas import AuditReview, AlertInfo
-from app.core.config import UPLOAD_FOLDER
+import asyncio, uuid, os, time
+
+from app.services.auth_service import get_user_info_by_token, get_patient_info_by_id_async
+from app.services.audio_pipeline import run_audio_pipeline
+from app.services.audio_jobs import submit_job, get_job, subscribe, unsubscribe, TERMINAL_STATUSES
+from app.core.security import verify_websocket_token
+from app.utils.executors import run_io, run_transcription
+from app.utils.stream_transcribe import StreamingTranscriber, make_decoder, PCM_FORMATS
+from app.services.Seperate_pateint_context import extract_patient_context_from_transcript
+from app.core.config import STREAM_MAX_SESSION_SECONDS, AUDIO_JOB_WS_MAX_SECONDS
+from app.utils.workspace import request_workspace, create_workspace, remove_workspace
 
 audio_router = APIRouter()
 
+JOB_WS_POLL_SECONDS = 2.0
+
+
+def _write_file(path: str, data: bytes):
+    with open(path, "wb") as f:
+        f.write(data)
+
 @audio_router.post("/audio_stream")
 async def audio_stream(token: str = Query(...), voice_file: UploadFile = File(...)):
     """
@@ -25,7 +33,7 @@ async def audio_stream(token: str = Query(...), voice_file: UploadFile = File(..
     # 🔹 Step 1: Validate token & Get Patient Data
     # -----------------------------------------------------------
     try:
-        patient_id = get_user_info_by_token(token)
+        patient_id = await run_io(get_user_info_by_token, token)
         print("Patient ID:", patient_id)
     except HTTPException as e:
         raise HTTPException(status_code=e.status_code, detail=e.detail)
@@ -33,132 +41,185 @@ async def audio_stream(token: str = Query(...), voice_file: UploadFile = File(..
     if not patient_id:
         raise HTTPException(status_code=400, detail="Invalid or expired token")
 
-    patient_data_db = get_patient_info_by_id(patient_id)
+    patient_data_db = await get_patient_info_by_id_async(patient_id)
 
     if "error" in patient_data_db:
         raise HTTPException(status_code=404, detail=patient_data_db["error"])
 
-    patient_name = patient_data_db.get("name")
-    patient_email = patient_data_db.get("email")
-
     # -----------------------------------------------------------
     # 🔹 Step 2: Save Audio File
     # -----------------------------------------------------------
-    os.makedirs(UPLOAD_FOLDER, exist_ok=True)
-    audio_filename = f"{uuid.uuid4()}.wav"
-    audio_filepath = os.path.join(UPLOAD_FOLDER, audio_filename)
+    # Isolated per-request directory: removed (with all intermediates) on exit
+    with request_workspace() as workdir:
+        audio_filename = f"{uuid.uuid4()}.wav"
+        audio_filepath = os.path.join(workdir, audio_filename)
 
-    with open(audio_filepath, "wb") as f:
-        f.write(await voice_file.read())
+        audio_bytes = await voice_file.read()
+        await run_io(_write_file, audio_filepath, audio_bytes)
 
-    # -----------------------------------------------------------
-    # 🔹 Step 3: Upload File & Transcribe
-    # -----------------------------------------------------------
-    voice_url = upload_file(audio_filepath)
+        # -----------------------------------------------------------
+        # 🔹 Step 3: Run Pipeline (upload, transcribe, analyze, alert, audit)
+        # -----------------------------------------------------------
+        return await run_audio_pipeline(patient_id, patient_data_db, audio_filepath)
 
-    transcription = await get_patient_context_from_audio(audio_filepath)
-    transcript_text = transcription.get("patient_context") if isinstance(transcription, dict) else transcription
 
-    print("Transcript:\n", transcription)
+# ------------------- Job Mode -------------------
+@audio_router.post("/audio_jobs", status_code=202)
+async def submit_audio_job(token: str = Query(...), voice_file: UploadFile = File(...)):
+    """
+    Save the upload and queue the analysis pipeline; returns a job id at once.
+    Poll GET /patient/audio_jobs/{job_id} or subscribe on the WebSocket.
+    """
+    try:
+        patient_id = await run_io(get_user_info_by_token, token)
+    except HTTPException as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
 
-    # -----------------------------------------------------------
-    # 🔹 Step 4: Prepare Risk Analysis Input
-    # -----------------------------------------------------------
-    risk_input = {
-        "age": patient_data_db.get("age"),
-        "gender": patient_data_db.get("gender"),
-        "symptoms": patient_data_db.get("symptoms", []),
-        "current_situation": transcript_text
+    patient_data_db = await get_patient_info_by_id_async(patient_id)
+    if "error" in patient_data_db:
+        raise HTTPException(status_code=404, detail=patient_data_db["error"])
+
+    # The job worker owns (and removes) this directory once the pipeline finishes
+    workdir = create_workspace(prefix="job-")
+    audio_filepath = os.path.join(workdir, f"{uuid.uuid4()}.wav")
+    await run_io(_write_file, audio_filepath, await voice_file.read())
+
+    try:
+        job_id = await submit_job(patient_id, patient_data_db, audio_filepath, workdir)
+    except (OverflowError, RuntimeError) as e:
+        remove_workspace(workdir)
+        raise HTTPException(status_code=503, detail=str(e))
+
+    return {
+        "job_id": job_id,
+        "status": "queued",
+        "poll_url": f"/patient/audio_jobs/{job_id}",
+        "ws_url": f"/patient/audio_jobs/{job_id}/ws",
     }
 
-    analysis_result = Risk_Analysis(risk_input)
-    print("Risk Analysis Output:\n", analysis_result)
-    
 
-    # -----------------------------------------------------------
-    # 🔹 Step 5: Doctor Alert Logic
-    # -----------------------------------------------------------
-    alert_sent = False
-    doctor_id = None
-    urgency = "low"
-
-    if analysis_result:
-        result = analysis_result[0]
-
-        # doctor_id may return dict or string → normalize
-        raw_doc = result.get("doctor_id")
-        if isinstance(raw_doc, dict):
-            doctor_id = raw_doc.get("doctor_id")
-        else:
-            doctor_id = raw_doc
-
-        urgency = result.get("urgency", "low").lower()
-
-    # If urgent → Send Email Alert
-    if urgency in ["high", "medium"] and doctor_id:
-        doctor_info = get_doctor_info_by_id(doctor_id)
-        if doctor_info and "error" not in doctor_info:
-            send_Alert_message_doctor(
-                doctor_email=doctor_info["email"],
-                doctor_name=doctor_info["name"],
-                patient_id=str(patient_id),
-                disease=result.get("disease", ""),
-                urgency=urgency,
-                transcript=transcript_text
-            )
-            alert_sent = True
+@audio_router.get("/audio_jobs/{job_id}")
+async def get_audio_job(job_id: str, token: str = Query(...)):
+    try:
+        patient_id = await run_io(get_user_info_by_token, token)
+    except HTTPException as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
 
-    # -----------------------------------------------------------
-    # 🔹 Step 6: Build AlertInfo object
-    # -----------------------------------------------------------
-    alert_info = AlertInfo(
-        doctor_id=doctor_id,
-        specialist=result.get("recommended_specialist", ""),
-        sent=alert_sent,
-        method=["email"] if alert_sent else [],
-        timestamp=datetime.utcnow()
-    )
+    job = await get_job(job_id)
+    if not job or job["patient_id"] != str(patient_id):
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
 
-    # -----------------------------------------------------------
-    # 🔹 Step 7: Save Audit Review Log
-    # -----------------------------------------------------------
-    audit_doc = AuditReview(
-        patient_id=str(patient_id),
-        patient_name=patient_name,
-        patient_email=patient_email,
-        voice_url=voice_url,
-        transcript=transcript_text,
-        keywords=patient_data_db.get("symptoms", []),
-        detected_disease=result.get("disease", "") if analysis_result else "",
-        alert=alert_info,
-        created_at=datetime.utcnow()
-    )
-
-    audit_review_col.insert_one(audit_doc.dict())
-    
-    # -----------------------------------------------------------
-    # 🔹 Step 6: Clean up temp audio folder
-    # -----------------------------------------------------------
+
+@audio_router.websocket("/audio_jobs/{job_id}/ws")
+async def audio_job_updates(websocket: WebSocket, job_id: str, token: str = Query(...)):
+    """
+    Push job progress (stage changes, timings, final result) until the job finishes.
+    """
+    patient_id = await verify_websocket_token(websocket, token)
+    if not patient_id:
+        return
+
+    job = await get_job(job_id)
+    if not job or job["patient_id"] != str(patient_id):
+        await websocket.close(code=1008)
+        return
+
+    await websocket.accept()
+    queue = subscribe(job_id)
+    closes_at = time.monotonic() + AUDIO_JOB_WS_MAX_SECONDS
     try:
-        import shutil
-        shutil.rmtree(UPLOAD_FOLDER)  # Deletes all files and folder
-        os.makedirs(UPLOAD_FOLDER, exist_ok=True)  # Recreate empty folder
-    except Exception as e:
-        print("Cleanup error:", e)
+        await websocket.send_json(job)
+        status, stage = job["status"], job.get("stage")
+        while status not in TERMINAL_STATUSES:
+            if time.monotonic() > closes_at:
+                # Don't hold the socket for a job that may never finish: client can poll
+                await websocket.send_json({"type": "error", "detail": "Job still running; poll for the result"})
+                await websocket.close(code=1013)
+                return
+            try:
+                event = await asyncio.wait_for(queue.get(), timeout=JOB_WS_POLL_SECONDS)
+            except asyncio.TimeoutError:
+                # Job may be running in another worker process: fall back to the DB
+                event = await get_job(job_id)
+                if not event or (event["status"], event.get("stage")) == (status, stage):
+                    continue
+            await websocket.send_json(event)
+            status, stage = event.get("status", status), event.get("stage", stage)
+        await websocket.close()
+    except WebSocketDisconnect:
+        pass
+    finally:
+        unsubscribe(job_id, queue)
+
+
+# ------------------- Streaming Transcription -------------------
+@audio_router.websocket("/audio_ws")
+async def audio_ws(websocket: WebSocket, token: str = Query(...),
+                   format: str = Query("pcm_s16le"), sample_rate: int = Query(16000)):
+    """
+    Stream audio in, get transcript segments back as they are decoded.
 
-    # -----------------------------------------------------------
-    # 🔹 Step 8: Final Response
-    # -----------------------------------------------------------
-    return {
-        "patient_id": str(patient_id),
-        "patient_name": patient_name,
-        "patient_email": patient_email,
-        "transcript": transcript_text,
-        "analysis": analysis_result,
-        "doctor_id": doctor_id,
-        "doctor_email":doctor_info["email"],
-        "doctor_name":doctor_info["name"],
-        "alert_sent": alert_sent,
-        "urgency": urgency
-    }
+    Client → server: binary audio frames (raw mono PCM in `format`/`sample_rate`,
+    or webm/ogg/mp3 container chunks), then the text message "end".
+    Server → client: {"type": "partial", "segments": [...]} per decoded chunk,
+    then {"type": "final", "transcript", "patient_context", "time_to_first_text"}.
+    """
+    patient_id = await verify_websocket_token(websocket, token)
+    if not patient_id:
+        return
+    if format not in PCM_FORMATS and format not in {"webm", "ogg", "mp3", "wav"}:
+        await websocket.close(code=1003)
+        return
+
+    await websocket.accept()
+    decoder = make_decoder(format, sample_rate)
+    transcriber = StreamingTranscriber()
+
+    async def decode_ready(final: bool = False):
+        while True:
+            chunk = transcriber.next_chunk(final=final)
+            if chunk is None:
+                return
+            segments = await run_transcription(transcriber.transcribe_chunk, *chunk)
+            if segments:
+                await websocket.send_json({"type": "partial", "segments": segments})
 
+    try:
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                return
+
+            if message.get("bytes"):
+                # Blocking pipe write (ffmpeg) / resampling: keep it off the event loop
+                transcriber.add_audio(await run_io(decoder.feed, message["bytes"]))
+                if transcriber.received_seconds > STREAM_MAX_SESSION_SECONDS:
+                    await websocket.send_json({"type": "error", "detail": "Recording too long"})
+                    await websocket.close(code=1009)
+                    return
+                await decode_ready()
+            elif (message.get("text") or "").strip().lower() in {"end", '{"event": "end"}', '{"event":"end"}'}:
+                break
+
+        transcriber.add_audio(await run_io(decoder.close))
+        decoder = None
+        await decode_ready(final=True)
+        transcript = transcriber.text
+        context = await extract_patient_context_from_transcript(transcript) if transcript else {"patient_context": ""}
+
+        await websocket.send_json({
+            "type": "final",
+            "patient_id": str(patient_id),
+            "transcript": transcript,
+            "patient_context": context.get("patient_context", ""),
+            "audio_seconds": round(transcriber.received_seconds, 2),
+            "time_to_first_text": transcriber.time_to_first_text,
+        })
+        await websocket.close()
+    except WebSocketDisconnect:
+        pass
+    finally:
+        if decoder is not None:
+            # Reap the ffmpeg process of an aborted stream
+            await run_io(decoder.close)
@@ -1,13 +1,19 @@
 from fastapi import APIRouter, HTTPException, Query, Depends, status
 from fastapi.security import OAuth2PasswordBearer
-from app.DataBase import doctors_col, doctor_specialists_col, patients_col, patient_visits_col, audit_review_col
+from app.AsyncDataBase import async_col, find_all, DOCTORS, DOCTOR_SPECIALISTS, PATIENT_VISITS, AUDIT_REVIEWS
 from pydantic import EmailStr
 from app.services.auth_service import hash_password, verify_password, create_access_token, get_user_info_by_token, decode_access_token, delete_account
 from app.services.email_service import send_verification_email_Doctor
+from app.services.matcher import add_specialist_to_index
 from app.schemas.user_schemas import DoctorCreate
 from app.schemas.auth_schemas import LoginRequest
+from app.services.otp_service import issue_otp, consume_otp
+from app.services.doctor_stats import doctor_analytics
+from app.utils.executors import run_io
+from app.core.config import DOCTOR_ANALYTICS_DEFAULT_DAYS, DOCTOR_ANALYTICS_MAX_DAYS
 from bson import ObjectId
-import random
+from datetime import datetime, timedelta, timezone
+from typing import Optional
 
 router = APIRouter(prefix="/doctor", tags=["DoctorDashboard"])
 
@@ -25,11 +31,11 @@ def get_current_user(token: str = Depends(oauth2_scheme)):
         )
 
 @router.post("/signup")
-def doctor_signup(data: DoctorCreate):
-    if doctors_col.find_one({"email": data.email}):
+async def doctor_signup(data: DoctorCreate):
+    if await async_col(DOCTORS).find_one({"email": data.email}):
         raise HTTPException(status_code=400, detail="Email already registered")
     
-    hashed_password = hash_password(data.password)
+    hashed_password = await run_io(hash_password, data.password)
     doctor_data = {
         "name": data.name,
         "email": data.email,
@@ -43,23 +49,22 @@ def doctor_signup(data: DoctorCreate):
         "is_verified": False
     }
     
-    result = doctors_col.insert_one(doctor_data)
-    otp = str(random.randint(100000, 999999))
-    doctors_col.update_one({"email": data.email}, {"$set": {"otp": otp}})
-    send_verification_email_Doctor(data.email, otp)
+    result = await async_col(DOCTORS).insert_one(doctor_data)
+    otp = await issue_otp(data.email, "doctor")
+    await run_io(send_verification_email_Doctor, data.email, otp)
     return {"message": "Signup successful. Check email for OTP."}
 
 @router.post("/verify")
-def verify_doctor(email: EmailStr, otp: str):
-    doctor = doctors_col.find_one({"email": email})
+async def verify_doctor(email: EmailStr, otp: str):
+    doctor = await async_col(DOCTORS).find_one({"email": email})
     if not doctor:
         raise HTTPException(status_code=404, detail="Doctor not found")
-    if str(doctor.get("otp")) != str(otp):
+    if not await consume_otp(email, "doctor", otp):
         raise HTTPException(status_code=400, detail="Invalid OTP")
     
-    doctors_col.update_one({"email": email}, {"$set": {"is_verified": True, "otp": None}})
+    await async_col(DOCTORS).update_one({"email": email}, {"$set": {"is_verified": True}})
     
-    doctor_specialists_col.insert_one({
+    specialist_doc = {
         "doctor_id": str(doctor["_id"]),
         "type": doctor["type"],
         "email": email,
@@ -67,18 +72,34 @@ def verify_doctor(email: EmailStr, otp: str):
         "phone": doctor["phone"],
         "specialist": doctor["specialist"],
         "sub_specialist": doctor["sub_specialist"]
-    })
+    }
+    await async_col(DOCTOR_SPECIALISTS).insert_one(specialist_doc)
+    # May encode a new specialist string (CPU)
+    await run_io(add_specialist_to_index, specialist_doc)
     
     return {"message": "Doctor verified successfully"}
 
+@router.post("/resend-otp")
+async def resend_doctor_otp(email: EmailStr):
+    # Codes expire (OTP_TTL_SECONDS): unverified accounts can request a new one
+    doctor = await async_col(DOCTORS).find_one({"email": email}, {"is_verified": 1})
+    if not doctor:
+        raise HTTPException(status_code=404, detail="Doctor not found")
+    if doctor.get("is_verified"):
+        raise HTTPException(status_code=400, detail="Doctor already verified")
+
+    otp = await issue_otp(email, "doctor")
+    await run_io(send_verification_email_Doctor, email, otp)
+    return {"message": "A new OTP has been sent to your email."}
+
 @router.post("/login")
-def doctor_login(data: LoginRequest):
-    doctor = doctors_col.find_one({"email": data.email})
+async def doctor_login(data: LoginRequest):
+    doctor = await async_col(DOCTORS).find_one({"email": data.email})
     if not doctor:
         raise HTTPException(status_code=404, detail="Doctor not found")
     if not doctor["is_verified"]:
         raise HTTPException(status_code=401, detail="Doctor not verified")
-    if not verify_password(data.password, doctor["password"]):
+    if not await run_io(verify_password, data.password, doctor["password"]):
         raise HTTPException(status_code=401, detail="Incorrect password")
     
     token = create_access_token({"user_id": str(doctor["_id"]), "role": "doctor"})
@@ -92,8 +113,8 @@ async def get_doctor_patients(token: str = Query(...)):
         raise HTTPException(status_code=401, detail="Invalid token")
     
     # Get patients from visits and audit logs
-    visits = list(patient_visits_col.find({"doctor_assigned": doctor_id}, {"_id": 0}))
-    audits = list(audit_review_col.find({"alert.doctor_id": doctor_id}, {"_id": 0}))
+    visits = await find_all(PATIENT_VISITS, {"doctor_assigned": doctor_id}, {"_id": 0})
+    audits = await find_all(AUDIT_REVIEWS, {"alert.doctor_id": doctor_id}, {"_id": 0})
     
     # Combine visit and audit data
     all_patients = visits + audits
@@ -106,11 +127,11 @@ async def get_patient_history_by_doctor(patient_id: str, token: str = Query(...)
     except:
         raise HTTPException(status_code=401, detail="Invalid token")
     
-    visits = list(patient_visits_col.find({"patient_id": patient_id}, {"_id": 0}))
+    visits = await find_all(PATIENT_VISITS, {"patient_id": patient_id}, {"_id": 0})
     return {"patient_id": patient_id, "total_visits": len(visits), "visits": visits}
 
 @router.delete("/delete-account")
-def delete_my_account(authorization: str):
+async def delete_my_account(authorization: str):
     if not authorization.startswith("Bearer "):
         raise HTTPException(status_code=401, detail="Invalid Authorization header")
     
@@ -126,7 +147,7 @@ def delete_my_account(authorization: str):
     if not user_id or not role:
         raise HTTPException(status_code=400, detail="Invalid token payload")
 
-    result = delete_account(user_id, role)
+    result = await run_io(delete_account, user_id, role)
     if "error" in result:
         raise HTTPException(status_code=404, detail=result["error"])
 
@@ -154,8 +175,8 @@ def delete_my_account(authorization: str):
 #     }
 
 @router.get("/specialists")
-def get_all_specialists():
-    specialists = list(doctor_specialists_col.find({}, {"_id": 0, "doctor_id": 0}))
+async def get_all_specialists():
+    specialists = await find_all(DOCTOR_SPECIALISTS, {}, {"_id": 0, "doctor_id": 0})
     return {"count": len(specialists), "specialists": specialists}
 
 @router.get("/audit-patients")
@@ -166,10 +187,10 @@ async def get_doctor_audit_patients(token: str = Query(...)):
         raise HTTPException(status_code=401, detail="Invalid token")
     
     # Get patients from audit logs where doctor was alerted
-    audits = audit_review_col.find({"alert.doctor_id": doctor_id})
+    audits = async_col(AUDIT_REVIEWS).find({"alert.doctor_id": doctor_id})
     results = []
     
-    for audit in audits:
+    async for audit in audits:
         results.append({
             "patient_id": audit.get("patient_id"),
             "patient_name": audit.get("patient_name"),
@@ -180,4 +201,36 @@ async def get_doctor_audit_patients(token: str = Query(...)):
             "alert_method": audit.get("alert", {}).get("method", [])
         })
     
-    return {"doctor_id": doctor_id, "total_audit_patients": len(results), "patients": results}
\ No newline at end of file
+    return {"doctor_id": doctor_id, "total_audit_patients": len(results), "patients": results}
+
+def _naive_utc(value: Optional[datetime]) -> Optional[datetime]:
+    """Query datetimes may carry an offset; rollup days are naive UTC."""
+    if value is not None and value.tzinfo is not None:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+@router.get("/analytics")
+async def get_doctor_analytics(
+    token: str = Query(...),
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    days: int = Query(DOCTOR_ANALYTICS_DEFAULT_DAYS, ge=1, le=DOCTOR_ANALYTICS_MAX_DAYS),
+):
+    """
+    Audit counts by urgency, disease, day and alert status, read from the
+    doctor_daily_stats rollup. Window: date_from/date_to, else the last `days` days.
+    """
+    try:
+        doctor_id = get_user_info_by_token(token)
+    except:
+        raise HTTPException(status_code=401, detail="Invalid token")
+
+    date_from, date_to = _naive_utc(date_from), _naive_utc(date_to)
+    date_to = date_to or datetime.utcnow()
+    date_from = date_from or (date_to - timedelta(days=days))
+    if date_from >= date_to:
+        raise HTTPException(status_code=400, detail="date_from must be before date_to")
+    if date_to - date_from > timedelta(days=DOCTOR_ANALYTICS_MAX_DAYS):
+        raise HTTPException(status_code=400, detail=f"Window is limited to {DOCTOR_ANALYTICS_MAX_DAYS} days")
+
+    return await doctor_analytics(str(doctor_id), date_from, date_to)
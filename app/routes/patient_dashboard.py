@@ -1,44 +1,58 @@
 from fastapi import APIRouter, HTTPException, Query
-from app.DataBase import patients_col, patient_visits_col, doctor_specialists_col
+from app.AsyncDataBase import async_col, find_all, PATIENTS, PATIENT_VISITS, DOCTOR_SPECIALISTS
 from pydantic import EmailStr
 from app.services.auth_service import verify_password, create_access_token, create_patient_account, get_user_info_by_token
 from app.services.email_service import send_verification_email_Patient
 from app.schemas.user_schemas import PatientCreate
 from app.schemas.auth_schemas import LoginRequest
-import random
+from app.services.otp_service import issue_otp, consume_otp
+from app.utils.executors import run_io
 
 router = APIRouter(prefix="/patient", tags=["PatientDashboard"])
 
 @router.post("/signup")
-def patient_signup(data: PatientCreate):
-    Patient = create_patient_account(data)
+async def patient_signup(data: PatientCreate):
+    # Account creation hashes the password (bcrypt): keep it off the event loop
+    Patient = await run_io(create_patient_account, data)
     if "error" in Patient:
         raise HTTPException(status_code=400, detail=Patient["error"])
 
-    otp = str(random.randint(100000, 999999))
-    patients_col.update_one({"email": data.email}, {"$set": {"otp": otp}})
-    send_verification_email_Patient(data.email, otp)
+    otp = await issue_otp(data.email, "patient")
+    await run_io(send_verification_email_Patient, data.email, otp)
     return {"message": "Signup successful. Check your email for OTP verification."}
 
 @router.post("/verify")
-def verify_patient(email: EmailStr, otp: str):
-    patient = patients_col.find_one({"email": email})
+async def verify_patient(email: EmailStr, otp: str):
+    patient = await async_col(PATIENTS).find_one({"email": email})
     if not patient:
         raise HTTPException(status_code=404, detail="Patient not found")
-    if str(patient.get("otp")) != str(otp):
+    if not await consume_otp(email, "patient", otp):
         raise HTTPException(status_code=400, detail="Invalid OTP")
 
-    patients_col.update_one({"email": email}, {"$set": {"is_verified": True, "otp": None}})
+    await async_col(PATIENTS).update_one({"email": email}, {"$set": {"is_verified": True}})
     return {"message": "Patient verified successfully"}
 
+@router.post("/resend-otp")
+async def resend_patient_otp(email: EmailStr):
+    # Codes expire (OTP_TTL_SECONDS): unverified accounts can request a new one
+    patient = await async_col(PATIENTS).find_one({"email": email}, {"is_verified": 1})
+    if not patient:
+        raise HTTPException(status_code=404, detail="Patient not found")
+    if patient.get("is_verified"):
+        raise HTTPException(status_code=400, detail="Patient already verified")
+
+    otp = await issue_otp(email, "patient")
+    await run_io(send_verification_email_Patient, email, otp)
+    return {"message": "A new OTP has been sent to your email."}
+
 @router.post("/login")
-def patient_login(data: LoginRequest):
-    patient = patients_col.find_one({"email": data.email})
+async def patient_login(data: LoginRequest):
+    patient = await async_col(PATIENTS).find_one({"email": data.email})
     if not patient:
         raise HTTPException(status_code=404, detail="Patient not found")
     if not patient["is_verified"]:
         raise HTTPException(status_code=401, detail="Patient not verified")
-    if not verify_password(data.password, patient["password"]):
+    if not await run_io(verify_password, data.password, patient["password"]):
         raise HTTPException(status_code=401, detail="Incorrect password")
 
     token = create_access_token({"user_id": str(patient["_id"]), "role": "patient"})
@@ -51,12 +65,12 @@ async def get_my_visits(token: str = Query(...)):
     except:
         raise HTTPException(status_code=401, detail="Invalid token")
     
-    visits = list(patient_visits_col.find({"patient_id": patient_id}, {"_id": 0}))
+    visits = await find_all(PATIENT_VISITS, {"patient_id": patient_id}, {"_id": 0})
     return {"patient_id": patient_id, "total_visits": len(visits), "visits": visits}
 
 @router.get("/specialists")
 async def get_specialists():
-    specialists = list(doctor_specialists_col.find({}, {"_id": 0, "doctor_id": 0}))
+    specialists = await find_all(DOCTOR_SPECIALISTS, {}, {"_id": 0, "doctor_id": 0})
     return {"total_specialists": len(specialists), "specialists": specialists}
 
 # Audio capture route for patients
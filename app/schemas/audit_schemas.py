@@ -22,6 +22,7 @@ class AuditReview(BaseModel):
     visit_reason: str
     consultation_type: str
     alert: AlertInfo
+    urgency: Optional[str] = None
     created_at: datetime
 
 class AudioAnalysisRequest(BaseModel):
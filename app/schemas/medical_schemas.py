@@ -27,4 +27,16 @@ class DiagnosisResult(BaseModel):
     probability: float
     recommended_specialist: str
     doctor_id: Optional[str]
-    urgency: str
\ No newline at end of file
+    urgency: str
+
+class TriagePatient(BaseModel):
+    patient_id: Optional[str] = None
+    age: Optional[int] = None
+    gender: Optional[str] = None
+    previous_situation: Optional[str] = None
+    current_situation: str
+
+class TriageBatchRequest(BaseModel):
+    patients: List[TriagePatient]
+    # None: the router picks from the risk_analysis_batch class (larger-context models)
+    model_preference: Optional[str] = None
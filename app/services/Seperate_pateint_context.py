@@ -1,28 +1,23 @@
-import pickle
 import numpy as np
 import warnings
-from sentence_transformers import SentenceTransformer
-from app.utils.gemini_utils import call_gemini_api
+from app.utils.gemini_utils import call_gemini_api_async
+from app.utils.executors import run_io
+import asyncio
+from app.utils.embedding_cache import encode_cached
+from app.utils.speaker_separation import separate_patient_context, count_path
+from app.core.config import LOCAL_SPEAKER_SEPARATION, LOCAL_SPEAKER_MIN_CONFIDENCE
+from app.vector_database.kb_store import get_kb
 import re
 import json
-import faiss
 warnings.filterwarnings("ignore", category=FutureWarning)
 
-# Load Patient Knowledge Base
-with open("patient_kb.pkl", "rb") as f:
-    kb_data = pickle.load(f)
-
-faiss_index = kb_data["index"]
-kb_texts = kb_data["texts"]
-embedding_model_name = kb_data["model_name"]
-
-embed_model = SentenceTransformer(embedding_model_name, device="cpu")
-
+# Patient Knowledge Base: memory-mapped on first search (see kb_store.py)
 def search_kb(query, top_k=3):
     """Return top-k patient KB examples for a given query."""
-    query_embedding = embed_model.encode([query], convert_to_numpy=True).astype("float32")
-    D, I = faiss_index.search(query_embedding, top_k)
-    return [kb_texts[i] for i in I[0]]
+    kb = get_kb()
+    query_embedding = encode_cached([query], kb.model_name)
+    D, I = kb.search(query_embedding, top_k)
+    return [kb.text(i) for i in I[0] if i >= 0]
 
 def _clean_json_response(raw):
     """Normalize Gemini output → always return a dict."""
@@ -59,16 +54,24 @@ def _clean_json_response(raw):
     return {"patient_context": context.strip()}
 
 
-def extract_patient_context_from_transcript(transcribed_text: str, model_preference="gemma-3n-e2b-it"):
+async def extract_patient_context_from_transcript(transcribed_text: str, model_preference="gemma-3n-e2b-it"):
     """
     Input:
         transcribed_text: str - raw transcript including doctor and patient conversation
         model_preference: str - Gemini AI model
     Output:
-        dict: {"patient_context": "..."} strictly
+        dict: {"patient_context": "..."}; a failed LLM call adds "error"
+        (with an empty context) so callers can tell it from an empty result.
     """
+    # Transcripts with clear speaker markers need no LLM call
+    if LOCAL_SPEAKER_SEPARATION:
+        local = separate_patient_context(transcribed_text, LOCAL_SPEAKER_MIN_CONFIDENCE)
+        if local is not None:
+            return {"patient_context": local["patient_context"]}
+    count_path("llm")
+
     # Retrieve KB Examples
-    kb_examples = search_kb(transcribed_text)
+    kb_examples = await run_io(search_kb, transcribed_text)
     kb_str = "\n".join([f"- {ex}" for ex in kb_examples])
 
     # System Prompt
@@ -108,7 +111,9 @@ Extract ONLY the patient context.
     prompt = f"System Prompt:\n{system_prompt}\n\nUser Prompt:\n{user_prompt}"
 
     # Call Gemini
-    response=call_gemini_api(prompt, model_preference)
+    response=await call_gemini_api_async(prompt, model_preference, call_site="extract_context")
+    if isinstance(response, dict) and "error" in response:
+        return {"patient_context": "", "error": response["error"]}
     # Normalize response for API pipeline
     normalized = _clean_json_response(response)
 
@@ -131,5 +136,5 @@ Patient: Like there are blind spots.
 Doctor: Okay. How about any vomiting? 
 Patient: Um no. I feel like my face is pretty swollen though. I don't know if it's related to the headache but it started around the same time. 
 """
-    output = extract_patient_context_from_transcript(transcript)
+    output = asyncio.run(extract_patient_context_from_transcript(transcript))
     print(output)
\ No newline at end of file
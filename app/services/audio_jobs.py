@@ -0,0 +1,197 @@
+from datetime import datetime, timedelta
+from typing import Dict, Optional, Set
+import asyncio
+import os
+import uuid
+
+from app.DataBase import audio_jobs_col
+from app.core.config import AUDIO_JOB_WORKERS, AUDIO_JOB_QUEUE_SIZE, AUDIO_JOB_STALE_SECONDS
+from app.services.audio_pipeline import run_audio_pipeline
+from app.utils.executors import run_io
+from app.utils.timing import StageTimer
+from app.utils.workspace import remove_workspace
+
+# ------------------- Audio Analysis Jobs -------------------
+# Jobs are persisted in audio_jobs_col (so any worker process can serve a poll)
+# and executed by an in-process pool of asyncio workers. The queue cannot
+# survive a restart: jobs cut off by shutdown are failed with "interrupted".
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_DONE = "done"
+JOB_FAILED = "failed"
+TERMINAL_STATUSES = {JOB_DONE, JOB_FAILED}
+JOB_INTERRUPTED = "interrupted"
+
+JOB_PUBLIC_FIELDS = {"_id": 0, "job_id": 1, "patient_id": 1, "status": 1, "stage": 1,
+                     "stage_timings": 1, "result": 1, "error": 1, "created_at": 1, "updated_at": 1}
+
+_queue: Optional[asyncio.Queue] = None
+_workers = []
+_subscribers: Dict[str, Set[asyncio.Queue]] = {}
+
+
+def _serialize(job: dict) -> dict:
+    job = {k: v for k, v in job.items() if k != "_id"}
+    for key in ("created_at", "updated_at"):
+        if isinstance(job.get(key), datetime):
+            job[key] = job[key].isoformat()
+    return job
+
+
+def _publish(job_id: str, event: dict):
+    for queue in _subscribers.get(job_id, ()):
+        queue.put_nowait(event)
+
+
+async def _update_job(job_id: str, fields: dict):
+    fields["updated_at"] = datetime.utcnow()
+    await run_io(audio_jobs_col.update_one, {"job_id": job_id}, {"$set": fields})
+    _publish(job_id, _serialize(dict(fields, job_id=job_id)))
+
+
+# ------------------- Job API -------------------
+async def submit_job(patient_id: str, patient_data_db: dict, audio_filepath: str,
+                     workdir: Optional[str] = None) -> str:
+    """
+    Persist a queued job and hand it to the worker pool. Returns job_id.
+    workdir (if given) is removed once the job finishes.
+    """
+    if _queue is None:
+        raise RuntimeError("Audio job workers are not running")
+    if _queue.full():
+        raise OverflowError("Audio job queue is full")
+
+    job_id = uuid.uuid4().hex
+    now = datetime.utcnow()
+    await run_io(audio_jobs_col.insert_one, {
+        "job_id": job_id,
+        "patient_id": str(patient_id),
+        "status": JOB_QUEUED,
+        "stage": None,
+        "stage_timings": {},
+        "result": None,
+        "error": None,
+        "created_at": now,
+        "updated_at": now,
+    })
+    _queue.put_nowait((job_id, patient_id, patient_data_db, audio_filepath, workdir))
+    return job_id
+
+
+async def get_job(job_id: str) -> Optional[dict]:
+    job = await run_io(audio_jobs_col.find_one, {"job_id": job_id}, JOB_PUBLIC_FIELDS)
+    if job and job["status"] not in TERMINAL_STATUSES and _is_stale(job):
+        # Its worker died without a clean shutdown (crash, kill -9)
+        await _update_job(job_id, {"status": JOB_FAILED, "error": JOB_INTERRUPTED})
+        job.update(status=JOB_FAILED, error=JOB_INTERRUPTED)
+    return _serialize(job) if job else None
+
+
+def _is_stale(job: dict) -> bool:
+    updated_at = job.get("updated_at") or job.get("created_at")
+    return updated_at is None or updated_at < datetime.utcnow() - timedelta(seconds=AUDIO_JOB_STALE_SECONDS)
+
+
+def subscribe(job_id: str) -> asyncio.Queue:
+    queue = asyncio.Queue()
+    _subscribers.setdefault(job_id, set()).add(queue)
+    return queue
+
+
+def unsubscribe(job_id: str, queue: asyncio.Queue):
+    queues = _subscribers.get(job_id)
+    if queues:
+        queues.discard(queue)
+        if not queues:
+            del _subscribers[job_id]
+
+
+# ------------------- Worker Pool -------------------
+async def _run_job(job_id: str, patient_id: str, patient_data_db: dict, audio_filepath: str,
+                   workdir: Optional[str]):
+    async def on_stage(name, timings):
+        await _update_job(job_id, {"status": JOB_RUNNING, "stage": name, "stage_timings": dict(timings)})
+
+    timer = StageTimer(on_stage=on_stage)
+    try:
+        result = await run_audio_pipeline(patient_id, patient_data_db, audio_filepath, timer)
+        await _update_job(job_id, {"status": JOB_DONE, "stage": None,
+                                   "stage_timings": dict(timer.timings, total=timer.total()),
+                                   "result": result})
+    except asyncio.CancelledError:
+        # Worker cancelled at shutdown: record it, then let the cancellation through
+        print(f"Audio job {job_id} interrupted")
+        await _update_job(job_id, {"status": JOB_FAILED, "stage_timings": dict(timer.timings),
+                                   "error": JOB_INTERRUPTED})
+        raise
+    except Exception as e:
+        print(f"Audio job {job_id} failed:", e)
+        await _update_job(job_id, {"status": JOB_FAILED, "stage_timings": dict(timer.timings), "error": str(e)})
+    finally:
+        if workdir:
+            remove_workspace(workdir)
+        elif os.path.exists(audio_filepath):
+            os.remove(audio_filepath)
+
+
+async def _worker(worker_no: int, queue: asyncio.Queue):
+    while True:
+        job = await queue.get()
+        try:
+            await _run_job(*job)
+        except Exception as e:
+            print(f"Audio job worker {worker_no} error:", e)
+        finally:
+            queue.task_done()
+
+
+async def fail_stale_jobs() -> int:
+    """
+    Fail queued/running jobs left behind by a process that died without a
+    clean shutdown. Only jobs idle for AUDIO_JOB_STALE_SECONDS are touched,
+    so jobs still running in other worker processes are left alone.
+    """
+    cutoff = datetime.utcnow() - timedelta(seconds=AUDIO_JOB_STALE_SECONDS)
+    result = await run_io(
+        audio_jobs_col.update_many,
+        {"status": {"$in": [JOB_QUEUED, JOB_RUNNING]}, "updated_at": {"$lt": cutoff}},
+        {"$set": {"status": JOB_FAILED, "error": JOB_INTERRUPTED, "updated_at": datetime.utcnow()}},
+    )
+    if result.modified_count:
+        print(f"Marked {result.modified_count} interrupted audio jobs as failed")
+    return result.modified_count
+
+
+async def start_job_workers():
+    global _queue
+    if _queue is not None:
+        return
+    try:
+        await fail_stale_jobs()
+    except Exception as e:
+        print("Could not clean up interrupted audio jobs:", e)
+    _queue = asyncio.Queue(maxsize=AUDIO_JOB_QUEUE_SIZE)
+    for worker_no in range(AUDIO_JOB_WORKERS):
+        _workers.append(asyncio.create_task(_worker(worker_no, _queue)))
+
+
+async def stop_job_workers():
+    global _queue
+    queue, _queue = _queue, None  # stop accepting submissions
+    for task in _workers:
+        task.cancel()
+    await asyncio.gather(*_workers, return_exceptions=True)
+    _workers.clear()
+
+    # Jobs still waiting in the in-memory queue can never run now
+    while queue is not None and not queue.empty():
+        job_id, _, _, audio_filepath, workdir = queue.get_nowait()
+        try:
+            await _update_job(job_id, {"status": JOB_FAILED, "error": JOB_INTERRUPTED})
+        except Exception as e:
+            print(f"Could not mark audio job {job_id} interrupted:", e)
+        if workdir:
+            remove_workspace(workdir)
+        elif os.path.exists(audio_filepath):
+            os.remove(audio_filepath)
@@ -0,0 +1,209 @@
+from datetime import datetime
+import asyncio
+
+from app.AsyncDataBase import async_col, AUDIT_REVIEWS
+from app.services.auth_service import get_doctor_info_by_id
+from app.utils.voice_upload import upload_file
+from app.services.text_profilling import Risk_Analysis, attach_doctor
+from app.services.email_service import send_Alert_message_doctor
+from app.services.pateint_context_from_audio import get_patient_context_from_audio, get_transcript_from_audio, context_ok
+from app.services.Seperate_pateint_context import extract_patient_context_from_transcript
+from app.services.fused_triage import extract_and_triage
+from app.core.config import AUDIO_FUSED_TRIAGE
+from app.schemas.audit_schemas import AuditReview, AlertInfo
+from app.utils.executors import run_io
+from app.utils.timing import StageTimer
+from app.services import transcript_cache
+from app.services.doctor_stats import record_audit
+
+
+async def run_audio_pipeline(patient_id: str, patient_data_db: dict, audio_filepath: str,
+                             timer: StageTimer = None) -> dict:
+    """
+    Upload → preprocess → transcribe → extract context → risk analysis →
+    doctor alert → audit log, for one saved audio file.
+    Shared by the synchronous /audio_stream route and the job workers.
+    """
+    timer = timer or StageTimer()
+    patient_name = patient_data_db.get("name")
+    patient_email = patient_data_db.get("email")
+
+    # -----------------------------------------------------------
+    # 🔹 Upload File & Transcribe
+    # -----------------------------------------------------------
+    # Content hash: a resubmitted recording reuses its upload/transcript/context/analysis
+    async with timer.stage("cache_lookup"):
+        fingerprint = await run_io(transcript_cache.audio_fingerprint, audio_filepath)
+        cached = await run_io(transcript_cache.get_cached, fingerprint) or {}
+
+    # Cloudinary upload overlaps with preprocessing + transcription
+    upload_task = None
+    if isinstance(cached.get("voice_url"), str):
+        voice_url = cached["voice_url"]
+    else:
+        upload_task = asyncio.create_task(run_io(upload_file, audio_filepath))
+    fused_analysis = None
+    try:
+        if "patient_context" in cached:
+            transcription = cached["patient_context"]
+        elif AUDIO_FUSED_TRIAGE:
+            transcription, fused_analysis = await _fused_context_and_triage(
+                audio_filepath, patient_data_db, cached, fingerprint, timer)
+        else:
+            transcription = await get_patient_context_from_audio(audio_filepath, timer, fingerprint)
+    finally:
+        if upload_task:
+            async with timer.stage("upload_wait"):
+                voice_url = await upload_task
+    if upload_task and isinstance(voice_url, str):
+        await run_io(transcript_cache.store, fingerprint, {"voice_url": voice_url})
+    transcript_text = transcription.get("patient_context") if isinstance(transcription, dict) else transcription
+
+    print("Transcript:\n", transcription)
+    if isinstance(transcription, dict) and "error" in transcription:
+        print("Patient context extraction failed (not cached):", transcription["error"])
+
+    # -----------------------------------------------------------
+    # 🔹 Prepare Risk Analysis Input
+    # -----------------------------------------------------------
+    risk_input = {
+        "age": patient_data_db.get("age"),
+        "gender": patient_data_db.get("gender"),
+        "symptoms": patient_data_db.get("symptoms", []),
+        "current_situation": transcript_text
+    }
+
+    risk_key = transcript_cache.input_fingerprint(risk_input)
+    cached_analysis = cached.get("analysis", {}).get(risk_key)
+    analysis_result = fused_analysis
+
+    if analysis_result is None and cached_analysis:
+        # Only triage fields are cached: match the doctor against the current roster
+        async with timer.stage("doctor_match"):
+            analysis_result = await attach_doctor([dict(item) for item in cached_analysis])
+    elif analysis_result is None:
+        async with timer.stage("risk_analysis"):
+            analysis_result = await Risk_Analysis(risk_input)
+    if not cached_analysis and analysis_result and not any("error" in item for item in analysis_result):
+        triage = [{k: v for k, v in item.items() if k != "doctor_id"} for item in analysis_result]
+        await run_io(transcript_cache.store, fingerprint, {f"analysis.{risk_key}": triage})
+    print("Risk Analysis Output:\n", analysis_result)
+
+    # -----------------------------------------------------------
+    # 🔹 Doctor Alert Logic
+    # -----------------------------------------------------------
+    alert_sent = False
+    doctor_id = None
+    doctor_info = None
+    urgency = "low"
+    result = {}
+
+    if analysis_result:
+        result = analysis_result[0]
+
+        # doctor_id may return dict or string → normalize
+        raw_doc = result.get("doctor_id")
+        if isinstance(raw_doc, dict):
+            doctor_id = raw_doc.get("doctor_id")
+        else:
+            doctor_id = raw_doc
+
+        urgency = result.get("urgency", "low").lower()
+
+    # If urgent → Send Email Alert
+    if urgency in ["high", "medium"] and doctor_id:
+        async with timer.stage("alert"):
+            doctor_info = await run_io(get_doctor_info_by_id, doctor_id)
+            if doctor_info and "error" not in doctor_info:
+                await run_io(
+                    send_Alert_message_doctor,
+                    doctor_email=doctor_info["email"],
+                    doctor_name=doctor_info["name"],
+                    patient_id=str(patient_id),
+                    disease=result.get("disease", ""),
+                    urgency=urgency,
+                    transcript=transcript_text
+                )
+                alert_sent = True
+
+    # -----------------------------------------------------------
+    # 🔹 Build AlertInfo object
+    # -----------------------------------------------------------
+    alert_info = AlertInfo(
+        doctor_id=doctor_id,
+        specialist=result.get("recommended_specialist", ""),
+        sent=alert_sent,
+        method=["email"] if alert_sent else [],
+        timestamp=datetime.utcnow()
+    )
+
+    # -----------------------------------------------------------
+    # 🔹 Save Audit Review Log
+    # -----------------------------------------------------------
+    audit_doc = AuditReview(
+        patient_id=str(patient_id),
+        patient_name=patient_name,
+        patient_email=patient_email,
+        voice_url=voice_url,
+        transcript=transcript_text,
+        keywords=patient_data_db.get("symptoms", []),
+        detected_disease=result.get("disease", "") if analysis_result else "",
+        visit_reason="Voice consultation",
+        consultation_type="audio",
+        alert=alert_info,
+        urgency=urgency,
+        created_at=datetime.utcnow()
+    )
+
+    async with timer.stage("persist"):
+        audit_record = audit_doc.dict()
+        await async_col(AUDIT_REVIEWS).insert_one(audit_record)
+        await record_audit(audit_record)
+
+    return {
+        "patient_id": str(patient_id),
+        "patient_name": patient_name,
+        "patient_email": patient_email,
+        "transcript": transcript_text,
+        "analysis": analysis_result,
+        "doctor_id": doctor_id,
+        "doctor_email": doctor_info.get("email") if doctor_info else None,
+        "doctor_name": doctor_info.get("name") if doctor_info else None,
+        "alert_sent": alert_sent,
+        "urgency": urgency
+    }
+
+
+async def _fused_context_and_triage(audio_filepath: str, patient_data_db: dict, cached: dict,
+                                    fingerprint: str, timer: StageTimer):
+    """
+    AUDIO_FUSED_TRIAGE: one LLM call for context extraction + triage.
+    Returns (patient_context dict, analysis list or None). When the fused
+    response is unusable, falls back to the separate extraction call (the
+    caller then runs Risk_Analysis as usual).
+    """
+    transcript = cached.get("transcript")
+    if not isinstance(transcript, str):
+        transcript = await get_transcript_from_audio(audio_filepath, timer)
+        await run_io(transcript_cache.store, fingerprint, {"transcript": transcript})
+
+    # Same patient fields Risk_Analysis sees on the two-call path
+    patient_data = {
+        "age": patient_data_db.get("age"),
+        "gender": patient_data_db.get("gender"),
+        "previous_situation": patient_data_db.get("previous_situation"),
+    }
+    async with timer.stage("extract_and_triage"):
+        fused = await extract_and_triage(transcript, patient_data)
+
+    if fused is not None:
+        context, analysis = {"patient_context": fused["patient_context"]}, fused["analysis"]
+    else:
+        async with timer.stage("extract_context"):
+            context = await extract_patient_context_from_transcript(transcript)
+        analysis = None
+
+    # A failed fallback extraction is not cached: resubmissions retry it
+    if context_ok(context):
+        await run_io(transcript_cache.store, fingerprint, {"patient_context": context})
+    return context, analysis
@@ -6,7 +6,9 @@ import bcrypt
 from fastapi import HTTPException, status
 
 from app.DataBase import doctors_col, doctor_specialists_col, patients_col
+from app.AsyncDataBase import async_col, PATIENTS
 from app.core.config import SECRET_KEY, ALGORITHM
+from app.services.matcher import remove_doctor_from_index
 
 
 # ---------------- Password Hashing ----------------
@@ -61,7 +63,6 @@ def create_doctor_account(data):
         "password": hashed_pw,
         "role": "doctor",
         "is_verified": False,
-        "otp": None,
         "created_at": datetime.utcnow()
     }
 
@@ -84,7 +85,6 @@ def create_patient_account(data):
         "gender": data.gender,
         "symptoms": data.symptoms,
         "password": hashed_pw,
-        "otp": None,
         "is_verified": False,
         "created_at": datetime.utcnow()
     }
@@ -97,6 +97,7 @@ def create_patient_account(data):
 def delete_account(user_id: str, role: str):
     if role == "doctor":
         doctor_specialists_col.delete_many({"doctor_id": user_id})
+        remove_doctor_from_index(user_id)
         result = doctors_col.delete_one({"_id": ObjectId(user_id)})
     elif role == "patient":
         result = patients_col.delete_one({"_id": ObjectId(user_id)})
@@ -129,30 +130,40 @@ def get_doctor_info_by_id(doctor_id: str):
     except Exception as e:
         return {"error": f"Invalid doctor ID: {str(e)}"}
 
+PATIENT_INFO_FIELDS = {
+    "_id": 1,
+    "name": 1,
+    "email": 1,
+    "phone": 1,
+    "role": 1,
+    "age": 1,
+    "gender": 1,
+    "symptoms": 1
+}
+
+def _patient_info(patient):
+    if not patient:
+        return {"error": "Patient not found"}
+
+    # Convert ObjectId → string
+    patient["_id"] = str(patient["_id"])
+
+    return patient
+
 def get_patient_info_by_id(patient_id: str):
     """Get selected patient info by ID"""
     try:
-        patient = patients_col.find_one(
-            {"_id": ObjectId(patient_id)},
-            {
-                "_id": 1,
-                "name": 1,
-                "email": 1,
-                "phone": 1,
-                "role": 1,
-                "age": 1,
-                "gender": 1,
-                "symptoms": 1
-            }
-        )
+        patient = patients_col.find_one({"_id": ObjectId(patient_id)}, PATIENT_INFO_FIELDS)
+        return _patient_info(patient)
 
-        if not patient:
-            return {"error": "Patient not found"}
-
-        # Convert ObjectId → string
-        patient["_id"] = str(patient["_id"])
+    except Exception as e:
+        return {"error": f"Invalid patient ID: {str(e)}"}
 
-        return patient
+async def get_patient_info_by_id_async(patient_id: str):
+    """get_patient_info_by_id for async routes (Motor)"""
+    try:
+        patient = await async_col(PATIENTS).find_one({"_id": ObjectId(patient_id)}, PATIENT_INFO_FIELDS)
+        return _patient_info(patient)
 
     except Exception as e:
         return {"error": f"Invalid patient ID: {str(e)}"}
@@ -0,0 +1,177 @@
+from datetime import datetime, timedelta
+from typing import Optional
+
+from pymongo import ReplaceOne
+
+from app.AsyncDataBase import async_col, DOCTOR_DAILY_STATS
+from app.DataBase import audit_review_col, doctor_daily_stats_col
+from app.core.config import DOCTOR_ANALYTICS_TOP_DISEASES
+
+# ------------------- Doctor Daily Rollup -------------------
+# One document per (doctor_id, UTC day) in doctor_daily_stats:
+#   {doctor_id, day, total, urgency: {high: n}, disease: {name: n}, alert: {sent: n, not_sent: n}}
+# Updated with a $inc upsert on every audit insert, so analytics read at most
+# one small document per day instead of scanning audit_patient.
+
+
+def _day(ts: Optional[datetime]) -> datetime:
+    ts = ts or datetime.utcnow()
+    return datetime(ts.year, ts.month, ts.day)
+
+
+def _key(value, default: str = "unknown") -> str:
+    """Counter field name: Mongo keys may not contain '.' or start with '$'."""
+    value = str(value or "").strip().replace(".", "_").lstrip("$")
+    return value or default
+
+
+def _counters(audit: dict) -> Optional[tuple]:
+    """(doctor_id, day, urgency, disease, alert) for an audit_patient document."""
+    alert = audit.get("alert") or {}
+    doctor_id = alert.get("doctor_id")
+    if not doctor_id:
+        return None
+    return (
+        str(doctor_id),
+        _day(audit.get("created_at")),
+        _key(audit.get("urgency"), "low").lower(),
+        _key(audit.get("detected_disease")),
+        "sent" if alert.get("sent") else "not_sent",
+    )
+
+
+def _rollup_id(doctor_id: str, day: datetime) -> str:
+    return f"{doctor_id}:{day:%Y-%m-%d}"
+
+
+async def record_audit(audit: dict):
+    """Count one inserted audit into its doctor's daily rollup (no-op without a doctor)."""
+    counters = _counters(audit)
+    if counters is None:
+        return
+    doctor_id, day, urgency, disease, alert = counters
+    try:
+        await async_col(DOCTOR_DAILY_STATS).update_one(
+            {"_id": _rollup_id(doctor_id, day)},
+            {
+                "$setOnInsert": {"doctor_id": doctor_id, "day": day},
+                "$inc": {"total": 1, f"urgency.{urgency}": 1, f"disease.{disease}": 1, f"alert.{alert}": 1},
+            },
+            upsert=True,
+        )
+    except Exception as e:
+        # The audit itself is already stored; a backfill repairs the rollup
+        print(f"Doctor stats update failed for {doctor_id}: {e}")
+
+
+# ------------------- Backfill -------------------
+# Live $inc only touches the current day's rollups, so the backfill rebuilds
+# closed days only and never races with record_audit. Run it from the CLI:
+#   python -m app.db_indexes --rebuild-doctor-stats
+# Each rollup is replaced on its own, so a rerun (or two at once) is idempotent.
+OPEN_DAY_GRACE = timedelta(hours=1)  # audits stamped just before midnight may still be in flight
+
+
+def backfill_doctor_stats(doctor_id: Optional[str] = None) -> int:
+    """
+    Rebuild closed-day rollup documents from audit_patient (all doctors, or one).
+    Mongo groups audits down to (doctor, day, urgency, disease, alert) counts;
+    those are folded into rollup documents and replaced in bulk. Closed-day
+    rollups with no audits left are removed. Returns the number written.
+    """
+    before = _day(datetime.utcnow() - OPEN_DAY_GRACE)
+    doctor_match = {"alert.doctor_id": doctor_id} if doctor_id else {"alert.doctor_id": {"$nin": [None, ""]}}
+    pipeline = [
+        {"$match": dict(doctor_match, created_at={"$lt": before})},
+        {"$group": {
+            "_id": {
+                "doctor_id": "$alert.doctor_id",
+                "day": {"$dateFromParts": {"year": {"$year": "$created_at"}, "month": {"$month": "$created_at"},
+                                           "day": {"$dayOfMonth": "$created_at"}}},
+                "urgency": "$urgency",
+                "disease": "$detected_disease",
+                "sent": "$alert.sent",
+            },
+            "count": {"$sum": 1},
+        }},
+    ]
+
+    rebuilt_at = datetime.utcnow()
+    rollups = {}
+    for group in audit_review_col.aggregate(pipeline, allowDiskUse=True):
+        g = group["_id"]
+        counters = _counters({"alert": {"doctor_id": g["doctor_id"], "sent": g.get("sent")},
+                              "created_at": g["day"], "urgency": g.get("urgency"),
+                              "detected_disease": g.get("disease")})
+        doc_id, day, urgency, disease, alert = counters
+        doc = rollups.setdefault(_rollup_id(doc_id, day), {
+            "doctor_id": doc_id, "day": day, "total": 0, "urgency": {}, "disease": {}, "alert": {},
+            "rebuilt_at": rebuilt_at,
+        })
+        n = group["count"]
+        doc["total"] += n
+        for field, key in (("urgency", urgency), ("disease", disease), ("alert", alert)):
+            doc[field][key] = doc[field].get(key, 0) + n
+
+    if rollups:
+        doctor_daily_stats_col.bulk_write(
+            [ReplaceOne({"_id": _id}, doc, upsert=True) for _id, doc in rollups.items()], ordered=False)
+
+    stale = {"day": {"$lt": before}, "rebuilt_at": {"$ne": rebuilt_at}}
+    if doctor_id:
+        stale["doctor_id"] = doctor_id
+    removed = doctor_daily_stats_col.delete_many(stale).deleted_count
+    print(f"Doctor stats backfill: {len(rollups)} daily rollups before {before:%Y-%m-%d}, {removed} stale removed")
+    return len(rollups)
+
+
+# ------------------- Analytics -------------------
+def _sum_map(field: str, limit: Optional[int] = None) -> list:
+    """$facet branch: sum a {key: count} map field across the matched days."""
+    stages = [
+        {"$project": {"kv": {"$objectToArray": {"$ifNull": [f"${field}", {}]}}}},
+        {"$unwind": "$kv"},
+        {"$group": {"_id": "$kv.k", "count": {"$sum": "$kv.v"}}},
+        {"$sort": {"count": -1, "_id": 1}},
+    ]
+    if limit:
+        stages.append({"$limit": limit})
+    return stages
+
+
+async def doctor_analytics(doctor_id: str, date_from: datetime, date_to: datetime,
+                           top_diseases: int = DOCTOR_ANALYTICS_TOP_DISEASES) -> dict:
+    """
+    Counts by urgency, disease, day and alert status for [date_from, date_to).
+    Rollups are per UTC day, so the window is widened to whole days.
+    """
+    pipeline = [
+        {"$match": {"doctor_id": doctor_id, "day": {"$gte": _day(date_from), "$lt": date_to}}},
+        {"$facet": {
+            "total": [{"$group": {"_id": None, "count": {"$sum": "$total"}}}],
+            "by_day": [{"$sort": {"day": 1}},
+                       {"$project": {"_id": 0, "day": 1, "total": 1, "urgency": 1, "alert": 1}}],
+            "by_urgency": _sum_map("urgency"),
+            "by_disease": _sum_map("disease", top_diseases),
+            "by_alert": _sum_map("alert"),
+        }},
+    ]
+    facets = (await async_col(DOCTOR_DAILY_STATS).aggregate(pipeline).to_list(length=1))[0]
+
+    def as_dict(rows):
+        return {row["_id"]: row["count"] for row in rows}
+
+    return {
+        "doctor_id": doctor_id,
+        "date_from": date_from,
+        "date_to": date_to,
+        "total_audits": facets["total"][0]["count"] if facets["total"] else 0,
+        "by_urgency": as_dict(facets["by_urgency"]),
+        "by_disease": as_dict(facets["by_disease"]),
+        "by_alert": as_dict(facets["by_alert"]),
+        "by_day": [
+            {"day": row["day"].strftime("%Y-%m-%d"), "total": row.get("total", 0),
+             "urgency": row.get("urgency", {}), "alert": row.get("alert", {})}
+            for row in facets["by_day"]
+        ],
+    }
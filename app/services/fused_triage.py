@@ -0,0 +1,109 @@
+from datetime import datetime
+from typing import Optional
+
+from app.utils.gemini_utils import call_gemini_api_async
+from app.utils.executors import run_io
+from app.services.Seperate_pateint_context import search_kb
+from app.services.text_profilling import attach_doctor
+
+# ------------------- Fused Extract + Triage -------------------
+# One Gemini call that both isolates the patient's statements from a
+# doctor-patient transcript and triages them. Returns None when the response
+# does not match the schema, so callers can fall back to the two-call path
+# (extract_patient_context_from_transcript, then Risk_Analysis).
+
+REQUIRED_ANALYSIS_KEYS = ("urgency", "recommended_specialist")
+
+
+def _build_fused_prompt(transcribed_text: str, patient_data: dict, kb_examples: list, timestamp: str) -> str:
+    kb_str = "\n".join([f"- {ex}" for ex in kb_examples])
+    return f"""
+You are a medical conversation analyzer and AI-powered medical triage assistant
+(trained on WHO, Mayo Clinic, and PubMed data).
+
+### Step 1 - Patient context:
+Extract ONLY the patient's statements from the doctor-patient conversation below
+(symptoms, feelings, conditions, health questions, medical history, medications).
+Do NOT include statements or advice from the doctor, meta-text or unrelated content.
+Preserve the order of patient statements and do not add any interpretation.
+Use the patient knowledge base examples to guide the extraction.
+
+### Step 2 - Triage:
+Using ONLY the patient context from Step 1 and the patient data, extract:
+1. Key symptoms
+2. Urgency level (high, medium, low)
+3. Probable disease name
+4. Which specialist doctor to contact
+5. Brief medical advice
+
+### Patient Data:
+- Age: {patient_data.get("age")}
+- Gender: {patient_data.get("gender")}
+- Previous condition: {patient_data.get("previous_situation")}
+- Time: {timestamp}
+
+### Transcript:
+{transcribed_text}
+
+### Relevant Knowledge Base Examples:
+{kb_str}
+
+### Output Schema (must be valid JSON):
+{{
+  "patient_context": "string",
+  "analysis": [
+    {{
+      "symptoms": ["string"],
+      "disease": "string",
+      "probability": 0,
+      "urgency": "string",
+      "possible_causes": "string",
+      "recommended_specialist": "string",
+      "advice": "string"
+    }}
+  ]
+}}
+Only return the JSON, nothing else.
+"""
+
+
+def _validate(parsed) -> Optional[dict]:
+    """Normalize a fused response, or None if it does not match the schema."""
+    if not isinstance(parsed, dict) or "error" in parsed:
+        return None
+
+    context = parsed.get("patient_context")
+    analysis = parsed.get("analysis")
+    if isinstance(analysis, dict):
+        analysis = [analysis]
+    if not isinstance(context, str) or not context.strip() or not isinstance(analysis, list) or not analysis:
+        return None
+    if not isinstance(analysis[0], dict) or not all(key in analysis[0] for key in REQUIRED_ANALYSIS_KEYS):
+        return None
+
+    return {"patient_context": context.strip(), "analysis": analysis}
+
+
+async def extract_and_triage(transcribed_text: str, patient_data: dict,
+                             model_preference="gemma-3n-e2b-it") -> Optional[dict]:
+    """
+    Input:
+        transcribed_text: str - raw transcript including doctor and patient conversation
+        patient_data: dict - age, gender, previous_situation
+    Output:
+        {"patient_context": "...", "analysis": [Risk_Analysis item with doctor_id]}
+        or None if the model's response could not be used.
+    """
+    kb_examples = await run_io(search_kb, transcribed_text)
+    # Date granularity keeps identical transcripts cacheable within a day
+    timestamp = datetime.now().strftime("%Y-%m-%d")
+    prompt = _build_fused_prompt(transcribed_text, patient_data, kb_examples, timestamp)
+
+    parsed = await call_gemini_api_async(prompt, model_preference, call_site="extract_and_triage")
+    fused = _validate(parsed)
+    if fused is None:
+        print("Fused extract+triage response unusable, falling back:", str(parsed)[:200])
+        return None
+
+    fused["analysis"] = await attach_doctor(fused["analysis"])
+    return fused
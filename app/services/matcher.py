@@ -1,14 +1,157 @@
-from sentence_transformers import SentenceTransformer, util
 from typing import List, Optional
+import threading
+import numpy as np
 from app.DataBase import doctor_specialists_col  # MongoDB collection
+from app.utils.embedding_cache import encode_cached
+from app.core.config import EMBEDDING_MODEL_NAME
 import warnings
 warnings.filterwarnings("ignore", category=FutureWarning)
-# ------------------- Load Model Globally -------------------
-print("================ Loading Semantic Matcher ==================")
-model = SentenceTransformer('all-MiniLM-L6-v2', device='cpu')
-print("================ Model Loaded ==================")
+# ------------------- Semantic Matcher Model -------------------
+# Shared, lazily loaded instance (see app/utils/model_registry.py)
+MODEL_NAME = EMBEDDING_MODEL_NAME
+
+# ------------------- Specialist Embedding Index -------------------
+# Unique specialist strings -> L2-normalized embedding rows, plus the doctors
+# registered under each specialist. Built once at startup and kept in sync by
+# add_specialist_to_index / remove_doctor_from_index.
+SPECIALIST_FIELDS = {"_id": 0, "doctor_id": 1, "name": 1, "email": 1, "specialist": 1}
+
+_index_lock = threading.Lock()
+_index_built = False
+_specialist_names: List[str] = []
+_specialist_matrix = np.zeros((0, 0), dtype="float32")
+_specialist_doctors = {}  # specialist -> [doctor dict, ...] (insertion order)
+
+
+def _encode_normalized(texts: List[str]) -> np.ndarray:
+    """Encode texts (through the embedding cache) into float32 unit vectors (rows)."""
+    embeddings = encode_cached(texts, MODEL_NAME)
+    norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return embeddings / norms
+
+
+def _doctor_entry(doc: dict) -> dict:
+    return {key: doc.get(key) for key in ("doctor_id", "name", "email", "specialist")}
+
+
+def build_specialist_index() -> int:
+    """
+    (Re)build the specialist index from doctor_specialists_col.
+    Returns the number of unique specialists indexed.
+    """
+    global _index_built, _specialist_names, _specialist_matrix, _specialist_doctors
+
+    doctors = list(doctor_specialists_col.find({}, SPECIALIST_FIELDS))
+
+    specialist_doctors = {}
+    for doc in doctors:
+        if not doc.get("specialist"):
+            continue
+        specialist_doctors.setdefault(doc["specialist"], []).append(_doctor_entry(doc))
+
+    names = list(specialist_doctors.keys())
+    matrix = _encode_normalized(names) if names else np.zeros((0, 0), dtype="float32")
+
+    with _index_lock:
+        _specialist_names = names
+        _specialist_matrix = matrix
+        _specialist_doctors = specialist_doctors
+        _index_built = True
+
+    print(f"================ Specialist index built: {len(names)} specialists, {len(doctors)} doctors ==================")
+    return len(names)
+
+
+def _ensure_index():
+    if not _index_built:
+        build_specialist_index()
+
+
+def add_specialist_to_index(doc: dict):
+    """Register a newly inserted doctor_specialists row in the index."""
+    global _specialist_names, _specialist_matrix
+
+    specialist = doc.get("specialist")
+    if not specialist or not _index_built:
+        return
+
+    # Encode outside the lock; only new specialist strings cost a model call
+    with _index_lock:
+        is_new = specialist not in _specialist_doctors
+    new_row = _encode_normalized([specialist]) if is_new else None
+
+    with _index_lock:
+        doctors = _specialist_doctors.setdefault(specialist, [])
+        if not any(d["doctor_id"] == doc.get("doctor_id") for d in doctors):
+            doctors.append(_doctor_entry(doc))
+        if specialist not in _specialist_names:
+            _specialist_names = _specialist_names + [specialist]
+            _specialist_matrix = new_row if _specialist_matrix.size == 0 else np.vstack([_specialist_matrix, new_row])
+
+
+def remove_doctor_from_index(doctor_id: str):
+    """Drop a doctor from the index; specialists left without doctors are removed."""
+    global _specialist_names, _specialist_matrix
+
+    if not _index_built:
+        return
+
+    with _index_lock:
+        emptied = []
+        for specialist, doctors in _specialist_doctors.items():
+            doctors[:] = [d for d in doctors if d["doctor_id"] != doctor_id]
+            if not doctors:
+                emptied.append(specialist)
+
+        if not emptied:
+            return
+
+        for specialist in emptied:
+            del _specialist_doctors[specialist]
+        keep = [i for i, name in enumerate(_specialist_names) if name not in emptied]
+        _specialist_names = [_specialist_names[i] for i in keep]
+        _specialist_matrix = _specialist_matrix[keep] if keep else np.zeros((0, 0), dtype="float32")
 
 # ------------------- Semantic Specialist + Doctor Fetch -------------------
+def get_doctors_by_semantic_specialists(
+    ai_recommended_list: List[str],
+    threshold: float = 0.35
+) -> List[Optional[dict]]:
+    """
+    Vectorized version of get_doctor_by_semantic_specialist: encodes all
+    recommendations in one batch and scores them with one matrix product.
+    Returns one doctor dict (or None) per input, in order.
+    """
+    _ensure_index()
+
+    with _index_lock:
+        names = _specialist_names
+        matrix = _specialist_matrix
+        specialist_doctors = _specialist_doctors
+
+    if not names or not ai_recommended_list:
+        return [None] * len(ai_recommended_list)
+
+    # (n_specialists x dim) @ (dim x n_queries); rows are unit vectors
+    query_embeddings = _encode_normalized([str(q) for q in ai_recommended_list])
+    cosine_scores = matrix @ query_embeddings.T
+    best_idx = cosine_scores.argmax(axis=0)
+
+    matches = []
+    with _index_lock:
+        for col, idx in enumerate(best_idx):
+            score = float(cosine_scores[idx, col])
+            doctors = specialist_doctors.get(names[idx])
+            if score < threshold or not doctors:
+                matches.append(None)
+                continue
+            matched_doctor = dict(doctors[0])
+            matched_doctor["similarity"] = score
+            matches.append(matched_doctor)
+    return matches
+
+
 def get_doctor_by_semantic_specialist(
     ai_recommended: str,
     threshold: float = 0.35
@@ -17,32 +160,8 @@ def get_doctor_by_semantic_specialist(
     Match AI recommended specialist to DB specialist using semantic search,
     then return doctor info: doctor_id, name, email, specialist.
     """
-    # Fetch all specialists from DB
-    doctors = list(doctor_specialists_col.find({}, {"_id":0, "doctor_id":1, "name":1, "email":1, "specialist":1}))
-    print("=================",doctors)
-    
-    if not doctors:
-        return None
-
-    # Prepare list of canonical specialist names
-    specialist_list = [doc["specialist"] for doc in doctors]
-
-    # Encode embeddings
-    specialist_embeddings = model.encode(specialist_list, convert_to_tensor=True)
-    ai_embedding = model.encode(ai_recommended, convert_to_tensor=True)
-
-    # Compute cosine similarities
-    cosine_scores = util.cos_sim(ai_embedding, specialist_embeddings)[0]
-    max_idx = cosine_scores.argmax()
-    max_score = cosine_scores[max_idx].item()
-
-    if max_score >= threshold:
-        # Return matched doctor info
-        matched_doctor = doctors[max_idx]
-        matched_doctor["similarity"] = max_score
-        return matched_doctor
-    else:
-        return None
+    # One query encode + one matrix-vector product against the index
+    return get_doctors_by_semantic_specialists([ai_recommended], threshold)[0]
 
 # ------------------- Example Usage -------------------
 if __name__ == "__main__":
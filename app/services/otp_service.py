@@ -0,0 +1,36 @@
+from datetime import datetime, timedelta
+import random
+
+from app.AsyncDataBase import async_col, OTP_CODES
+from app.core.config import OTP_TTL_SECONDS
+
+# ------------------- Signup OTPs -------------------
+# One pending code per (role, email) in otp_codes; a TTL index on expires_at
+# (app/db_indexes.py) removes unused codes. Verifying consumes the code.
+
+
+def _otp_id(email: str, role: str) -> str:
+    return f"{role}:{email}"
+
+
+async def issue_otp(email: str, role: str) -> str:
+    """Create (or replace) the pending OTP for this account and return it."""
+    otp = str(random.randint(100000, 999999))
+    await async_col(OTP_CODES).replace_one(
+        {"_id": _otp_id(email, role)},
+        {"email": email, "role": role, "otp": otp,
+         "expires_at": datetime.utcnow() + timedelta(seconds=OTP_TTL_SECONDS)},
+        upsert=True,
+    )
+    return otp
+
+
+async def consume_otp(email: str, role: str, otp: str) -> bool:
+    """True (and the code is deleted) if otp matches an unexpired code."""
+    # The TTL monitor runs about once a minute: check expiry explicitly too
+    doc = await async_col(OTP_CODES).find_one_and_delete({
+        "_id": _otp_id(email, role),
+        "otp": str(otp),
+        "expires_at": {"$gt": datetime.utcnow()},
+    })
+    return doc is not None
@@ -1,25 +1,67 @@
 from app.utils.audio_transcribe import transcribe_audio
 from app.services.Seperate_pateint_context import extract_patient_context_from_transcript
-from app.utils.ProcessAudio import process_audio
+from app.utils.ProcessAudio import process_audio, process_audio_array
+from app.core.config import AUDIO_IN_MEMORY_PIPELINE
+from app.utils.executors import run_cpu, run_io, run_transcription
+from app.utils.timing import StageTimer
+from app.services import transcript_cache
 import warnings
 warnings.filterwarnings("ignore", category=FutureWarning)
+import asyncio
 import os
 
-async def get_patient_context_from_audio(audio_path: str) -> dict:
-    clean_path = await process_audio(audio_path)
+async def get_transcript_from_audio(audio_path: str, timer: StageTimer = None) -> str:
+    """Preprocess + transcribe one audio file (every stage runs off the event loop)."""
+    timer = timer or StageTimer()
 
-    transcript = transcribe_audio(clean_path)
+    if AUDIO_IN_MEMORY_PIPELINE:
+        # Decode once to a 16 kHz float32 buffer; no intermediate WAVs
+        async with timer.stage("preprocess"):
+            audio = await run_cpu(process_audio_array, audio_path)
+
+        async with timer.stage("transcribe"):
+            return await run_transcription(transcribe_audio, audio)
+
+    async with timer.stage("preprocess"):
+        clean_path = await run_cpu(process_audio, audio_path)
+
+    async with timer.stage("transcribe"):
+        transcript = await run_transcription(transcribe_audio, clean_path)
 
     # Now safe to delete
     if os.path.exists(clean_path):
         os.remove(clean_path)
+    return transcript
+
+
+async def get_patient_context_from_audio(audio_path: str, timer: StageTimer = None,
+                                         fingerprint: str = None) -> dict:
+    """
+    fingerprint: transcript-cache key (see transcript_cache.audio_fingerprint);
+    when given, the transcript is stored under it, and the extracted context
+    too unless extraction failed (so a resubmission retries the LLM call).
+    """
+    timer = timer or StageTimer()
+    transcript = await get_transcript_from_audio(audio_path, timer)
+
+    async with timer.stage("extract_context"):
+        context = await extract_patient_context_from_transcript(transcript)
+
+    if fingerprint:
+        fields = {"transcript": transcript}
+        if context_ok(context):
+            fields["patient_context"] = context
+        await run_io(transcript_cache.store, fingerprint, fields)
+    return context
 
-    return extract_patient_context_from_transcript(transcript)
 
+def context_ok(context: dict) -> bool:
+    """Cacheable extraction result: non-empty and not an LLM failure."""
+    return "error" not in context and bool((context.get("patient_context") or "").strip())
 
 
 #Example :
 if __name__ == "__main__":
     path ="videoplayback.weba"
-    l = get_patient_context_from_audio(path)
-    print(l)
\ No newline at end of file
+    l = asyncio.run(get_patient_context_from_audio(path))
+    print(l)
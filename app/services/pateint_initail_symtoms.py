@@ -1,10 +1,12 @@
 import json
 from app.schemas.medical_schemas import UserSymptomsRequest
-from app.utils.gemini_utils import call_gemini_api
+from app.utils.gemini_utils import call_gemini_api_async
+from app.utils.executors import run_io
+import asyncio
 from app.services.matcher import get_doctor_by_semantic_specialist
 import warnings
 warnings.filterwarnings("ignore", category=FutureWarning)
-def diseases_Recognize(data: User_SymptomsRequest, model_preference="gemma-3n-e2b-it"):
+async def diseases_Recognize(data: UserSymptomsRequest, model_preference="gemma-3n-e2b-it"):
     """
     Recognize the best matching disease from given symptoms using Gemini API
     and attach matched doctor info from the database.
@@ -44,7 +46,7 @@ Output must be pure JSON with the following schema:
 """
 
     # Call Gemini API
-    parsed_data = call_gemini_api(prompt, model_preference)
+    parsed_data = await call_gemini_api_async(prompt, model_preference, call_site="diseases_recognize")
     
     if "error" in parsed_data:
         return parsed_data
@@ -52,7 +54,7 @@ Output must be pure JSON with the following schema:
     # Match Doctor
     if parsed_data and isinstance(parsed_data, dict) and "recommended_specialist" in parsed_data:
         specialist_name = parsed_data["recommended_specialist"]
-        doctor_info = get_doctor_by_semantic_specialist(specialist_name)
+        doctor_info = await run_io(get_doctor_by_semantic_specialist, specialist_name)
 
         if doctor_info:
             parsed_data["doctor_id"] = doctor_info.get("doctor_id")
@@ -70,6 +72,6 @@ if __name__ == "__main__":
         gender = "Female"
         symptoms = ["chest pain", "shortness of breath"]
 
-    result = diseases_Recognize(Dummy())
+    result = asyncio.run(diseases_Recognize(Dummy()))
     print("\nAI Diagnosis Result with Matched Doctor:\n")
     print(json.dumps(result, indent=2, ensure_ascii=False))
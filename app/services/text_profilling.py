@@ -1,17 +1,22 @@
 from datetime import datetime
 import json
-from app.utils.gemini_utils import call_gemini_api
+from typing import List, Optional
+import asyncio
+from app.utils.gemini_utils import call_gemini_api_async
+from app.utils.executors import run_io
 from app.DataBase import doctor_specialists_col
-from app.services.matcher import get_doctor_by_semantic_specialist
+from app.services.matcher import get_doctor_by_semantic_specialist, get_doctors_by_semantic_specialists
+from app.core.config import TRIAGE_BATCH_SIZE
 
-def Risk_Analysis(data, model_preference="gemma-3n-e2b-it"):
+async def Risk_Analysis(data, model_preference="gemma-3n-e2b-it"):
     # Patient Data
     patient_age = data.get("age")
     patient_gender = data.get("gender",)
     patient_current_situation = data.get("current_situation")
     patient_previous_situation = data.get("previous_situation")
 
-    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    # Date granularity keeps identical descriptions cacheable within a day
+    timestamp = datetime.now().strftime("%Y-%m-%d")
 
     patient_text = (
         f"Previous condition: {patient_previous_situation}\n"
@@ -52,7 +57,7 @@ Only return the JSON, nothing else.
 """
 
     # Call Gemini API
-    parsed_data = call_gemini_api(prompt, model_preference)
+    parsed_data = await call_gemini_api_async(prompt, model_preference, call_site="risk_analysis")
     
     if "error" in parsed_data:
         return [parsed_data]
@@ -60,14 +65,117 @@ Only return the JSON, nothing else.
     if not isinstance(parsed_data, list):
         parsed_data = [parsed_data]
 
-    # Match Doctor from DB
+    return await attach_doctor(parsed_data)
+
+async def attach_doctor(parsed_data: List[dict]) -> List[dict]:
+    """Match Doctor from DB for the first analysis item (sets "doctor_id")."""
     if parsed_data and "recommended_specialist" in parsed_data[0]:
         specialist_name = parsed_data[0]["recommended_specialist"]
-        doctor_id = get_doctor_by_semantic_specialist(specialist_name)
+        doctor_id = await run_io(get_doctor_by_semantic_specialist, specialist_name)
         parsed_data[0]["doctor_id"] = doctor_id
 
     return parsed_data
 
+# ------------------- Batch Triage -------------------
+def _build_batch_prompt(patients: List[dict], timestamp: str) -> str:
+    patient_blocks = []
+    for idx, data in enumerate(patients):
+        patient_blocks.append(
+            f"#### patient_index: {idx}\n"
+            f"- Age: {data.get('age')}\n"
+            f"- Gender: {data.get('gender')}\n"
+            f"- Description: Previous condition: {data.get('previous_situation')}\n"
+            f"  Current condition: {data.get('current_situation')}"
+        )
+    patients_str = "\n\n".join(patient_blocks)
+
+    return f"""
+You are an AI-powered medical triage assistant (trained on WHO, Mayo Clinic, and PubMed data).
+
+### Objective:
+For EACH patient below, independently analyze the description and extract:
+1. Key symptoms
+2. Urgency level (high, medium, low)
+3. Probable disease name
+4. Which specialist doctor to contact
+5. Brief medical advice
+
+### Patients ({len(patients)} total, Time: {timestamp}):
+{patients_str}
+
+### Output Schema (must be valid JSON, exactly one object per patient, same order):
+[
+  {{
+    "patient_index": 0,
+    "symptoms": ["string"],
+    "disease": "string",
+    "probability": 0,
+    "urgency": "string",
+    "possible_causes": "string",
+    "recommended_specialist": "string",
+    "advice": "string"
+  }}
+]
+Only return the JSON array, nothing else.
+"""
+
+
+async def Risk_Analysis_Batch(patients: List[dict], model_preference: Optional[str] = None,
+                              batch_size: int = TRIAGE_BATCH_SIZE):
+    """
+    Triage many patients with one Gemini call per `batch_size` patients
+    (instead of one per patient; chunks run concurrently), then match
+    specialists for the whole batch in one vectorized pass.
+
+    model_preference: None lets the router choose within risk_analysis_batch.
+    Returns one list per patient, in input order, shaped like Risk_Analysis()
+    output (a single-element list, or [{"error": ...}]).
+    """
+    timestamp = datetime.now().strftime("%Y-%m-%d")
+    results = [None] * len(patients)
+
+    starts = list(range(0, len(patients), batch_size))
+    responses = await asyncio.gather(*[
+        call_gemini_api_async(_build_batch_prompt(patients[start:start + batch_size], timestamp),
+                              model_preference, call_site="risk_analysis_batch")
+        for start in starts
+    ])
+
+    for start, parsed_data in zip(starts, responses):
+        chunk = patients[start:start + batch_size]
+
+        if isinstance(parsed_data, dict):
+            if "error" in parsed_data:
+                for offset in range(len(chunk)):
+                    results[start + offset] = [parsed_data]
+                continue
+            parsed_data = [parsed_data]
+
+        # Map by patient_index; fall back to position if the model dropped it
+        for position, item in enumerate(parsed_data):
+            if not isinstance(item, dict):
+                continue
+            idx = item.pop("patient_index", position)
+            try:
+                idx = int(idx)
+            except (TypeError, ValueError):
+                idx = position
+            if 0 <= idx < len(chunk) and results[start + idx] is None:
+                results[start + idx] = [item]
+
+        for offset in range(len(chunk)):
+            if results[start + offset] is None:
+                results[start + offset] = [{"error": "No triage result returned for patient"}]
+
+    # Match Doctors from DB (one encode + one matrix product for the batch)
+    to_match = [r[0] for r in results if "recommended_specialist" in r[0]]
+    if to_match:
+        doctors = await run_io(get_doctors_by_semantic_specialists, [r["recommended_specialist"] for r in to_match])
+        for item, doctor in zip(to_match, doctors):
+            item["doctor_id"] = doctor
+
+    return results
+
 # ------------------- Example Test -------------------
 if __name__ == "__main__":
     class DummyPatient:
@@ -78,6 +186,6 @@ if __name__ == "__main__":
             "গতকাল থেকে বুক ধড়ফড় করছে, মাথা ঘোরে, শ্বাস নিতে কষ্ট হয়। মাঝে মাঝে বুকে ব্যথা হয়।"
         )
 
-    result = Risk_Analysis(DummyPatient(), model_preference="gemma-3n-e2b-it")
+    result = asyncio.run(Risk_Analysis(DummyPatient(), model_preference="gemma-3n-e2b-it"))
     print("\n🩺 AI Diagnosis Result:\n")
     print(json.dumps(result, indent=2, ensure_ascii=False))
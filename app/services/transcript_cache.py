@@ -0,0 +1,70 @@
+import hashlib
+import json
+import threading
+from datetime import datetime
+from typing import Optional
+
+from app.DataBase import transcript_cache_col
+from app.core.config import (
+    TRANSCRIPT_CACHE_ENABLED, TRANSCRIPT_PIPELINE_VERSION,
+    AUDIO_IN_MEMORY_PIPELINE,
+)
+from app.utils.audio_transcribe import WHISPER_CONFIG
+
+# ------------------- Transcript Cache -------------------
+# _id = sha256(audio bytes) + pipeline config version. Entries hold the
+# transcript, the extracted patient context and risk analyses per input,
+# and expire through a TTL index on created_at (app/db_indexes.py).
+
+PIPELINE_CONFIG_VERSION = hashlib.sha256(json.dumps({
+    "version": TRANSCRIPT_PIPELINE_VERSION,
+    "whisper": WHISPER_CONFIG,
+    "in_memory": AUDIO_IN_MEMORY_PIPELINE,
+}, sort_keys=True).encode()).hexdigest()[:12]
+
+_stats_lock = threading.Lock()
+_stats = {"hits": 0, "misses": 0}
+
+
+def audio_fingerprint(audio_path: str) -> str:
+    """Content hash of the upload, scoped to the current pipeline config."""
+    digest = hashlib.sha256()
+    with open(audio_path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return f"{digest.hexdigest()}:{PIPELINE_CONFIG_VERSION}"
+
+
+def input_fingerprint(data: dict) -> str:
+    """Short stable hash for per-input entries (e.g. the risk analysis input)."""
+    return hashlib.sha256(json.dumps(data, sort_keys=True, default=str).encode()).hexdigest()[:16]
+
+
+def get_cached(fingerprint: str) -> Optional[dict]:
+    if not TRANSCRIPT_CACHE_ENABLED:
+        return None
+    entry = transcript_cache_col.find_one({"_id": fingerprint})
+    with _stats_lock:
+        _stats["hits" if entry else "misses"] += 1
+    return entry
+
+
+def store(fingerprint: str, fields: dict):
+    """Upsert fields (dotted paths allowed) into the cache entry."""
+    if not TRANSCRIPT_CACHE_ENABLED:
+        return
+    transcript_cache_col.update_one(
+        {"_id": fingerprint},
+        {"$set": fields, "$setOnInsert": {"created_at": datetime.utcnow()}},
+        upsert=True,
+    )
+
+
+def transcript_cache_stats() -> dict:
+    with _stats_lock:
+        stats = dict(_stats)
+    lookups = stats["hits"] + stats["misses"]
+    stats["hit_rate"] = round(stats["hits"] / lookups, 4) if lookups else 0.0
+    stats["enabled"] = TRANSCRIPT_CACHE_ENABLED
+    stats["pipeline_config_version"] = PIPELINE_CONFIG_VERSION
+    return stats
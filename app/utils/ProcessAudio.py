@@ -1,13 +1,17 @@
+import io
 import os
+from typing import Union
 from pydub import AudioSegment, effects
 from scipy.io.wavfile import write
 import librosa
 import noisereduce as nr
 import numpy as np
-from app.core.config import UPLOAD_FOLDER
-async def process_audio(recording_path: str) -> str:
+def process_audio(recording_path: str, output_dir: str = None) -> str:
+    # CPU-bound: callers on the event loop should use executors.run_cpu
     FS = 16000
-    OUTPUT_DIR = UPLOAD_FOLDER
+    # Intermediates live next to the upload (its per-request workspace),
+    # so concurrent requests never overwrite each other's files
+    OUTPUT_DIR = output_dir or os.path.dirname(os.path.abspath(recording_path))
     os.makedirs(OUTPUT_DIR, exist_ok=True)
 
     # Use format-auto detection
@@ -24,4 +28,38 @@ async def process_audio(recording_path: str) -> str:
     clean_path = os.path.join(OUTPUT_DIR, "patient_final.wav")
     write(clean_path, sr, (reduced_noise * 32767).astype(np.int16))
 
-    return clean_path  
+    return clean_path
+
+
+# ------------------- In-Memory Pipeline -------------------
+TARGET_SR = 16000
+# Same peak target as pydub.effects.normalize (headroom=0.1 dB)
+NORMALIZE_PEAK = 10 ** (-0.1 / 20)
+
+
+def process_audio_array(source: Union[str, bytes]) -> np.ndarray:
+    """
+    Decode once to a mono float32 16 kHz buffer, peak-normalize and denoise
+    without any intermediate WAV files. The result can be passed straight
+    to WhisperModel.transcribe. CPU-bound: use executors.run_cpu on the event loop.
+    """
+    audio = AudioSegment.from_file(io.BytesIO(source) if isinstance(source, bytes) else source)
+
+    y = np.frombuffer(audio.raw_data, dtype=f"<i{audio.sample_width}") if audio.sample_width in (2, 4) \
+        else np.array(audio.get_array_of_samples())
+    y = y.astype(np.float32)
+    if audio.channels > 1:
+        y = y.reshape(-1, audio.channels).mean(axis=1, dtype=np.float32)
+    y *= 1.0 / float(1 << (8 * audio.sample_width - 1))
+
+    if audio.frame_rate != TARGET_SR:
+        y = librosa.resample(y, orig_sr=audio.frame_rate, target_sr=TARGET_SR)
+
+    # Normalize in place
+    peak = float(np.max(np.abs(y))) if y.size else 0.0
+    if peak > 0:
+        y *= NORMALIZE_PEAK / peak
+
+    # Noise Reduction
+    reduced_noise = nr.reduce_noise(y=y, sr=TARGET_SR, prop_decrease=0.8)
+    return np.ascontiguousarray(reduced_noise, dtype=np.float32)
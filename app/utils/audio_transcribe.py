@@ -1,17 +1,97 @@
-
+import threading
 import time
+from collections import deque
+from typing import Union
+import numpy as np
 from faster_whisper import WhisperModel
+from app.core.config import (
+    WHISPER_MODEL_SIZE, WHISPER_DEVICE, WHISPER_COMPUTE_TYPE, WHISPER_CPU_THREADS,
+    WHISPER_NUM_WORKERS, WHISPER_BEAM_SIZE, WHISPER_VAD_FILTER, WHISPER_LANGUAGE,
+)
+
+# ------------------- Engine Config -------------------
+WHISPER_CONFIG = {
+    "model_size": WHISPER_MODEL_SIZE,
+    "device": WHISPER_DEVICE,
+    "compute_type": WHISPER_COMPUTE_TYPE,
+    "cpu_threads": WHISPER_CPU_THREADS,
+    "num_workers": WHISPER_NUM_WORKERS,
+    "beam_size": WHISPER_BEAM_SIZE,
+    "vad_filter": WHISPER_VAD_FILTER,
+    "language": WHISPER_LANGUAGE or None,
+}
+
+_model = None
+_model_lock = threading.Lock()
+
+
+def get_whisper_model() -> WhisperModel:
+    """Load the Whisper model once (lazily) with the configured engine settings."""
+    global _model
+    if _model is None:
+        with _model_lock:
+            if _model is None:
+                print(f"================ Loading Whisper: {WHISPER_CONFIG} ==================")
+                _model = WhisperModel(
+                    WHISPER_MODEL_SIZE,
+                    device=WHISPER_DEVICE,
+                    compute_type=WHISPER_COMPUTE_TYPE,
+                    cpu_threads=WHISPER_CPU_THREADS,
+                    num_workers=WHISPER_NUM_WORKERS,
+                )
+    return _model
 
-# Load the medium model globally for reuse (more accurate but heavier)
-model = WhisperModel("small", device="cpu", compute_type="float32")
 
-def transcribe_audio(audio_path: str) -> str:
+def whisper_transcribe_kwargs() -> dict:
+    return {
+        "beam_size": WHISPER_BEAM_SIZE,
+        "vad_filter": WHISPER_VAD_FILTER,
+        "language": WHISPER_LANGUAGE or None,
+    }
+
+
+def warmup_whisper():
+    """Load the model and run one short decode so the first request pays no init cost."""
     start = time.time()
-    
-    # Convert to WAV if needed (make sure you have this function)
-    
-    # Transcribe audio using the medium model
-    segments_generator, info = model.transcribe(audio_path)
+    segments, _ = get_whisper_model().transcribe(np.zeros(16000, dtype=np.float32), **whisper_transcribe_kwargs())
+    list(segments)
+    print(f"Whisper warm-up took {time.time() - start:.2f} seconds")
+
+# ------------------- Real-Time-Factor Metrics -------------------
+_metrics_lock = threading.Lock()
+_recent_rtf = deque(maxlen=200)
+_metrics = {"requests": 0, "audio_seconds": 0.0, "processing_seconds": 0.0}
+
+
+def record_transcription(audio_seconds: float, processing_seconds: float):
+    rtf = processing_seconds / audio_seconds if audio_seconds > 0 else None
+    with _metrics_lock:
+        _metrics["requests"] += 1
+        _metrics["audio_seconds"] += audio_seconds
+        _metrics["processing_seconds"] += processing_seconds
+        if rtf is not None:
+            _recent_rtf.append(rtf)
+    return rtf
+
+
+def get_transcription_metrics() -> dict:
+    with _metrics_lock:
+        recent = sorted(_recent_rtf)
+        metrics = dict(_metrics)
+    metrics["overall_rtf"] = round(metrics["processing_seconds"] / metrics["audio_seconds"], 4) if metrics["audio_seconds"] else None
+    metrics["p50_rtf"] = round(recent[len(recent) // 2], 4) if recent else None
+    metrics["p95_rtf"] = round(recent[min(len(recent) - 1, int(len(recent) * 0.95))], 4) if recent else None
+    metrics["audio_seconds"] = round(metrics["audio_seconds"], 2)
+    metrics["processing_seconds"] = round(metrics["processing_seconds"], 2)
+    metrics["config"] = WHISPER_CONFIG
+    return metrics
+
+
+def transcribe_audio(audio_path: Union[str, np.ndarray]) -> str:
+    # audio_path: file path, or a mono float32 16 kHz buffer (see process_audio_array)
+    start = time.time()
+
+    segments_generator, info = get_whisper_model().transcribe(audio_path, **whisper_transcribe_kwargs())
     
     segments = list(segments_generator)
     
@@ -21,8 +101,10 @@ def transcribe_audio(audio_path: str) -> str:
     
     transcript = " ".join(segment.text for segment in segments)
     
-    end = time.time()
-    print(f"Transcription took {end - start:.2f} seconds")
+    elapsed = time.time() - start
+    rtf = record_transcription(info.duration, elapsed)
+    rtf_str = f"{rtf:.3f}" if rtf is not None else "n/a"
+    print(f"Transcription took {elapsed:.2f} seconds for {info.duration:.2f}s of audio (RTF {rtf_str})")
     print(transcript)
     
     return transcript
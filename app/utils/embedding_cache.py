@@ -0,0 +1,102 @@
+import hashlib
+import os
+import threading
+from typing import List
+
+import numpy as np
+
+from app.core.config import EMBEDDING_CACHE_SIZE, EMBEDDING_CACHE_DIR, EMBEDDING_MODEL_NAME
+from app.utils.cache import LRUCache, MISSING
+from app.utils.model_registry import get_sentence_model
+
+# ------------------- Query Embedding Cache -------------------
+# Keyed by (model_name, normalized text). Entries evicted from memory are
+# spilled to EMBEDDING_CACHE_DIR (if set) as .npy files and reloaded on miss.
+
+_disk_lock = threading.Lock()
+disk_hits = 0
+
+
+def normalize_text(text: str) -> str:
+    """Collapse whitespace so trivially different strings share an entry."""
+    return " ".join(str(text).split())
+
+
+def _spill_path(key) -> str:
+    model_name, text = key
+    digest = hashlib.sha1(f"{model_name}\x00{text}".encode("utf-8")).hexdigest()
+    return os.path.join(EMBEDDING_CACHE_DIR, model_name.replace("/", "_"), f"{digest}.npy")
+
+
+def _spill_to_disk(key, vector):
+    path = _spill_path(key)
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            np.save(f, vector)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        print("Embedding cache spill error:", e)
+
+
+def _load_from_disk(key):
+    global disk_hits
+    path = _spill_path(key)
+    if not os.path.exists(path):
+        return None
+    try:
+        vector = np.load(path)
+    except (OSError, ValueError):
+        return None
+    with _disk_lock:
+        disk_hits += 1
+    return vector
+
+
+_cache = LRUCache(
+    maxsize=EMBEDDING_CACHE_SIZE,
+    on_evict=_spill_to_disk if EMBEDDING_CACHE_DIR else None,
+)
+
+
+def encode_cached(texts: List[str], model_name: str = EMBEDDING_MODEL_NAME) -> np.ndarray:
+    """
+    Encode texts with the shared model_name model, serving repeated strings
+    from the cache. Only cache misses are sent to the model, in a single
+    batched call (so an all-hit lookup never touches or loads the model).
+    Returns a float32 array of shape (len(texts), dim).
+    """
+    keys = [(model_name, normalize_text(t)) for t in texts]
+    vectors = [None] * len(keys)
+    missing = {}  # key -> [positions]
+
+    for i, key in enumerate(keys):
+        vector = _cache.get(key)
+        if vector is MISSING and EMBEDDING_CACHE_DIR:
+            vector = _load_from_disk(key)
+            if vector is not None:
+                _cache.set(key, vector)
+        if vector is MISSING or vector is None:
+            missing.setdefault(key, []).append(i)
+        else:
+            vectors[i] = vector
+
+    if missing:
+        miss_keys = list(missing.keys())
+        model = get_sentence_model(model_name)
+        encoded = model.encode([k[1] for k in miss_keys], convert_to_numpy=True).astype("float32")
+        for key, vector in zip(miss_keys, encoded):
+            vector.setflags(write=False)
+            _cache.set(key, vector)
+            for i in missing[key]:
+                vectors[i] = vector
+
+    return np.vstack(vectors) if vectors else np.zeros((0, 0), dtype="float32")
+
+
+def cache_stats() -> dict:
+    stats = _cache.stats()
+    stats["disk_hits"] = disk_hits
+    stats["disk_spill"] = bool(EMBEDDING_CACHE_DIR)
+    return stats
@@ -0,0 +1,74 @@
+import asyncio
+import functools
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from app.core.config import AUDIO_PROCESS_WORKERS, IO_THREAD_WORKERS, MAX_CONCURRENT_TRANSCRIPTIONS
+
+# ------------------- Worker Pools -------------------
+# CPU-bound audio preprocessing (pydub / librosa / noisereduce) -> process pool
+# Whisper decoding (CTranslate2 releases the GIL, model shared) -> transcription threads
+# Blocking I/O (Cloudinary, Gemini, pymongo, SMTP) -> I/O thread pool
+
+_lock = threading.Lock()
+_cpu_pool = None
+_io_pool = None
+_transcribe_pool = None
+
+
+def _get_cpu_pool() -> ProcessPoolExecutor:
+    global _cpu_pool
+    with _lock:
+        if _cpu_pool is None:
+            # spawn: forking a process that already holds torch/CT2 threads is unsafe
+            _cpu_pool = ProcessPoolExecutor(
+                max_workers=AUDIO_PROCESS_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _cpu_pool
+
+
+def _get_io_pool() -> ThreadPoolExecutor:
+    global _io_pool
+    with _lock:
+        if _io_pool is None:
+            _io_pool = ThreadPoolExecutor(max_workers=IO_THREAD_WORKERS, thread_name_prefix="io")
+        return _io_pool
+
+
+def _get_transcribe_pool() -> ThreadPoolExecutor:
+    global _transcribe_pool
+    with _lock:
+        if _transcribe_pool is None:
+            _transcribe_pool = ThreadPoolExecutor(
+                max_workers=MAX_CONCURRENT_TRANSCRIPTIONS, thread_name_prefix="whisper"
+            )
+        return _transcribe_pool
+
+
+async def run_cpu(func, *args, **kwargs):
+    """Run a picklable, CPU-bound function in the process pool."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_get_cpu_pool(), functools.partial(func, *args, **kwargs))
+
+
+async def run_io(func, *args, **kwargs):
+    """Run a blocking I/O call in the I/O thread pool."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_get_io_pool(), functools.partial(func, *args, **kwargs))
+
+
+async def run_transcription(func, *args, **kwargs):
+    """Run a Whisper call; at most MAX_CONCURRENT_TRANSCRIPTIONS run at once."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_get_transcribe_pool(), functools.partial(func, *args, **kwargs))
+
+
+def shutdown_executors():
+    global _cpu_pool, _io_pool, _transcribe_pool
+    with _lock:
+        for pool in (_cpu_pool, _io_pool, _transcribe_pool):
+            if pool is not None:
+                pool.shutdown(wait=False, cancel_futures=True)
+        _cpu_pool = _io_pool = _transcribe_pool = None
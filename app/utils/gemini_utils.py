@@ -1,25 +1,27 @@
 import json
-import google.generativeai as genai
-from app.core.config import GEMINI_API_KEY
+import asyncio
+import time
+from typing import List, Optional
+from app.core.config import LLM_HEDGE_ENABLED, LLM_HEDGE_CALL_SITES
+from app.utils import llm_cache
+from app.utils.llm_client import get_llm_client, LLMError
+from app.utils.executors import run_io
+from app.utils.model_router import router, MODELS_RPD, UTILIZATION_RATIO
+from app.utils import llm_hedge
 
 # ------------------- Rate Limiting Config -------------------
-MODELS_RPD = {
-    "gemini-2.5-pro": 50,
-    "gemini-2.5-flash": 250,
-    "gemini-2.5-flash-lite": 1000,
-    "gemini-2.0-flash": 200,
-    "gemini-2.0-flash-lite": 200,
-    "gemma-3n-e2b-it": 14400,
-}
-
-UTILIZATION_RATIO = 0.8
+# Per-model budgets and the shared quota counters live in model_router.py
 TOTAL_DAILY_LIMIT = int(sum(MODELS_RPD.values()) * UTILIZATION_RATIO)
 
-# Global counters
-requests_done = {model: 0 for model in MODELS_RPD}
-total_requests = 0
-
-genai.configure(api_key=GEMINI_API_KEY)
+# Response cache TTL (seconds) per call site; 0 = never cache
+CALL_SITE_TTLS = {
+    "diseases_recognize": 24 * 3600,   # same signup symptom lists recur
+    "extract_context": 6 * 3600,       # retried transcripts
+    "risk_analysis": 3600,
+    "risk_analysis_batch": 3600,
+    "extract_and_triage": 3600,
+    "default": 3600,
+}
 
 # ------------------- Helper Functions -------------------
 def clean_model_json(raw_text: str) -> str:
@@ -37,35 +39,107 @@ def parse_safe_json(text: str):
         print("JSON Parse Error:", e)
         return {"error": "Invalid JSON format", "raw_output": text}
 
-def check_rate_limits(model_preference: str) -> dict:
-    """Check if rate limits are exceeded."""
-    global total_requests
-    
-    if total_requests >= TOTAL_DAILY_LIMIT:
-        return {"error": "Reached total daily limit."}
-    
-    if requests_done.get(model_preference, 0) >= MODELS_RPD.get(model_preference, 0):
-        return {"error": f"Model {model_preference} reached its daily limit."}
-    
-    return {"status": "ok"}
-
-def call_gemini_api(prompt: str, model_preference: str = "gemma-3n-e2b-it"):
-    """Make API call to Gemini and handle rate limiting."""
-    global total_requests
-    
-    # Check rate limits
-    limit_check = check_rate_limits(model_preference)
-    if "error" in limit_check:
-        return limit_check
-    
-    try:
-        response = genai.GenerativeModel(model_preference).generate_content(prompt)
-        requests_done[model_preference] += 1
-        total_requests += 1
-        
-        cleaned_output = clean_model_json(response.text.strip())
-        return parse_safe_json(cleaned_output)
-        
-    except Exception as e:
-        print("Error calling Gemini API:", e)
-        return {"error": str(e)}
\ No newline at end of file
+def _cache_ttl(call_site: str, cache_ttl: Optional[int]) -> int:
+    return cache_ttl if cache_ttl is not None else CALL_SITE_TTLS.get(call_site, CALL_SITE_TTLS["default"])
+
+async def _routed_generate(prompt: str, model_preference: str, call_site: str,
+                           deadline: Optional[float], tried: List[str], model: Optional[str] = None):
+    """
+    Generate and parse on a routed model, failing over on 429. `tried` is
+    shared with a concurrent hedge so both never land on the same model.
+    model: an already reserved model to start with.
+    """
+    while True:
+        if model is None:
+            model = await run_io(router.reserve, call_site, model_preference, list(tried))
+            if model is None:
+                return {"error": "All models exhausted"}
+        tried.append(model)
+
+        try:
+            started = time.monotonic()
+            # 429s that survive the client's backoff fail over to the next routed model
+            text = await get_llm_client().generate_text(prompt, model, deadline=deadline)
+            llm_hedge.record_latency(model, time.monotonic() - started)
+            return parse_safe_json(clean_model_json(text.strip()))
+
+        except LLMError as e:
+            if e.quota_exhausted:
+                await run_io(router.mark_exhausted, model, str(e))
+                model = None
+                continue
+            print("Error calling Gemini API:", e)
+            return {"error": str(e)}
+
+async def _hedged_generate(prompt: str, model_preference: str, call_site: str,
+                           deadline: Optional[float]):
+    """
+    Fire the primary; if it has not answered within the reserved model's p95
+    latency, fire a second model (only if the router can reserve quota for it)
+    and take the first valid JSON. Failed calls count as "errors", not wins.
+    """
+    tried = []
+    llm_hedge.count(call_site, "calls")
+    # Reserve up front so the delay uses the model the router actually picked
+    primary_model = await run_io(router.reserve, call_site, model_preference, [])
+    if primary_model is None:
+        llm_hedge.count(call_site, "errors")
+        return {"error": "All models exhausted"}
+    primary = asyncio.create_task(
+        _routed_generate(prompt, model_preference, call_site, deadline, tried, primary_model))
+
+    done, _ = await asyncio.wait({primary}, timeout=llm_hedge.hedge_delay(primary_model))
+    if done:
+        result = primary.result()
+        llm_hedge.count(call_site, "primary_wins" if llm_hedge.is_valid(result) else "errors")
+        return result
+
+    hedge_model = await run_io(router.reserve, call_site, None, list(tried))
+    if hedge_model is None:
+        llm_hedge.count(call_site, "budget_skipped")
+        result = await primary
+        llm_hedge.count(call_site, "primary_wins" if llm_hedge.is_valid(result) else "errors")
+        return result
+
+    llm_hedge.count(call_site, "hedges_fired")
+    hedge = asyncio.create_task(_routed_generate(prompt, model_preference, call_site, deadline, tried, hedge_model))
+    result, winner = await llm_hedge.first_valid({primary: "primary", hedge: "hedge"})
+    if winner == "hedge":
+        llm_hedge.count(call_site, "hedge_wins")
+    elif winner == "primary":
+        llm_hedge.count(call_site, "primary_wins")
+    else:
+        llm_hedge.count(call_site, "errors")
+    return result
+
+async def call_gemini_api_async(prompt: str, model_preference: str = "gemma-3n-e2b-it",
+                                call_site: str = "default", cache_ttl: Optional[int] = None,
+                                bypass_cache: bool = False, schema_version: str = "v1",
+                                deadline: Optional[float] = None, hedge: Optional[bool] = None):
+    """
+    Call Gemini, routed to the cheapest model of the call site's class that
+    still has quota (model_preference first): pooled connections, per-call
+    deadline, jittered exponential backoff on 5xx (see llm_client.py) and
+    failover to the next routed model on 429. Parsed responses are cached by
+    (model_preference, normalized prompt, schema_version); cache_ttl overrides
+    the call site's TTL and bypass_cache skips the lookup.
+    hedge: race a second model when the first is slow (see llm_hedge.py);
+    defaults to LLM_HEDGE_ENABLED for the call sites in LLM_HEDGE_CALL_SITES.
+    """
+    # Cache and quota store may be Mongo-backed: keep their I/O off the event loop
+    cached = await run_io(llm_cache.get, model_preference, prompt, schema_version, call_site, bypass_cache)
+    if cached is not llm_cache.MISSING:
+        return cached
+
+    if hedge is None:
+        hedge = LLM_HEDGE_ENABLED and call_site in LLM_HEDGE_CALL_SITES
+
+    if hedge:
+        parsed = await _hedged_generate(prompt, model_preference, call_site, deadline)
+    else:
+        parsed = await _routed_generate(prompt, model_preference, call_site, deadline, [])
+
+    # Never cache failures; cache under the requested model regardless of routing
+    if llm_hedge.is_valid(parsed):
+        await run_io(llm_cache.put, model_preference, prompt, parsed, schema_version, _cache_ttl(call_site, cache_ttl))
+    return parsed
@@ -0,0 +1,97 @@
+import copy
+import hashlib
+import threading
+from datetime import datetime, timedelta
+from typing import Optional
+
+from app.core.config import LLM_CACHE_ENABLED, LLM_CACHE_SIZE, LLM_CACHE_BACKEND, LLM_CACHE_DEFAULT_TTL
+from app.utils.cache import LRUCache, MISSING  # noqa: F401 (MISSING re-exported for callers)
+
+# ------------------- LLM Response Cache -------------------
+# Key: sha256(model | schema_version | whitespace-normalized prompt).
+# In-memory LRU first; optional Mongo backend (TTL on expires_at) behind it,
+# so identical prompts are shared across workers and restarts.
+
+_memory = LRUCache(maxsize=LLM_CACHE_SIZE, ttl=LLM_CACHE_DEFAULT_TTL)
+_stats_lock = threading.Lock()
+_site_stats = {}  # call_site -> {"hits", "persistent_hits", "misses", "bypassed"}
+
+
+def _persistent_col():
+    # TTL index on expires_at: app/db_indexes.py
+    if LLM_CACHE_BACKEND != "mongo":
+        return None
+    from app.DataBase import llm_cache_col
+    return llm_cache_col
+
+
+def _count(call_site: str, field: str):
+    with _stats_lock:
+        stats = _site_stats.setdefault(call_site, {"hits": 0, "persistent_hits": 0, "misses": 0, "bypassed": 0})
+        stats[field] += 1
+
+
+def prompt_fingerprint(model: str, prompt: str, schema_version: str) -> str:
+    normalized = " ".join(prompt.split())
+    return hashlib.sha256(f"{model}|{schema_version}|{normalized}".encode("utf-8")).hexdigest()
+
+
+def get(model: str, prompt: str, schema_version: str = "v1", call_site: str = "default",
+        bypass: bool = False):
+    """Return a cached parsed response, or MISSING."""
+    if not LLM_CACHE_ENABLED or bypass:
+        _count(call_site, "bypassed")
+        return MISSING
+
+    key = prompt_fingerprint(model, prompt, schema_version)
+    value = _memory.get(key)
+    if value is not MISSING:
+        _count(call_site, "hits")
+        return copy.deepcopy(value)
+
+    col = _persistent_col()
+    if col is not None:
+        try:
+            doc = col.find_one({"_id": key, "expires_at": {"$gt": datetime.utcnow()}})
+        except Exception as e:
+            print("LLM cache read error:", e)
+            doc = None
+        if doc:
+            ttl = (doc["expires_at"] - datetime.utcnow()).total_seconds()
+            _memory.set(key, doc["value"], ttl=max(ttl, 1))
+            _count(call_site, "persistent_hits")
+            return copy.deepcopy(doc["value"])
+
+    _count(call_site, "misses")
+    return MISSING
+
+
+def put(model: str, prompt: str, value, schema_version: str = "v1", ttl: Optional[int] = None):
+    """Store a parsed response; ttl=0 disables caching for the call."""
+    ttl = LLM_CACHE_DEFAULT_TTL if ttl is None else ttl
+    if not LLM_CACHE_ENABLED or ttl <= 0:
+        return
+
+    key = prompt_fingerprint(model, prompt, schema_version)
+    _memory.set(key, copy.deepcopy(value), ttl=ttl)
+
+    col = _persistent_col()
+    if col is not None:
+        try:
+            col.replace_one(
+                {"_id": key},
+                {"_id": key, "model": model, "schema_version": schema_version, "value": value,
+                 "expires_at": datetime.utcnow() + timedelta(seconds=ttl)},
+                upsert=True,
+            )
+        except Exception as e:
+            print("LLM cache write error:", e)
+
+
+def llm_cache_stats() -> dict:
+    with _stats_lock:
+        sites = {site: dict(stats) for site, stats in _site_stats.items()}
+    for stats in sites.values():
+        lookups = stats["hits"] + stats["persistent_hits"] + stats["misses"]
+        stats["hit_rate"] = round((stats["hits"] + stats["persistent_hits"]) / lookups, 4) if lookups else 0.0
+    return {"enabled": LLM_CACHE_ENABLED, "backend": LLM_CACHE_BACKEND, "memory": _memory.stats(), "call_sites": sites}
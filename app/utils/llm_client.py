@@ -0,0 +1,145 @@
+import asyncio
+import random
+import time
+from typing import Dict, Optional
+
+import httpx
+
+from app.core.config import (
+    GEMINI_API_KEY, GEMINI_API_BASE_URL, LLM_TIMEOUT_SECONDS, LLM_MAX_RETRIES,
+    LLM_BACKOFF_BASE_SECONDS, LLM_BACKOFF_MAX_SECONDS, LLM_MAX_CONCURRENCY,
+)
+
+# ------------------- Async Gemini Client -------------------
+# One pooled httpx.AsyncClient (keep-alive connections) per event loop, cached
+# per-model endpoints, per-call deadlines, jittered exponential backoff on
+# 429/5xx and a concurrency semaphore. GEMINI_API_BASE_URL can point at a
+# local stub server (see gemini_stub_server.py).
+
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+
+class LLMError(Exception):
+    def __init__(self, message: str, status: Optional[int] = None, model: Optional[str] = None):
+        super().__init__(message)
+        self.status = status
+        self.model = model
+
+    @property
+    def retryable(self) -> bool:
+        return self.status is None or self.status in RETRYABLE_STATUS
+
+    @property
+    def quota_exhausted(self) -> bool:
+        return self.status == 429
+
+
+class GeminiClient:
+    def __init__(self, base_url: str = GEMINI_API_BASE_URL, api_key: str = GEMINI_API_KEY,
+                 timeout: float = LLM_TIMEOUT_SECONDS, max_retries: int = LLM_MAX_RETRIES,
+                 max_concurrency: int = LLM_MAX_CONCURRENCY):
+        self.base_url = base_url.rstrip("/")
+        self.api_key = api_key
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.max_concurrency = max_concurrency
+        self._http: Optional[httpx.AsyncClient] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._loop = None
+        self._model_urls: Dict[str, str] = {}
+
+    def _ensure_session(self):
+        loop = asyncio.get_running_loop()
+        if self._http is None or self._loop is not loop:
+            self._loop = loop
+            self._http = httpx.AsyncClient(
+                timeout=httpx.Timeout(self.timeout),
+                limits=httpx.Limits(max_connections=self.max_concurrency,
+                                    max_keepalive_connections=self.max_concurrency),
+            )
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+
+    def _model_url(self, model: str) -> str:
+        url = self._model_urls.get(model)
+        if url is None:
+            url = f"{self.base_url}/v1beta/models/{model}:generateContent"
+            self._model_urls[model] = url
+        return url
+
+    async def _generate_once(self, prompt: str, model: str, timeout: float) -> str:
+        async with self._semaphore:
+            try:
+                response = await asyncio.wait_for(
+                    self._http.post(
+                        self._model_url(model),
+                        params={"key": self.api_key},
+                        json={"contents": [{"parts": [{"text": prompt}]}]},
+                        timeout=timeout,
+                    ),
+                    timeout=timeout,
+                )
+            except (asyncio.TimeoutError, httpx.TimeoutException):
+                raise LLMError(f"Model {model} timed out after {timeout:.1f}s", model=model)
+            except httpx.TransportError as e:
+                raise LLMError(f"Transport error calling {model}: {e}", model=model)
+
+        if response.status_code != 200:
+            try:
+                detail = response.json().get("error", {}).get("message", response.text)
+            except ValueError:
+                detail = response.text
+            raise LLMError(f"Model {model} returned {response.status_code}: {detail}",
+                           status=response.status_code, model=model)
+
+        try:
+            parts = response.json()["candidates"][0]["content"]["parts"]
+            return "".join(part.get("text", "") for part in parts)
+        except (KeyError, IndexError, ValueError):
+            raise LLMError(f"Model {model} returned no text", status=response.status_code, model=model)
+
+    async def generate_text(self, prompt: str, model: str, deadline: Optional[float] = None,
+                            max_retries: Optional[int] = None) -> str:
+        """
+        Generate text with retries. deadline: total seconds for all attempts
+        (defaults to the per-attempt timeout times the attempt count).
+        """
+        self._ensure_session()
+        retries = self.max_retries if max_retries is None else max_retries
+        deadline_at = time.monotonic() + (deadline or self.timeout * (retries + 1))
+
+        for attempt in range(retries + 1):
+            remaining = deadline_at - time.monotonic()
+            if remaining <= 0:
+                raise LLMError(f"Deadline exceeded calling {model}", model=model)
+            try:
+                return await self._generate_once(prompt, model, min(self.timeout, remaining))
+            except LLMError as e:
+                # 429 is left to the caller (model fail-over) once retries are spent
+                if not e.retryable or attempt == retries:
+                    raise
+                backoff = min(LLM_BACKOFF_MAX_SECONDS, LLM_BACKOFF_BASE_SECONDS * (2 ** attempt))
+                delay = random.uniform(0, backoff)  # full jitter
+                if time.monotonic() + delay >= deadline_at:
+                    raise
+                print(f"LLM retry {attempt + 1}/{retries} for {model} in {delay:.2f}s: {e}")
+                await asyncio.sleep(delay)
+
+    async def aclose(self):
+        if self._http is not None:
+            await self._http.aclose()
+            self._http = None
+
+
+_client: Optional[GeminiClient] = None
+
+
+def get_llm_client() -> GeminiClient:
+    global _client
+    if _client is None:
+        _client = GeminiClient()
+    return _client
+
+
+async def close_llm_client():
+    if _client is not None:
+        await _client.aclose()
@@ -0,0 +1,91 @@
+import asyncio
+import threading
+from collections import deque
+from typing import Dict
+
+import numpy as np
+
+from app.core.config import (
+    LLM_HEDGE_PERCENTILE, LLM_HEDGE_MIN_SAMPLES, LLM_HEDGE_DEFAULT_DELAY_SECONDS,
+    LLM_HEDGE_MIN_DELAY_SECONDS,
+)
+
+# ------------------- Hedged LLM Requests -------------------
+# Latency samples per model drive the hedge delay (p95 by default): if the
+# primary has not answered by then, a second model is fired and the first
+# valid JSON wins. Stats are kept per call site for tuning the percentile.
+
+LATENCY_WINDOW = 200
+
+_lock = threading.Lock()
+_latencies: Dict[str, deque] = {}
+_site_stats: Dict[str, dict] = {}
+
+
+def record_latency(model: str, seconds: float):
+    with _lock:
+        _latencies.setdefault(model, deque(maxlen=LATENCY_WINDOW)).append(seconds)
+
+
+def hedge_delay(model: str) -> float:
+    """Seconds to wait for `model` before firing a hedge."""
+    with _lock:
+        samples = list(_latencies.get(model, ()))
+    if len(samples) < LLM_HEDGE_MIN_SAMPLES:
+        return LLM_HEDGE_DEFAULT_DELAY_SECONDS
+    return max(LLM_HEDGE_MIN_DELAY_SECONDS, float(np.percentile(samples, LLM_HEDGE_PERCENTILE)))
+
+
+def count(call_site: str, field: str):
+    with _lock:
+        stats = _site_stats.setdefault(call_site, {
+            "calls": 0, "hedges_fired": 0, "hedge_wins": 0, "primary_wins": 0, "budget_skipped": 0,
+            "errors": 0,
+        })
+        stats[field] += 1
+
+
+def is_valid(parsed) -> bool:
+    return not (isinstance(parsed, dict) and "error" in parsed)
+
+
+async def first_valid(tasks: Dict[asyncio.Task, str]):
+    """
+    Await tasks until one returns valid JSON; cancel the rest.
+    Returns (result, label); label is None when every task failed
+    (the last error result is returned).
+    """
+    pending = set(tasks)
+    result = {"error": "No response"}
+    try:
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                result = task.result()
+                if is_valid(result):
+                    return result, tasks[task]
+        return result, None
+    finally:
+        for task in pending:
+            task.cancel()
+
+
+def hedge_stats() -> dict:
+    with _lock:
+        sites = {}
+        for call_site, stats in _site_stats.items():
+            fired = stats["hedges_fired"]
+            sites[call_site] = dict(
+                stats,
+                hedge_rate=round(fired / stats["calls"], 3) if stats["calls"] else 0.0,
+                hedge_win_rate=round(stats["hedge_wins"] / fired, 3) if fired else 0.0,
+            )
+        models = {
+            model: {
+                "samples": len(samples),
+                "p50_seconds": round(float(np.percentile(samples, 50)), 3),
+                "p95_seconds": round(float(np.percentile(samples, 95)), 3),
+            }
+            for model, samples in ((m, list(s)) for m, s in _latencies.items()) if samples
+        }
+    return {"call_sites": sites, "models": models}
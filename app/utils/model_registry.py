@@ -0,0 +1,48 @@
+import threading
+from typing import Dict, List, Optional
+
+from app.core.config import EMBEDDING_MODEL_NAME, EMBEDDING_DEVICE, EMBEDDING_NUM_THREADS
+
+# ------------------- SentenceTransformer Registry -------------------
+# One instance per model name per process, loaded lazily on first use.
+
+_models: Dict[str, object] = {}
+_lock = threading.Lock()
+_threads_pinned = False
+
+
+def _pin_threads():
+    global _threads_pinned
+    if _threads_pinned or EMBEDDING_NUM_THREADS <= 0:
+        return
+    import torch
+    torch.set_num_threads(EMBEDDING_NUM_THREADS)
+    _threads_pinned = True
+
+
+def get_sentence_model(model_name: str = EMBEDDING_MODEL_NAME):
+    """Return the shared SentenceTransformer for model_name, loading it on first call."""
+    model = _models.get(model_name)
+    if model is not None:
+        return model
+
+    with _lock:
+        model = _models.get(model_name)
+        if model is None:
+            from sentence_transformers import SentenceTransformer
+            _pin_threads()
+            print(f"================ Loading embedding model: {model_name} ==================")
+            model = SentenceTransformer(model_name, device=EMBEDDING_DEVICE)
+            _models[model_name] = model
+            print(f"================ Model Loaded: {model_name} ==================")
+    return model
+
+
+def preload_models(model_names: Optional[List[str]] = None):
+    """Load models up front (e.g. at startup) instead of on the first request."""
+    for name in model_names or [EMBEDDING_MODEL_NAME]:
+        get_sentence_model(name)
+
+
+def loaded_models() -> List[str]:
+    return list(_models.keys())
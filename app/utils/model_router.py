@@ -0,0 +1,282 @@
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional
+from zoneinfo import ZoneInfo
+
+from app.core.config import LLM_QUOTA_BACKEND, LLM_QUOTA_TIMEZONE, LLM_UTILIZATION_RATIO
+
+# ------------------- Model Budgets -------------------
+MODELS_RPD = {
+    "gemini-2.5-pro": 50,
+    "gemini-2.5-flash": 250,
+    "gemini-2.5-flash-lite": 1000,
+    "gemini-2.0-flash": 200,
+    "gemini-2.0-flash-lite": 200,
+    "gemma-3n-e2b-it": 14400,
+}
+
+MODELS_RPM = {
+    "gemini-2.5-pro": 5,
+    "gemini-2.5-flash": 10,
+    "gemini-2.5-flash-lite": 15,
+    "gemini-2.0-flash": 15,
+    "gemini-2.0-flash-lite": 30,
+    "gemma-3n-e2b-it": 30,
+}
+
+# Cheapest first
+MODEL_COST_ORDER = [
+    "gemma-3n-e2b-it",
+    "gemini-2.0-flash-lite",
+    "gemini-2.5-flash-lite",
+    "gemini-2.0-flash",
+    "gemini-2.5-flash",
+    "gemini-2.5-pro",
+]
+
+# Models allowed per call class (call_site), cheapest first
+CALL_CLASS_MODELS = {
+    "extract_context": ["gemma-3n-e2b-it", "gemini-2.0-flash-lite", "gemini-2.5-flash-lite", "gemini-2.0-flash"],
+    "risk_analysis": ["gemma-3n-e2b-it", "gemini-2.0-flash-lite", "gemini-2.5-flash-lite", "gemini-2.0-flash", "gemini-2.5-flash"],
+    "extract_and_triage": ["gemma-3n-e2b-it", "gemini-2.0-flash-lite", "gemini-2.5-flash-lite", "gemini-2.0-flash", "gemini-2.5-flash"],
+    "diseases_recognize": ["gemma-3n-e2b-it", "gemini-2.0-flash-lite", "gemini-2.5-flash-lite", "gemini-2.0-flash"],
+    # Many patients per prompt: needs the larger-context models
+    "risk_analysis_batch": ["gemini-2.5-flash-lite", "gemini-2.0-flash", "gemini-2.5-flash"],
+    "default": MODEL_COST_ORDER,
+}
+
+UTILIZATION_RATIO = LLM_UTILIZATION_RATIO
+_tz = ZoneInfo(LLM_QUOTA_TIMEZONE)
+
+
+def daily_limit(model: str) -> int:
+    return int(MODELS_RPD.get(model, 0) * UTILIZATION_RATIO)
+
+
+def minute_limit(model: str) -> int:
+    return max(1, int(MODELS_RPM.get(model, 1) * UTILIZATION_RATIO))
+
+
+def _day_window(now: datetime):
+    local = now.astimezone(_tz)
+    start = local.replace(hour=0, minute=0, second=0, microsecond=0)
+    return local.strftime("%Y-%m-%d"), (start + timedelta(days=1)).astimezone(ZoneInfo("UTC")).replace(tzinfo=None)
+
+
+def _minute_window(now: datetime):
+    return now.strftime("%Y%m%d%H%M"), (now.replace(second=0, microsecond=0) + timedelta(minutes=1)).replace(tzinfo=None)
+
+
+# ------------------- Shared Counter Store -------------------
+class MemoryQuotaStore:
+    """Per-process fallback when Mongo is unavailable."""
+
+    def __init__(self):
+        self._counts: Dict[str, list] = {}  # key -> [count, expires_at]
+        self._lock = threading.Lock()
+
+    def try_increment(self, key: str, limit: int, expires_at: datetime) -> bool:
+        with self._lock:
+            now = datetime.utcnow()
+            for stale in [k for k, (_, exp) in self._counts.items() if exp <= now]:
+                del self._counts[stale]
+            entry = self._counts.setdefault(key, [0, expires_at])
+            if entry[0] >= limit:
+                return False
+            entry[0] += 1
+            return True
+
+    def exhaust(self, key: str, limit: int, expires_at: datetime):
+        with self._lock:
+            self._counts[key] = [max(limit, self._counts.get(key, [0])[0]), expires_at]
+
+    def count(self, key: str) -> int:
+        with self._lock:
+            return self._counts.get(key, [0])[0]
+
+
+class MongoQuotaStore:
+    """Counters shared by every uvicorn worker; expired windows removed by TTL index (app/db_indexes.py)."""
+
+    def __init__(self):
+        from app.DataBase import llm_quota_col
+        self.col = llm_quota_col
+        # Fail fast (→ in-memory fallback) when Mongo is unreachable
+        self.col.find_one({}, {"_id": 1})
+
+    def try_increment(self, key: str, limit: int, expires_at: datetime) -> bool:
+        from pymongo.errors import DuplicateKeyError
+        try:
+            # Matches only while under the limit; at the limit the upsert collides on _id
+            self.col.update_one(
+                {"_id": key, "count": {"$lt": limit}},
+                {"$inc": {"count": 1}, "$setOnInsert": {"expires_at": expires_at}},
+                upsert=True,
+            )
+            return True
+        except DuplicateKeyError:
+            return False
+
+    def exhaust(self, key: str, limit: int, expires_at: datetime):
+        self.col.update_one(
+            {"_id": key},
+            {"$max": {"count": limit}, "$setOnInsert": {"expires_at": expires_at}},
+            upsert=True,
+        )
+
+    def count(self, key: str) -> int:
+        doc = self.col.find_one({"_id": key}, {"count": 1})
+        return doc["count"] if doc else 0
+
+
+# ------------------- Token Bucket (per process) -------------------
+class TokenBucket:
+    """Smooths bursts: refills at RPM/60 tokens per second up to `capacity`."""
+
+    def __init__(self, rate_per_sec: float, capacity: float):
+        self.rate = rate_per_sec
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def try_take(self) -> bool:
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return True
+            return False
+
+
+# ------------------- Router -------------------
+class ModelRouter:
+    def __init__(self):
+        self._memory_store = MemoryQuotaStore()
+        self._mongo_store = None
+        self._mongo_failed_at = 0.0
+        self._buckets = {
+            model: TokenBucket(minute_limit(model) / 60.0, max(1.0, minute_limit(model) / 4))
+            for model in MODELS_RPD
+        }
+        self._cooldown_until: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self.failovers = 0
+        self.rejections = 0
+
+    def _store(self):
+        if LLM_QUOTA_BACKEND != "mongo":
+            return self._memory_store
+        # After a Mongo failure, use the in-memory store for a minute before retrying
+        if self._mongo_store is None and time.time() - self._mongo_failed_at > 60:
+            try:
+                self._mongo_store = MongoQuotaStore()
+            except Exception as e:
+                print("LLM quota store: Mongo unavailable, using in-memory counters:", e)
+                self._mongo_failed_at = time.time()
+        return self._mongo_store or self._memory_store
+
+    def _try_increment(self, key: str, limit: int, expires_at: datetime) -> bool:
+        store = self._store()
+        try:
+            return store.try_increment(key, limit, expires_at)
+        except Exception as e:
+            if store is self._memory_store:
+                raise
+            print("LLM quota store error, falling back to memory:", e)
+            self._mongo_store = None
+            self._mongo_failed_at = time.time()
+            return self._memory_store.try_increment(key, limit, expires_at)
+
+    def candidates(self, call_class: str, preferred: Optional[str] = None) -> List[str]:
+        models = list(CALL_CLASS_MODELS.get(call_class, CALL_CLASS_MODELS["default"]))
+        # A preference outside the class (e.g. a small-context model for batch prompts) is ignored
+        if preferred in models:
+            models = [preferred] + [m for m in models if m != preferred]
+        return models
+
+    def has_headroom(self, model: str) -> bool:
+        """Cheap check (no reservation): not cooling down and under today's limit."""
+        if self._cooldown_until.get(model, 0) > time.time():
+            return False
+        day, _ = _day_window(datetime.now(tz=ZoneInfo("UTC")))
+        try:
+            return self._store().count(f"{model}:d:{day}") < daily_limit(model)
+        except Exception:
+            return True
+
+    def reserve(self, call_class: str, preferred: Optional[str] = None,
+                exclude: Iterable[str] = ()) -> Optional[str]:
+        """
+        Reserve one request on the cheapest allowed model with headroom.
+        Returns the model name, or None if every candidate is exhausted.
+        Blocking (Mongo): call through executors.run_io from async code.
+        """
+        now = datetime.now(tz=ZoneInfo("UTC"))
+        day, day_expires = _day_window(now)
+        minute, minute_expires = _minute_window(now.replace(tzinfo=None))
+        excluded = set(exclude)
+
+        for model in self.candidates(call_class, preferred):
+            if model in excluded or self._cooldown_until.get(model, 0) > time.time():
+                continue
+            if not self._buckets[model].try_take():
+                continue
+            if not self._try_increment(f"{model}:m:{minute}", minute_limit(model), minute_expires):
+                continue
+            if not self._try_increment(f"{model}:d:{day}", daily_limit(model), day_expires):
+                continue
+            if model != (preferred or model):
+                with self._lock:
+                    self.failovers += 1
+            return model
+
+        with self._lock:
+            self.rejections += 1
+        return None
+
+    def mark_exhausted(self, model: str, message: str = ""):
+        """
+        Upstream said 429. Per-day quota messages exhaust the model until the
+        daily window resets (for every worker); otherwise cool down for a minute.
+        """
+        now = datetime.now(tz=ZoneInfo("UTC"))
+        if "day" in message.lower():
+            day, day_expires = _day_window(now)
+            try:
+                self._store().exhaust(f"{model}:d:{day}", daily_limit(model), day_expires)
+            except Exception as e:
+                print("LLM quota store error:", e)
+            self._cooldown_until[model] = time.time() + (day_expires - now.replace(tzinfo=None)).total_seconds()
+        else:
+            self._cooldown_until[model] = time.time() + 60
+        print(f"LLM model {model} exhausted: {message[:120]}")
+
+    def stats(self) -> dict:
+        now = datetime.now(tz=ZoneInfo("UTC"))
+        day, _ = _day_window(now)
+        models = {}
+        for model in MODEL_COST_ORDER:
+            try:
+                used = self._store().count(f"{model}:d:{day}")
+            except Exception:
+                used = None
+            models[model] = {
+                "used_today": used,
+                "daily_limit": daily_limit(model),
+                "minute_limit": minute_limit(model),
+                "cooling_down": self._cooldown_until.get(model, 0) > time.time(),
+            }
+        return {
+            "backend": "mongo" if self._mongo_store else "memory",
+            "quota_day": day,
+            "failovers": self.failovers,
+            "rejections": self.rejections,
+            "models": models,
+        }
+
+
+router = ModelRouter()
@@ -0,0 +1,96 @@
+import base64
+import json
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+from bson import ObjectId
+from fastapi import HTTPException
+
+# ------------------- Keyset Pagination -------------------
+# Pages are ordered by (sort_field desc, _id desc). The cursor is an opaque
+# token holding the last row's sort value and _id, so each page is an index
+# range scan instead of skip/limit over the whole collection.
+
+MAX_PAGE_SIZE = 200
+
+
+def encode_cursor(doc: dict, sort_field: str) -> str:
+    value = doc.get(sort_field) if sort_field != "_id" else None
+    if isinstance(value, datetime):
+        value = {"$date": value.isoformat()}
+    payload = json.dumps({"v": value, "id": str(doc["_id"])}, default=str)
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[object, ObjectId]:
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        value = payload["v"]
+        if isinstance(value, dict) and "$date" in value:
+            value = datetime.fromisoformat(value["$date"])
+        return value, ObjectId(payload["id"])
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def _after_cursor(cursor: str, sort_field: str) -> dict:
+    value, last_id = decode_cursor(cursor)
+    if sort_field == "_id":
+        return {"_id": {"$lt": last_id}}
+    if value is None:
+        # Rows without the sort field come last; continue within them by _id
+        return {sort_field: None, "_id": {"$lt": last_id}}
+    return {"$or": [
+        {sort_field: {"$lt": value}},
+        {sort_field: value, "_id": {"$lt": last_id}},
+        {sort_field: None},
+    ]}
+
+
+def parse_fields(fields: Optional[str], allowed: set) -> Optional[List[str]]:
+    """Comma-separated field list → validated list (None = all allowed fields)."""
+    if not fields:
+        return None
+    requested = [f.strip() for f in fields.split(",") if f.strip()]
+    unknown = [f for f in requested if f not in allowed]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+    return requested
+
+
+async def fetch_page(col, query: dict, sort_field: str, limit: int, cursor: Optional[str] = None,
+                     fields: Optional[List[str]] = None, exclude: Optional[dict] = None,
+                     with_total: bool = True) -> dict:
+    """
+    One page from an async (Motor) collection.
+    fields: inclusion projection; exclude: exclusion projection used when
+    fields is None. Returns {"items", "next_cursor", "total"}.
+    """
+    if fields:
+        projection = {f: 1 for f in fields}
+        projection[sort_field] = 1
+        projection["_id"] = 1
+    else:
+        projection = dict(exclude or {})
+
+    page_query = dict(query)
+    if cursor:
+        page_query = {"$and": [query, _after_cursor(cursor, sort_field)]} if query else _after_cursor(cursor, sort_field)
+
+    sort = [("_id", -1)] if sort_field == "_id" else [(sort_field, -1), ("_id", -1)]
+    # One extra row tells whether another page exists
+    docs = await col.find(page_query, projection or None).sort(sort).limit(limit + 1).to_list(length=limit + 1)
+
+    next_cursor = encode_cursor(docs[limit - 1], sort_field) if len(docs) > limit else None
+    items = []
+    for doc in docs[:limit]:
+        doc.pop("_id", None)
+        if fields and sort_field not in fields:
+            doc.pop(sort_field, None)
+        items.append(doc)
+
+    total = None
+    if with_total:
+        # Unfiltered totals come from collection metadata, not a scan
+        total = await col.count_documents(query) if query else await col.estimated_document_count()
+    return {"items": items, "next_cursor": next_cursor, "total": total}
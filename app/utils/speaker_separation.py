@@ -0,0 +1,186 @@
+import csv
+import re
+import threading
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from app.core.config import LOCAL_SPEAKER_CLASSIFIER, LOCAL_SPEAKER_CLASSIFIER_CSV
+
+# ------------------- Local Speaker Separation -------------------
+# Cheap patient-statement extraction for transcripts that already carry
+# "Patient:" / "Doctor:" turn markers (the MTS-Dialog format parsed by
+# app/vector_database/Embedding.py). Unlabeled transcripts can optionally be
+# split into sentences and scored by a tiny naive Bayes model trained on the
+# MTS-Dialog lines. Callers escalate to the LLM when confidence is low.
+
+PATIENT_SPEAKERS = {"patient", "pt"}
+# Other speakers are dropped (family members are not the patient)
+SPEAKER_RE = re.compile(
+    # Markers only count at a line start or right after a sentence end
+    r"(?:^|(?<=[.?!]\s))[ \t]*(patient|pt|doctor|dr|physician|nurse|clinician|"
+    r"guest[_ ]?family|gest[_ ]?family|guest[_ ]?clinician|guest[_ ]?clinican)\s*:",
+    re.IGNORECASE | re.MULTILINE,
+)
+SENTENCE_RE = re.compile(r"(?<=[.?!])\s+")
+TOKEN_RE = re.compile(r"[a-z']+")
+
+_stats_lock = threading.Lock()
+_path_counts = {"local_rules": 0, "local_classifier": 0, "llm": 0}
+
+
+def count_path(path: str):
+    with _stats_lock:
+        _path_counts[path] += 1
+
+
+def separation_stats() -> dict:
+    with _stats_lock:
+        counts = dict(_path_counts)
+    total = sum(counts.values())
+    counts["local_rate"] = round((total - counts["llm"]) / total, 3) if total else 0.0
+    return counts
+
+
+# ------------------- Rule-Based Segmentation -------------------
+def split_turns(transcript: str) -> Tuple[List[Tuple[str, str]], int]:
+    """
+    Split on speaker markers (line-start or inline). Returns
+    ([(speaker, text), ...], unlabeled_chars) where unlabeled_chars is the
+    length of any text before the first marker.
+    """
+    matches = list(SPEAKER_RE.finditer(transcript))
+    if not matches:
+        return [], len(transcript.strip())
+
+    turns = []
+    for match, following in zip(matches, matches[1:] + [None]):
+        end = following.start() if following else len(transcript)
+        text = transcript[match.end():end].strip()
+        if text:
+            turns.append((match.group(1).lower(), text))
+    return turns, len(transcript[:matches[0].start()].strip())
+
+
+def separate_by_markers(transcript: str) -> Tuple[str, float]:
+    """
+    Returns (patient_context, confidence). Confidence is the share of the
+    transcript covered by labeled turns, or 0 if no patient turn was found.
+    """
+    turns, unlabeled = split_turns(transcript)
+    patient_lines = [text for speaker, text in turns if speaker in PATIENT_SPEAKERS]
+    if not patient_lines:
+        return "", 0.0
+
+    labeled = sum(len(text) for _, text in turns)
+    return " ".join(patient_lines), labeled / (labeled + unlabeled)
+
+
+# ------------------- Naive Bayes Line Classifier -------------------
+class PatientLineClassifier:
+    """Multinomial naive Bayes over word counts: patient vs. other speaker."""
+
+    def __init__(self, vocab: dict, log_likelihood: np.ndarray, log_prior: np.ndarray):
+        self.vocab = vocab
+        self.log_likelihood = log_likelihood  # (2, vocab) rows: other, patient
+        self.log_prior = log_prior
+
+    @classmethod
+    def train(cls, lines: List[str], labels: List[int]) -> "PatientLineClassifier":
+        vocab = {}
+        for line in lines:
+            for token in TOKEN_RE.findall(line.lower()):
+                vocab.setdefault(token, len(vocab))
+
+        counts = np.ones((2, len(vocab)), dtype=np.float64)  # Laplace smoothing
+        for line, label in zip(lines, labels):
+            for token in TOKEN_RE.findall(line.lower()):
+                counts[label, vocab[token]] += 1
+
+        labels_arr = np.asarray(labels)
+        log_prior = np.log(np.array([(labels_arr == 0).sum(), (labels_arr == 1).sum()], dtype=np.float64) / len(labels))
+        log_likelihood = np.log(counts / counts.sum(axis=1, keepdims=True))
+        return cls(vocab, log_likelihood, log_prior)
+
+    def patient_probability(self, sentence: str) -> float:
+        idx = [self.vocab[t] for t in TOKEN_RE.findall(sentence.lower()) if t in self.vocab]
+        scores = self.log_prior + self.log_likelihood[:, idx].sum(axis=1)
+        scores -= scores.max()
+        probs = np.exp(scores)
+        return float(probs[1] / probs.sum())
+
+
+_classifier: Optional[PatientLineClassifier] = None
+_classifier_lock = threading.Lock()
+
+
+def _load_training_lines(csv_path: str):
+    lines, labels = [], []
+    with open(csv_path, encoding="utf-8", newline="") as f:
+        for row in csv.DictReader(f):
+            turns, _ = split_turns(row.get("dialogue") or "")
+            for speaker, text in turns:
+                if speaker.replace(" ", "_") in ("guest_family", "gest_family"):
+                    continue
+                lines.append(text)
+                labels.append(1 if speaker in PATIENT_SPEAKERS else 0)
+    return lines, labels
+
+
+def get_classifier() -> Optional[PatientLineClassifier]:
+    """Lazily train the classifier (LOCAL_SPEAKER_CLASSIFIER); None if disabled or unavailable."""
+    global _classifier
+    if not LOCAL_SPEAKER_CLASSIFIER:
+        return None
+    if _classifier is None:
+        with _classifier_lock:
+            if _classifier is None:
+                try:
+                    lines, labels = _load_training_lines(LOCAL_SPEAKER_CLASSIFIER_CSV)
+                    _classifier = PatientLineClassifier.train(lines, labels)
+                    print(f"Speaker classifier trained on {len(lines)} lines ({len(_classifier.vocab)} words)")
+                except (OSError, ValueError) as e:
+                    print("Speaker classifier unavailable:", e)
+                    return None
+    return _classifier
+
+
+def separate_by_classifier(transcript: str) -> Tuple[str, float]:
+    """
+    Unlabeled transcripts: keep sentences the classifier attributes to the
+    patient. Confidence is the mean certainty over all sentences.
+    """
+    classifier = get_classifier()
+    sentences = [s.strip() for s in SENTENCE_RE.split(transcript) if s.strip()]
+    if classifier is None or not sentences:
+        return "", 0.0
+
+    probs = [classifier.patient_probability(s) for s in sentences]
+    patient_sentences = [s for s, p in zip(sentences, probs) if p >= 0.5]
+    if not patient_sentences:
+        return "", 0.0
+    confidence = float(np.mean([max(p, 1 - p) for p in probs]))
+    return " ".join(patient_sentences), confidence
+
+
+# ------------------- Entry Point -------------------
+def separate_patient_context(transcript: str, min_confidence: float) -> Optional[dict]:
+    """
+    Returns {"patient_context": ..., "method": ...} when a local method reaches
+    min_confidence, else None (caller escalates to the LLM).
+    """
+    if not transcript or not transcript.strip():
+        return None
+
+    context, confidence = separate_by_markers(transcript)
+    if confidence >= min_confidence:
+        count_path("local_rules")
+        return {"patient_context": context, "method": "local_rules", "confidence": round(confidence, 3)}
+
+    if confidence == 0.0:
+        context, confidence = separate_by_classifier(transcript)
+        if confidence >= min_confidence:
+            count_path("local_classifier")
+            return {"patient_context": context, "method": "local_classifier", "confidence": round(confidence, 3)}
+
+    return None
@@ -0,0 +1,206 @@
+import subprocess
+import threading
+import time
+from typing import List, Optional, Tuple
+
+import numpy as np
+from scipy.signal import resample_poly
+
+from app.core.config import STREAM_MIN_CHUNK_SECONDS, STREAM_MAX_CHUNK_SECONDS
+from app.utils.audio_transcribe import get_whisper_model, whisper_transcribe_kwargs, record_transcription
+
+TARGET_SR = 16000
+FRAME_SECONDS = 0.03
+PCM_FORMATS = {"pcm_s16le": "<i2", "pcm_f32le": "<f4"}
+
+
+# ------------------- Incoming Audio Decoders -------------------
+class PcmDecoder:
+    """Raw little-endian PCM (mono) at any sample rate -> float32 16 kHz."""
+
+    def __init__(self, fmt: str = "pcm_s16le", sample_rate: int = TARGET_SR):
+        self.dtype = np.dtype(PCM_FORMATS[fmt])
+        self.sample_rate = sample_rate
+        self._leftover = b""
+
+    def feed(self, data: bytes) -> np.ndarray:
+        data = self._leftover + data
+        usable = len(data) - len(data) % self.dtype.itemsize
+        self._leftover = data[usable:]
+        samples = np.frombuffer(data[:usable], dtype=self.dtype).astype(np.float32)
+        if self.dtype.kind == "i":
+            samples /= float(np.iinfo(self.dtype).max + 1)
+        if self.sample_rate != TARGET_SR and samples.size:
+            samples = resample_poly(samples, TARGET_SR, self.sample_rate).astype(np.float32)
+        return samples
+
+    def close(self) -> np.ndarray:
+        return np.zeros(0, dtype=np.float32)
+
+
+class EncodedDecoder:
+    """
+    Container formats (webm/ogg/mp3 from MediaRecorder): one long-lived
+    `ffmpeg -i pipe:0 -f s16le pipe:1` process per stream decodes incrementally.
+    A reader thread drains stdout, so feed() never waits on decoded output.
+    feed()/close() block on the pipe: call them via executors.run_io.
+    """
+
+    def __init__(self, fmt: str):
+        self.fmt = fmt
+        self._process = subprocess.Popen(
+            ["ffmpeg", "-hide_banner", "-loglevel", "error", "-i", "pipe:0",
+             "-f", "s16le", "-ac", "1", "-ar", str(TARGET_SR), "pipe:1"],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+        )
+        self._pcm = PcmDecoder("pcm_s16le", TARGET_SR)
+        self._out = bytearray()
+        self._out_lock = threading.Lock()
+        self._reader = threading.Thread(target=self._read_stdout, daemon=True)
+        self._reader.start()
+
+    def _read_stdout(self):
+        while True:
+            data = self._process.stdout.read1(65536)
+            if not data:
+                return
+            with self._out_lock:
+                self._out.extend(data)
+
+    def _drain(self) -> np.ndarray:
+        with self._out_lock:
+            data, self._out = bytes(self._out), bytearray()
+        return self._pcm.feed(data)
+
+    def feed(self, data: bytes) -> np.ndarray:
+        """Write new container bytes; returns whatever ffmpeg has decoded so far."""
+        try:
+            self._process.stdin.write(data)
+            self._process.stdin.flush()
+        except (BrokenPipeError, ValueError):
+            # ffmpeg exited (corrupt stream): nothing more will decode
+            pass
+        return self._drain()
+
+    def close(self) -> np.ndarray:
+        """End of stream: flush ffmpeg and return the remaining samples."""
+        try:
+            self._process.stdin.close()
+        except BrokenPipeError:
+            pass
+        self._reader.join(timeout=10)
+        if self._process.poll() is None:
+            self._process.kill()
+        self._process.wait()
+        return self._drain()
+
+
+def make_decoder(fmt: str, sample_rate: int = TARGET_SR):
+    if fmt in PCM_FORMATS:
+        return PcmDecoder(fmt, sample_rate)
+    return EncodedDecoder(fmt)
+
+
+# ------------------- Chunked Whisper Decoding -------------------
+class StreamingTranscriber:
+    """
+    Buffers incoming 16 kHz audio and cuts it into chunks at short pauses
+    (simple energy VAD), between STREAM_MIN_CHUNK_SECONDS and
+    STREAM_MAX_CHUNK_SECONDS long. Each chunk is decoded on its own, with
+    the previous text as prompt, and yields segments with absolute timestamps.
+    """
+
+    def __init__(self, min_chunk_seconds: float = STREAM_MIN_CHUNK_SECONDS,
+                 max_chunk_seconds: float = STREAM_MAX_CHUNK_SECONDS):
+        self.min_samples = int(min_chunk_seconds * TARGET_SR)
+        self.max_samples = int(max_chunk_seconds * TARGET_SR)
+        self._buffer = np.zeros(0, dtype=np.float32)
+        self._offset_samples = 0
+        self.segments: List[dict] = []
+        self.started_at: Optional[float] = None
+        self.first_text_at: Optional[float] = None
+        self.language: Optional[str] = None
+
+    def add_audio(self, samples: np.ndarray):
+        if samples.size == 0:
+            return
+        if self.started_at is None:
+            self.started_at = time.time()
+        self._buffer = np.concatenate([self._buffer, samples])
+
+    @property
+    def received_seconds(self) -> float:
+        return (self._offset_samples + self._buffer.size) / TARGET_SR
+
+    def _pause_cut(self) -> Optional[int]:
+        """Sample index of the last quiet frame after min_samples, if any."""
+        frame = int(FRAME_SECONDS * TARGET_SR)
+        n_frames = self._buffer.size // frame
+        if n_frames < 2:
+            return None
+        frames = self._buffer[:n_frames * frame].reshape(n_frames, frame)
+        rms = np.sqrt(np.mean(frames ** 2, axis=1))
+        threshold = max(1e-3, 0.1 * float(np.percentile(rms, 95)))
+        quiet = np.nonzero(rms[self.min_samples // frame:] < threshold)[0]
+        if quiet.size == 0:
+            return None
+        return (int(quiet[-1]) + self.min_samples // frame) * frame + frame // 2
+
+    def next_chunk(self, final: bool = False) -> Optional[Tuple[float, np.ndarray]]:
+        """
+        Pop the next (offset_seconds, samples) chunk ready for decoding
+        (the whole remainder when final), or None.
+        """
+        if final:
+            if self._buffer.size == 0:
+                return None
+            cut = self._buffer.size
+        elif self._buffer.size < self.min_samples:
+            return None
+        else:
+            cut = self._pause_cut()
+            if cut is None:
+                if self._buffer.size < self.max_samples:
+                    return None
+                cut = self.max_samples
+
+        chunk, self._buffer = self._buffer[:cut], self._buffer[cut:]
+        offset = self._offset_samples / TARGET_SR
+        self._offset_samples += cut
+        return offset, chunk
+
+    def transcribe_chunk(self, offset: float, chunk: np.ndarray) -> List[dict]:
+        """Decode one chunk (blocking; run via executors.run_transcription)."""
+        start = time.time()
+        kwargs = whisper_transcribe_kwargs()
+        # Short chunks make language detection flaky: lock it after the first text
+        kwargs["language"] = kwargs["language"] or self.language
+        prompt = self.text[-200:] if self.segments else None
+        segments_generator, info = get_whisper_model().transcribe(
+            chunk, initial_prompt=prompt, condition_on_previous_text=False, **kwargs
+        )
+        new_segments = [
+            {
+                "start": round(offset + seg.start, 2),
+                "end": round(offset + seg.end, 2),
+                "text": seg.text.strip(),
+            }
+            for seg in segments_generator if seg.text.strip()
+        ]
+        record_transcription(chunk.size / TARGET_SR, time.time() - start)
+
+        self.segments.extend(new_segments)
+        if new_segments and self.first_text_at is None:
+            self.first_text_at = time.time()
+            self.language = self.language or info.language
+        return new_segments
+
+    @property
+    def text(self) -> str:
+        return " ".join(seg["text"] for seg in self.segments)
+
+    @property
+    def time_to_first_text(self) -> Optional[float]:
+        if self.started_at is None or self.first_text_at is None:
+            return None
+        return round(self.first_text_at - self.started_at, 3)
@@ -0,0 +1,27 @@
+import time
+from contextlib import asynccontextmanager
+from typing import Awaitable, Callable, Optional
+
+
+class StageTimer:
+    """
+    Records wall-clock seconds per pipeline stage.
+    on_stage(name, timings) is awaited when a stage starts (e.g. to publish job progress).
+    """
+
+    def __init__(self, on_stage: Optional[Callable[[str, dict], Awaitable[None]]] = None):
+        self.timings = {}
+        self.on_stage = on_stage
+
+    @asynccontextmanager
+    async def stage(self, name: str):
+        if self.on_stage:
+            await self.on_stage(name, self.timings)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timings[name] = round(time.perf_counter() - start, 3)
+
+    def total(self) -> float:
+        return round(sum(self.timings.values()), 3)
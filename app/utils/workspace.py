@@ -0,0 +1,41 @@
+import os
+import shutil
+import tempfile
+from contextlib import contextmanager
+
+from app.core.config import AUDIO_WORK_ROOT, UPLOAD_FOLDER
+
+# ------------------- Per-Request Working Directories -------------------
+# Each upload gets its own directory, so concurrent requests never share
+# intermediate file names and cleanup never touches another request's files.
+
+
+def _work_root() -> str:
+    if AUDIO_WORK_ROOT:
+        root = AUDIO_WORK_ROOT
+    elif os.path.isdir("/dev/shm") and os.access("/dev/shm", os.W_OK):
+        # tmpfs: intermediate WAVs never hit the disk
+        root = os.path.join("/dev/shm", "mediurgency_audio")
+    else:
+        root = UPLOAD_FOLDER
+    os.makedirs(root, exist_ok=True)
+    return root
+
+
+def create_workspace(prefix: str = "req-") -> str:
+    """Create an isolated working directory; caller owns removal."""
+    return tempfile.mkdtemp(prefix=prefix, dir=_work_root())
+
+
+def remove_workspace(path: str):
+    shutil.rmtree(path, ignore_errors=True)
+
+
+@contextmanager
+def request_workspace(prefix: str = "req-"):
+    """Working directory scoped to a `with` block."""
+    path = create_workspace(prefix)
+    try:
+        yield path
+    finally:
+        remove_workspace(path)
@@ -1,15 +1,16 @@
 import pandas as pd
-from sentence_transformers import SentenceTransformer
-import faiss
 import numpy as np
-import pickle
 import os
+from app.utils.model_registry import get_sentence_model
+from app.vector_database.kb_store import write_kb
+from app.vector_database.kb_index import build_index, choose_index_type
+from app.core.config import KB_DIR
 
 # Load embedding model
-model = SentenceTransformer("all-MiniLM-L6-v2")
+model = get_sentence_model("all-MiniLM-L6-v2")
 
 # CSV path
-csv_path = r"app\vector_database\MTS-Dialog-Augmented-TrainingSet-1-En-FR-EN-2402-Pairs.csv"
+csv_path = os.path.join("app", "vector_database", "MTS-Dialog-Augmented-TrainingSet-1-En-FR-EN-2402-Pairs.csv")
 if not os.path.exists(csv_path):
     raise FileNotFoundError(f"CSV file not found: {csv_path}")
 
@@ -34,17 +35,12 @@ print(patient_texts[:5])  # Show first 5 patient lines
 # Generate embeddings
 embeddings = model.encode(patient_texts, convert_to_numpy=True).astype("float32")
 
-# Build FAISS index
-index = faiss.IndexFlatL2(embeddings.shape[1])
-index.add(embeddings)
-
-# Save vector DB
-kb_path = "patient_kb.pkl"
-with open(kb_path, "wb") as f:
-    pickle.dump({
-        "index": index,
-        "texts": patient_texts,
-        "model_name": "all-MiniLM-L6-v2"
-    }, f)
+# Build FAISS index (cosine / inner product; type chosen by corpus size unless KB_INDEX_TYPE is set)
+index_type = choose_index_type(len(patient_texts))
+index, index_params = build_index(embeddings, index_type)
+print(f"Built {index_type} index: {index_params}")
+
+# Save vector DB (new version under KB_DIR, see kb_store.py)
+kb_path = write_kb(index, patient_texts, "all-MiniLM-L6-v2", KB_DIR, metric="ip", index_params=index_params)
 
 print(f"Knowledge base created successfully → {kb_path}")
@@ -0,0 +1,232 @@
+"""
+Incremental patient KB builder.
+
+Streams dialogue CSVs in chunks, extracts patient lines, skips lines already
+in the KB (by text hash), encodes only the new ones in fixed-size batches
+(optionally in a process pool) and appends them to the current index as a
+new KB version. Progress is checkpointed per chunk under <KB_DIR>/_staging,
+so an interrupted run resumes where it stopped.
+
+    python -m app.vector_database.build_kb --csv data/new_dialogues.csv [--csv ...]
+        [--chunksize 1000] [--batch-size 256] [--workers 0] [--rebuild]
+"""
+import argparse
+import json
+import os
+import shutil
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterator, List, Optional
+
+import faiss
+import numpy as np
+import pandas as pd
+
+from app.core.config import KB_DIR, EMBEDDING_MODEL_NAME
+from app.utils.speaker_separation import split_turns, PATIENT_SPEAKERS
+from app.vector_database.kb_index import build_index, choose_index_type, normalize
+from app.vector_database.kb_store import (
+    INDEX_FILE, current_version_dir, read_hashes, read_manifest, text_hash, write_kb,
+)
+
+DEFAULT_CSV = os.path.join("app", "vector_database", "MTS-Dialog-Augmented-TrainingSet-1-En-FR-EN-2402-Pairs.csv")
+STAGING = "_staging"
+
+
+# ------------------- Extraction -------------------
+def patient_lines(dialogue: str) -> List[str]:
+    turns, _ = split_turns(dialogue)
+    return [text for speaker, text in turns if speaker in PATIENT_SPEAKERS]
+
+
+def iter_csv_chunks(csv_path: str, column: str, chunksize: int, skip_rows: int) -> Iterator[tuple]:
+    """Yield (rows_in_chunk, dialogues) without loading the whole CSV."""
+    reader = pd.read_csv(csv_path, encoding="utf-8", usecols=[column], chunksize=chunksize,
+                         skiprows=range(1, skip_rows + 1))
+    for chunk in reader:
+        yield len(chunk), chunk[column].dropna().astype(str).tolist()
+
+
+# ------------------- Encoding -------------------
+_worker_model = None
+
+
+def _init_worker(model_name: str):
+    global _worker_model
+    from app.utils.model_registry import get_sentence_model
+    _worker_model = get_sentence_model(model_name)
+
+
+def _encode_batch(texts: List[str]) -> np.ndarray:
+    return _worker_model.encode(texts, convert_to_numpy=True, show_progress_bar=False).astype("float32")
+
+
+class Encoder:
+    """Batched encoding, in-process or in a spawn process pool (one model per worker)."""
+
+    def __init__(self, model_name: str, batch_size: int, workers: int):
+        self.batch_size = batch_size
+        self._pool = None
+        if workers > 0:
+            self._pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"),
+                                             initializer=_init_worker, initargs=(model_name,))
+        else:
+            _init_worker(model_name)
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        batches = [texts[i:i + self.batch_size] for i in range(0, len(texts), self.batch_size)]
+        if not batches:
+            return np.zeros((0, 0), dtype="float32")
+        results = self._pool.map(_encode_batch, batches) if self._pool else map(_encode_batch, batches)
+        return np.vstack(list(results))
+
+    def close(self):
+        if self._pool:
+            self._pool.shutdown()
+
+
+# ------------------- Staging (resume support) -------------------
+class Staging:
+    """
+    New texts + embeddings accumulated by this run. progress.json is written
+    after each chunk's data, so on resume any rows past the recorded count
+    (a crash mid-chunk) are truncated and the chunk is redone.
+    """
+
+    def __init__(self, kb_dir: str, base_version: Optional[str], model_name: str):
+        self.dir = os.path.join(kb_dir, STAGING)
+        self.progress_path = os.path.join(self.dir, "progress.json")
+        self.texts_path = os.path.join(self.dir, "texts.jsonl")
+        self.vectors_path = os.path.join(self.dir, "vectors.f32")
+        self.progress = {"base_version": base_version, "model_name": model_name, "rows_done": {}, "staged": 0, "dim": 0}
+
+        if os.path.exists(self.progress_path):
+            with open(self.progress_path, encoding="utf-8") as f:
+                previous = json.load(f)
+            if previous.get("base_version") == base_version and previous.get("model_name") == model_name:
+                self.progress = previous
+                self._truncate()
+                print(f"Resuming: {self.progress['staged']} staged lines, rows done {self.progress['rows_done']}")
+            else:
+                print("Discarding staging from a different base version/model")
+                shutil.rmtree(self.dir)
+        os.makedirs(self.dir, exist_ok=True)
+
+    def _truncate(self):
+        staged, dim = self.progress["staged"], self.progress["dim"]
+        if os.path.exists(self.vectors_path):
+            with open(self.vectors_path, "r+b") as f:
+                f.truncate(staged * dim * 4)
+        if os.path.exists(self.texts_path):
+            with open(self.texts_path, encoding="utf-8") as f:
+                lines = [next(f) for _ in range(staged)]
+            with open(self.texts_path, "w", encoding="utf-8") as f:
+                f.writelines(lines)
+
+    def rows_done(self, csv_path: str) -> int:
+        return self.progress["rows_done"].get(os.path.abspath(csv_path), 0)
+
+    def texts(self) -> List[str]:
+        if not os.path.exists(self.texts_path):
+            return []
+        with open(self.texts_path, encoding="utf-8") as f:
+            return [json.loads(line) for line in f]
+
+    def vectors(self) -> np.ndarray:
+        if not self.progress["staged"]:
+            return np.zeros((0, self.progress["dim"]), dtype="float32")
+        return np.fromfile(self.vectors_path, dtype="float32").reshape(-1, self.progress["dim"])
+
+    def append(self, csv_path: str, rows: int, texts: List[str], vectors: np.ndarray):
+        if texts:
+            with open(self.texts_path, "a", encoding="utf-8") as f:
+                f.writelines(json.dumps(t) + "\n" for t in texts)
+            with open(self.vectors_path, "ab") as f:
+                vectors.astype("float32").tofile(f)
+            self.progress["dim"] = int(vectors.shape[1])
+            self.progress["staged"] += len(texts)
+        key = os.path.abspath(csv_path)
+        self.progress["rows_done"][key] = self.progress["rows_done"].get(key, 0) + rows
+
+        tmp = self.progress_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.progress, f)
+        os.replace(tmp, self.progress_path)
+
+    def clear(self):
+        shutil.rmtree(self.dir, ignore_errors=True)
+
+
+# ------------------- Build -------------------
+def build(csv_paths: List[str], column: str = "dialogue", kb_dir: str = KB_DIR,
+          model_name: Optional[str] = None, chunksize: int = 1000, batch_size: int = 256,
+          workers: int = 0, rebuild: bool = False, index_type: Optional[str] = None) -> Optional[str]:
+    """Returns the new version directory, or None if there was nothing new."""
+    base_dir = None if rebuild else current_version_dir(kb_dir)
+    base_manifest = read_manifest(base_dir) if base_dir else None
+    model_name = model_name or (base_manifest["model_name"] if base_manifest else EMBEDDING_MODEL_NAME)
+    if base_manifest and base_manifest["model_name"] != model_name:
+        raise SystemExit(f"KB was built with {base_manifest['model_name']}; use --rebuild to switch models")
+
+    staging = Staging(kb_dir, os.path.basename(base_dir) if base_dir else None, model_name)
+    seen = set(read_hashes(base_dir).tolist()) if base_dir else set()
+    seen.update(text_hash(t) for t in staging.texts())
+
+    encoder = Encoder(model_name, batch_size, workers)
+    try:
+        for csv_path in csv_paths:
+            for rows, dialogues in iter_csv_chunks(csv_path, column, chunksize, staging.rows_done(csv_path)):
+                new_texts = []
+                for dialogue in dialogues:
+                    for line in patient_lines(dialogue):
+                        h = text_hash(line)
+                        if line and h not in seen:
+                            seen.add(h)
+                            new_texts.append(line)
+                staging.append(csv_path, rows, new_texts, encoder.encode(new_texts))
+                print(f"{csv_path}: {staging.rows_done(csv_path)} rows, {staging.progress['staged']} new lines staged")
+    finally:
+        encoder.close()
+
+    texts, vectors = staging.texts(), staging.vectors()
+    if not texts:
+        print("No new patient lines; KB unchanged")
+        staging.clear()
+        return None
+
+    if base_dir:
+        # Existing rows are not re-embedded; IVF centroids are reused (--rebuild retrains)
+        index = faiss.read_index(os.path.join(base_dir, INDEX_FILE))
+        metric = base_manifest.get("metric", "l2")
+        index.add(normalize(vectors) if metric == "ip" else vectors)
+        extra = {"index_params": base_manifest.get("index_params")}
+    else:
+        chosen = choose_index_type(len(texts), index_type) if index_type else choose_index_type(len(texts))
+        index, params = build_index(vectors, chosen)
+        metric, extra = "ip", {"index_params": params}
+
+    version_dir = write_kb(index, texts, model_name, kb_dir, metric=metric, base_version_dir=base_dir,
+                           sources=[os.path.basename(p) for p in csv_paths], **extra)
+    staging.clear()
+    return version_dir
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--csv", action="append", help="dialogue CSV (repeatable)")
+    parser.add_argument("--column", default="dialogue")
+    parser.add_argument("--kb-dir", default=KB_DIR)
+    parser.add_argument("--model", default=None, help="embedding model (default: the KB's, else EMBEDDING_MODEL_NAME)")
+    parser.add_argument("--chunksize", type=int, default=1000, help="CSV rows per chunk/checkpoint")
+    parser.add_argument("--batch-size", type=int, default=256, help="texts per encode call")
+    parser.add_argument("--workers", type=int, default=0, help="encoding processes (0 = in-process)")
+    parser.add_argument("--index-type", default=None, help="for new/rebuilt KBs (default: KB_INDEX_TYPE)")
+    parser.add_argument("--rebuild", action="store_true", help="ignore the current version and build from scratch")
+    args = parser.parse_args()
+
+    build(args.csv or [DEFAULT_CSV], args.column, args.kb_dir, args.model, args.chunksize,
+          args.batch_size, args.workers, args.rebuild, args.index_type)
+
+
+if __name__ == "__main__":
+    main()
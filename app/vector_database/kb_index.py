@@ -0,0 +1,105 @@
+import math
+from typing import Optional
+
+import faiss
+import numpy as np
+
+from app.core.config import KB_INDEX_TYPE, KB_NPROBE, KB_EF_SEARCH
+
+# ------------------- KB Index Types -------------------
+# All indexes use inner product on L2-normalized vectors (cosine similarity).
+# "auto" picks by corpus size: exact search while it is cheap, HNSW for
+# mid-size corpora (no training), IVF once the graph gets too large to keep
+# in RAM, PQ-compressed IVF for very large corpora.
+
+INDEX_TYPES = ("flat", "ivf_flat", "ivf_pq", "hnsw")
+FLAT_MAX = 20_000
+HNSW_MAX = 500_000
+IVF_FLAT_MAX = 2_000_000
+HNSW_M = 32
+HNSW_EF_CONSTRUCTION = 200
+TRAIN_POINTS_PER_LIST = 64
+
+
+def choose_index_type(n_vectors: int, requested: str = KB_INDEX_TYPE) -> str:
+    if requested != "auto":
+        if requested not in INDEX_TYPES:
+            raise ValueError(f"Unknown KB index type: {requested}")
+        return requested
+    if n_vectors <= FLAT_MAX:
+        return "flat"
+    if n_vectors <= HNSW_MAX:
+        return "hnsw"
+    if n_vectors <= IVF_FLAT_MAX:
+        return "ivf_flat"
+    return "ivf_pq"
+
+
+def normalize(vectors: np.ndarray) -> np.ndarray:
+    vectors = np.ascontiguousarray(vectors, dtype="float32").copy()
+    faiss.normalize_L2(vectors)
+    return vectors
+
+
+def _nlist(n_vectors: int) -> int:
+    # ~4*sqrt(n) lists, with enough training points per list
+    return max(1, min(int(4 * math.sqrt(n_vectors)), n_vectors // TRAIN_POINTS_PER_LIST or 1))
+
+
+def _pq_subquantizers(dim: int) -> int:
+    # Largest divisor of dim giving >= 4 dims per sub-quantizer (384 -> 96)
+    for m in range(dim // 4, 0, -1):
+        if dim % m == 0:
+            return m
+    return 1
+
+
+def build_index(embeddings: np.ndarray, index_type: str = "flat", params: Optional[dict] = None):
+    """
+    Build (and train, for IVF) an inner-product index over normalized
+    `embeddings`. Returns (index, params) where params records the build
+    settings for the KB manifest.
+    """
+    vectors = normalize(embeddings)
+    n, dim = vectors.shape
+    params = dict(params or {})
+
+    if index_type == "flat":
+        index = faiss.IndexFlatIP(dim)
+    elif index_type == "hnsw":
+        params.setdefault("M", HNSW_M)
+        params.setdefault("ef_construction", HNSW_EF_CONSTRUCTION)
+        index = faiss.IndexHNSWFlat(dim, params["M"], faiss.METRIC_INNER_PRODUCT)
+        index.hnsw.efConstruction = params["ef_construction"]
+    elif index_type in ("ivf_flat", "ivf_pq"):
+        params.setdefault("nlist", _nlist(n))
+        quantizer = faiss.IndexFlatIP(dim)
+        if index_type == "ivf_flat":
+            index = faiss.IndexIVFFlat(quantizer, dim, params["nlist"], faiss.METRIC_INNER_PRODUCT)
+        else:
+            params.setdefault("pq_m", _pq_subquantizers(dim))
+            params.setdefault("pq_bits", 8)
+            index = faiss.IndexIVFPQ(quantizer, dim, params["nlist"], params["pq_m"], params["pq_bits"],
+                                     faiss.METRIC_INNER_PRODUCT)
+        # Train on a bounded random sample; k-means cost grows with it
+        sample_size = min(n, params["nlist"] * 256)
+        sample = vectors[np.random.default_rng(0).choice(n, sample_size, replace=False)]
+        index.train(sample)
+    else:
+        raise ValueError(f"Unknown KB index type: {index_type}")
+
+    index.add(vectors)
+    params["index_type"] = index_type
+    return index, params
+
+
+def apply_search_params(index, nprobe: int = KB_NPROBE, ef_search: int = KB_EF_SEARCH):
+    """Set query-time knobs (no-op for flat indexes)."""
+    try:
+        faiss.extract_index_ivf(index).nprobe = nprobe
+    except RuntimeError:
+        pass
+    hnsw = getattr(faiss.downcast_index(index), "hnsw", None)
+    if hnsw is not None:
+        hnsw.efSearch = ef_search
+    return index
@@ -0,0 +1,292 @@
+"""
+Versioned on-disk patient knowledge base.
+
+    <KB_DIR>/
+        CURRENT                 name of the active version (swapped atomically)
+        v0001/
+            manifest.json       format, model, dimension, count, checksums
+            index.faiss         native FAISS index (memory-mapped on load)
+            texts.bin           UTF-8 texts, concatenated
+            texts.idx           uint64 offsets into texts.bin (count + 1 entries)
+            texts.hash          uint64 hash per text (dedup for incremental builds)
+
+Workers map the same files, so the OS page cache is shared and nothing is
+deserialized at startup. CLI:
+
+    python -m app.vector_database.kb_store info|verify|migrate [--pickle patient_kb.pkl]
+"""
+import argparse
+import fcntl
+import hashlib
+import json
+import os
+import pickle
+import shutil
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from typing import List, Optional
+
+import faiss
+import numpy as np
+
+from app.core.config import KB_DIR, KB_LEGACY_PICKLE, KB_VERIFY_CHECKSUM
+from app.vector_database.kb_index import apply_search_params, normalize
+
+FORMAT_VERSION = 1
+MANIFEST = "manifest.json"
+INDEX_FILE = "index.faiss"
+TEXTS_FILE = "texts.bin"
+OFFSETS_FILE = "texts.idx"
+HASHES_FILE = "texts.hash"
+CHECKSUMMED_FILES = (INDEX_FILE, TEXTS_FILE, OFFSETS_FILE, HASHES_FILE)
+
+
+# ------------------- Helpers -------------------
+def _sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def current_version_dir(kb_dir: str = KB_DIR) -> Optional[str]:
+    pointer = os.path.join(kb_dir, "CURRENT")
+    if not os.path.exists(pointer):
+        return None
+    with open(pointer, encoding="utf-8") as f:
+        return os.path.join(kb_dir, f.read().strip())
+
+
+def _next_version_name(kb_dir: str) -> str:
+    versions = [int(name[1:]) for name in os.listdir(kb_dir) if name.startswith("v") and name[1:].isdigit()]
+    return f"v{max(versions, default=0) + 1:04d}"
+
+
+@contextmanager
+def _kb_dir_lock(kb_dir: str):
+    """Exclusive lock on <kb_dir>/.lock: one writer (worker or CLI) at a time."""
+    os.makedirs(kb_dir, exist_ok=True)
+    with open(os.path.join(kb_dir, ".lock"), "w") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def _publish(kb_dir: str, version_name: str):
+    """Point CURRENT at version_name (atomic rename)."""
+    tmp = os.path.join(kb_dir, "CURRENT.tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(version_name)
+    os.replace(tmp, os.path.join(kb_dir, "CURRENT"))
+
+
+def text_hash(text: str) -> int:
+    """64-bit hash of case/whitespace-normalized text."""
+    normalized = " ".join(text.lower().split())
+    return int.from_bytes(hashlib.blake2b(normalized.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+def write_texts(version_dir: str, texts: List[str], base_dir: Optional[str] = None):
+    """Write texts.bin/.idx/.hash; with base_dir, copy that version's texts and append."""
+    texts_path = os.path.join(version_dir, TEXTS_FILE)
+    if base_dir:
+        shutil.copyfile(os.path.join(base_dir, TEXTS_FILE), texts_path)
+        base_offsets = np.fromfile(os.path.join(base_dir, OFFSETS_FILE), dtype=np.uint64)
+        base_hashes = read_hashes(base_dir)
+    else:
+        base_offsets = np.zeros(1, dtype=np.uint64)
+        base_hashes = np.zeros(0, dtype=np.uint64)
+
+    offsets = np.zeros(len(texts) + 1, dtype=np.uint64)
+    offsets[0] = base_offsets[-1]
+    with open(texts_path, "ab" if base_dir else "wb") as f:
+        for i, text in enumerate(texts):
+            data = text.encode("utf-8")
+            f.write(data)
+            offsets[i + 1] = offsets[i] + len(data)
+    np.concatenate([base_offsets, offsets[1:]]).tofile(os.path.join(version_dir, OFFSETS_FILE))
+
+    hashes = np.fromiter((text_hash(t) for t in texts), dtype=np.uint64, count=len(texts))
+    np.concatenate([base_hashes, hashes]).tofile(os.path.join(version_dir, HASHES_FILE))
+
+
+def read_hashes(version_dir: str) -> np.ndarray:
+    """Text hashes of a version (computed for versions written without texts.hash)."""
+    path = os.path.join(version_dir, HASHES_FILE)
+    if os.path.exists(path):
+        return np.fromfile(path, dtype=np.uint64)
+    kb = KnowledgeBase(version_dir)
+    return np.fromiter((text_hash(kb.text(i)) for i in range(len(kb))), dtype=np.uint64, count=len(kb))
+
+
+def read_manifest(version_dir: str) -> dict:
+    with open(os.path.join(version_dir, MANIFEST), encoding="utf-8") as f:
+        return json.load(f)
+
+
+def write_manifest(version_dir: str, model_name: str, dim: int, count: int, metric: str, **extra):
+    manifest = {
+        "format_version": FORMAT_VERSION,
+        "model_name": model_name,
+        "dim": int(dim),
+        "count": int(count),
+        "metric": metric,
+        "created_at": datetime.utcnow().isoformat(),
+        "checksums": {name: _sha256(os.path.join(version_dir, name)) for name in CHECKSUMMED_FILES
+                      if os.path.exists(os.path.join(version_dir, name))},
+    }
+    manifest.update(extra)
+    with open(os.path.join(version_dir, MANIFEST), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+def write_kb(index, texts: List[str], model_name: str, kb_dir: str = KB_DIR,
+             metric: str = "l2", base_version_dir: Optional[str] = None, **extra) -> str:
+    """
+    Write a new KB version and make it current. Returns the version directory.
+    base_version_dir: `index` extends that version; only the new `texts` are passed.
+    """
+    with _kb_dir_lock(kb_dir):
+        return _write_version(index, texts, model_name, kb_dir, metric, base_version_dir, **extra)
+
+
+def _write_version(index, texts: List[str], model_name: str, kb_dir: str, metric: str,
+                   base_version_dir: Optional[str], **extra) -> str:
+    """write_kb body; caller holds the kb_dir lock."""
+    base_count = read_manifest(base_version_dir)["count"] if base_version_dir else 0
+    if index.ntotal != base_count + len(texts):
+        raise ValueError(f"Index has {index.ntotal} vectors but {base_count + len(texts)} texts")
+
+    version_name = _next_version_name(kb_dir)
+    version_dir = os.path.join(kb_dir, version_name)
+    os.makedirs(version_dir)
+
+    faiss.write_index(index, os.path.join(version_dir, INDEX_FILE))
+    write_texts(version_dir, texts, base_version_dir)
+    write_manifest(version_dir, model_name, index.d, index.ntotal, metric, **extra)
+    _publish(kb_dir, version_name)
+    print(f"Knowledge base {version_name} written: {index.ntotal} texts ({len(texts)} new) → {version_dir}")
+    return version_dir
+
+
+def migrate_pickle(pickle_path: str = KB_LEGACY_PICKLE, kb_dir: str = KB_DIR,
+                   if_missing: bool = False) -> str:
+    """
+    Convert the legacy patient_kb.pkl ({"index", "texts", "model_name"}).
+    if_missing: keep a version another process published while we waited for the lock.
+    """
+    with _kb_dir_lock(kb_dir):
+        version_dir = current_version_dir(kb_dir)
+        if if_missing and version_dir is not None:
+            return version_dir
+        with open(pickle_path, "rb") as f:
+            kb_data = pickle.load(f)
+        return _write_version(kb_data["index"], list(kb_data["texts"]), kb_data["model_name"], kb_dir,
+                              "l2", None, migrated_from=os.path.basename(pickle_path))
+
+
+# ------------------- Reader -------------------
+class KnowledgeBase:
+    """Read-only view of one KB version; texts are read lazily from the mapped files."""
+
+    def __init__(self, version_dir: str, verify: bool = KB_VERIFY_CHECKSUM):
+        self.version_dir = version_dir
+        self.manifest = read_manifest(version_dir)
+        if self.manifest.get("format_version") != FORMAT_VERSION:
+            raise ValueError(f"Unsupported KB format {self.manifest.get('format_version')} in {version_dir}")
+        if verify:
+            self.verify()
+
+        self.model_name = self.manifest["model_name"]
+        self.dim = self.manifest["dim"]
+        self.metric = self.manifest.get("metric", "l2")
+        self.index = apply_search_params(self._read_index(os.path.join(version_dir, INDEX_FILE)))
+        self._offsets = np.memmap(os.path.join(version_dir, OFFSETS_FILE), dtype=np.uint64, mode="r")
+        texts_path = os.path.join(version_dir, TEXTS_FILE)
+        # np.memmap rejects empty files
+        self._texts = np.memmap(texts_path, dtype=np.uint8, mode="r") if os.path.getsize(texts_path) else b""
+
+        if self.index.d != self.dim or self.index.ntotal != len(self):
+            raise ValueError(f"KB {version_dir} does not match its manifest")
+
+    @staticmethod
+    def _read_index(path: str):
+        # Not every index type supports mmap; those are read into memory instead
+        try:
+            return faiss.read_index(path, faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY)
+        except RuntimeError:
+            return faiss.read_index(path)
+
+    def verify(self):
+        for name, expected in self.manifest["checksums"].items():
+            if _sha256(os.path.join(self.version_dir, name)) != expected:
+                raise ValueError(f"Checksum mismatch for {name} in {self.version_dir}")
+
+    def __len__(self) -> int:
+        return max(0, len(self._offsets) - 1)
+
+    def text(self, i: int) -> str:
+        start, end = int(self._offsets[i]), int(self._offsets[i + 1])
+        return bytes(self._texts[start:end]).decode("utf-8")
+
+    def search(self, query_embeddings: np.ndarray, top_k: int = 3):
+        """Returns (scores, ids) like faiss Index.search; scores are cosine for "ip" KBs."""
+        if self.metric == "ip":
+            query_embeddings = normalize(query_embeddings)
+        return self.index.search(np.ascontiguousarray(query_embeddings, dtype="float32"), top_k)
+
+
+_kb: Optional[KnowledgeBase] = None
+_kb_lock = threading.Lock()
+
+
+def load_kb(kb_dir: str = KB_DIR) -> KnowledgeBase:
+    """Open the current version, migrating the legacy pickle on first use."""
+    version_dir = current_version_dir(kb_dir)
+    if version_dir is None:
+        if not os.path.exists(KB_LEGACY_PICKLE):
+            raise FileNotFoundError(f"No knowledge base in {kb_dir} and no {KB_LEGACY_PICKLE} to migrate")
+        # Every worker may get here on its first search: the lock lets one migrate
+        print(f"Migrating {KB_LEGACY_PICKLE} → {kb_dir}")
+        version_dir = migrate_pickle(KB_LEGACY_PICKLE, kb_dir, if_missing=True)
+    return KnowledgeBase(version_dir)
+
+
+def get_kb() -> KnowledgeBase:
+    """Process-wide KB, opened on first use."""
+    global _kb
+    if _kb is None:
+        with _kb_lock:
+            if _kb is None:
+                _kb = load_kb()
+    return _kb
+
+
+# ------------------- CLI -------------------
+def main():
+    parser = argparse.ArgumentParser(description="Patient knowledge base store")
+    parser.add_argument("command", choices=["info", "verify", "migrate"])
+    parser.add_argument("--kb-dir", default=KB_DIR)
+    parser.add_argument("--pickle", default=KB_LEGACY_PICKLE)
+    args = parser.parse_args()
+
+    if args.command == "migrate":
+        migrate_pickle(args.pickle, args.kb_dir)
+        return
+
+    version_dir = current_version_dir(args.kb_dir)
+    if version_dir is None:
+        raise SystemExit(f"No knowledge base in {args.kb_dir}")
+    kb = KnowledgeBase(version_dir, verify=args.command == "verify")
+    print(json.dumps(dict(kb.manifest, version_dir=version_dir, loaded=len(kb)), indent=2))
+    if args.command == "verify":
+        print("Checksums OK")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+Benchmark: disk-based process_audio vs in-memory process_audio_array.
+
+Each path runs in a fresh process so peak RSS is measured independently.
+
+    python bench_audio_pipeline.py --audio videoplayback.weba --repeats 5 [--transcribe]
+"""
+import argparse
+import multiprocessing
+import resource
+import statistics
+import tempfile
+import time
+
+
+def _peak_rss_mb() -> float:
+    # ru_maxrss is in KiB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _run_path(path_name: str, audio_file: str, repeats: int, transcribe: bool, conn):
+    from app.utils.ProcessAudio import process_audio, process_audio_array
+    transcribe_audio = None
+    if transcribe:
+        from app.utils.audio_transcribe import transcribe_audio
+
+    baseline_rss = _peak_rss_mb()
+    latencies = []
+    for _ in range(repeats):
+        with tempfile.TemporaryDirectory() as workdir:
+            start = time.perf_counter()
+            if path_name == "disk":
+                audio = process_audio(audio_file, output_dir=workdir)
+            else:
+                audio = process_audio_array(audio_file)
+            if transcribe_audio:
+                transcribe_audio(audio)
+            latencies.append(time.perf_counter() - start)
+
+    conn.send({
+        "path": path_name,
+        "mean_s": round(statistics.mean(latencies), 3),
+        "p50_s": round(statistics.median(latencies), 3),
+        "min_s": round(min(latencies), 3),
+        "peak_rss_mb": round(_peak_rss_mb(), 1),
+        "peak_rss_delta_mb": round(_peak_rss_mb() - baseline_rss, 1),
+    })
+    conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--audio", default="videoplayback.weba")
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--transcribe", action="store_true", help="include Whisper decoding")
+    args = parser.parse_args()
+
+    ctx = multiprocessing.get_context("spawn")
+    results = []
+    for path_name in ("disk", "memory"):
+        parent_conn, child_conn = ctx.Pipe()
+        proc = ctx.Process(target=_run_path, args=(path_name, args.audio, args.repeats, args.transcribe, child_conn))
+        proc.start()
+        results.append(parent_conn.recv())
+        proc.join()
+
+    print(f"{'path':<8} {'mean_s':>8} {'p50_s':>8} {'min_s':>8} {'peak_rss_mb':>12} {'rss_delta_mb':>13}")
+    for r in results:
+        print(f"{r['path']:<8} {r['mean_s']:>8} {r['p50_s']:>8} {r['min_s']:>8} "
+              f"{r['peak_rss_mb']:>12} {r['peak_rss_delta_mb']:>13}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+Benchmark: two-call (extract context, then Risk_Analysis) vs fused
+extract+triage on MTS-Dialog transcripts.
+
+Reports per-path latency, LLM calls and prompt characters (a quota/token
+proxy), fused fallback rate and urgency agreement between the paths.
+The LLM response cache is disabled; point GEMINI_API_BASE_URL at
+gemini_stub_server.py to measure without spending quota.
+
+    python bench_fused_triage.py --dialogues 20 [--model gemma-3n-e2b-it]
+"""
+import argparse
+import asyncio
+import csv
+import os
+import statistics
+import time
+
+os.environ["LLM_CACHE_ENABLED"] = "false"
+os.environ.setdefault("LLM_QUOTA_BACKEND", "memory")
+
+CSV_PATH = os.path.join("app", "vector_database", "MTS-Dialog-Augmented-TrainingSet-1-En-FR-EN-2402-Pairs.csv")
+
+
+def _load_dialogues(limit: int):
+    with open(CSV_PATH, encoding="utf-8", newline="") as f:
+        rows = [row["dialogue"] for row in csv.DictReader(f) if row.get("dialogue")]
+    # Longer dialogues are closer to a real consultation recording
+    return sorted(rows, key=len, reverse=True)[:limit]
+
+
+class CallCounter:
+    """Counts generate_text calls and prompt characters on the shared client."""
+
+    def __init__(self, client):
+        self.calls = 0
+        self.prompt_chars = 0
+        self._generate = client.generate_text
+        client.generate_text = self._counted
+
+    async def _counted(self, prompt, model, **kwargs):
+        self.calls += 1
+        self.prompt_chars += len(prompt)
+        return await self._generate(prompt, model, **kwargs)
+
+    def take(self):
+        calls, chars = self.calls, self.prompt_chars
+        self.calls = self.prompt_chars = 0
+        return calls, chars
+
+
+async def _run(dialogues, model):
+    from app.utils.llm_client import get_llm_client, close_llm_client
+    from app.services.Seperate_pateint_context import extract_patient_context_from_transcript
+    from app.services.text_profilling import Risk_Analysis
+    from app.services.fused_triage import extract_and_triage
+
+    counter = CallCounter(get_llm_client())
+    rows = {"two_call": [], "fused": []}
+    fallbacks = agreements = compared = 0
+    patient = {"age": 45, "gender": "female"}
+
+    for dialogue in dialogues:
+        start = time.perf_counter()
+        context = await extract_patient_context_from_transcript(dialogue, model)
+        analysis = await Risk_Analysis(dict(patient, current_situation=context.get("patient_context")), model)
+        rows["two_call"].append((time.perf_counter() - start, *counter.take()))
+
+        start = time.perf_counter()
+        fused = await extract_and_triage(dialogue, patient, model)
+        if fused is None:
+            fallbacks += 1
+        rows["fused"].append((time.perf_counter() - start, *counter.take()))
+
+        if fused and analysis and "urgency" in analysis[0]:
+            compared += 1
+            agreements += str(analysis[0]["urgency"]).lower() == str(fused["analysis"][0].get("urgency")).lower()
+
+    await close_llm_client()
+    return rows, fallbacks, agreements, compared
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dialogues", type=int, default=20)
+    parser.add_argument("--model", default="gemma-3n-e2b-it")
+    args = parser.parse_args()
+
+    dialogues = _load_dialogues(args.dialogues)
+    rows, fallbacks, agreements, compared = asyncio.run(_run(dialogues, args.model))
+
+    print(f"{'path':<9} {'mean_s':>8} {'p50_s':>8} {'max_s':>8} {'calls':>6} {'prompt_chars':>13}")
+    for path, samples in rows.items():
+        latencies = [s[0] for s in samples]
+        print(f"{path:<9} {statistics.mean(latencies):>8.3f} {statistics.median(latencies):>8.3f} "
+              f"{max(latencies):>8.3f} {sum(s[1] for s in samples):>6} {sum(s[2] for s in samples):>13}")
+    print(f"fused fallbacks: {fallbacks}/{len(dialogues)}")
+    if compared:
+        print(f"urgency agreement: {agreements}/{compared} ({agreements / compared:.0%})")
+
+
+if __name__ == "__main__":
+    main()
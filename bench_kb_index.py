@@ -0,0 +1,94 @@
+"""
+Benchmark: recall@k and query latency of IVF-Flat / IVF-PQ / HNSW against
+exact (flat) inner-product search.
+
+Vectors come from the current patient KB (held-out rows used as queries),
+or are synthetic (--synthetic N) to simulate corpora larger than MTS-Dialog.
+
+    python bench_kb_index.py --k 10 --queries 500
+    python bench_kb_index.py --synthetic 1000000 --dim 384 --types ivf_flat ivf_pq hnsw
+"""
+import argparse
+import statistics
+import time
+
+import numpy as np
+
+
+def _kb_vectors():
+    from app.vector_database.kb_store import get_kb
+    kb = get_kb()
+    try:
+        return kb.index.reconstruct_n(0, kb.index.ntotal)
+    except RuntimeError:
+        raise SystemExit("Current KB index cannot reconstruct vectors (IVF/PQ); use --synthetic")
+
+
+def _synthetic_vectors(n: int, dim: int):
+    # Clustered data, closer to sentence embeddings than uniform noise
+    rng = np.random.default_rng(0)
+    centers = rng.standard_normal((max(1, n // 1000), dim)).astype("float32")
+    vectors = centers[rng.integers(0, len(centers), n)] + 0.3 * rng.standard_normal((n, dim)).astype("float32")
+    return vectors
+
+
+def _search_timed(index, queries: np.ndarray, k: int):
+    latencies, ids = [], []
+    for query in queries:
+        start = time.perf_counter()
+        _, found = index.search(query[None, :], k)
+        latencies.append(time.perf_counter() - start)
+        ids.append(found[0])
+    return np.array(ids), latencies
+
+
+def _recall(found: np.ndarray, truth: np.ndarray) -> float:
+    k = truth.shape[1]
+    return float(np.mean([len(set(f) & set(t)) / k for f, t in zip(found, truth)]))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--synthetic", type=int, default=0, help="number of synthetic vectors (0 = use the KB)")
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--types", nargs="+", default=["ivf_flat", "ivf_pq", "hnsw"])
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[1, 4, 16, 64])
+    parser.add_argument("--ef-search", type=int, nargs="+", default=[16, 64, 256])
+    args = parser.parse_args()
+
+    from app.vector_database.kb_index import build_index, apply_search_params, normalize
+
+    vectors = _synthetic_vectors(args.synthetic, args.dim) if args.synthetic else _kb_vectors()
+    rng = np.random.default_rng(1)
+    query_rows = rng.choice(len(vectors), min(args.queries, len(vectors) // 10), replace=False)
+    queries = normalize(vectors[query_rows])
+    corpus = np.delete(vectors, query_rows, axis=0)
+    print(f"corpus={len(corpus)} dim={corpus.shape[1]} queries={len(queries)} k={args.k}")
+
+    start = time.perf_counter()
+    flat, _ = build_index(corpus, "flat")
+    flat_build = time.perf_counter() - start
+    truth, flat_latencies = _search_timed(flat, queries, args.k)
+
+    print(f"{'index':<10} {'knob':<12} {'build_s':>8} {'recall@k':>9} {'mean_ms':>8} {'p95_ms':>8}")
+    print(f"{'flat':<10} {'-':<12} {flat_build:>8.2f} {1.0:>9.3f} "
+          f"{statistics.mean(flat_latencies) * 1e3:>8.3f} {np.percentile(flat_latencies, 95) * 1e3:>8.3f}")
+
+    for index_type in args.types:
+        start = time.perf_counter()
+        index, params = build_index(corpus, index_type)
+        build_s = time.perf_counter() - start
+
+        knobs = [("ef_search", v) for v in args.ef_search] if index_type == "hnsw" else \
+            [("nprobe", v) for v in args.nprobe if v <= params.get("nlist", v)]
+        for name, value in knobs:
+            apply_search_params(index, **{name: value})
+            found, latencies = _search_timed(index, queries, args.k)
+            print(f"{index_type:<10} {f'{name}={value}':<12} {build_s:>8.2f} {_recall(found, truth):>9.3f} "
+                  f"{statistics.mean(latencies) * 1e3:>8.3f} {np.percentile(latencies, 95) * 1e3:>8.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""
+Local stub of the Gemini generateContent REST endpoint, for exercising the
+async LLM client (timeouts, retries, fail-over) without quota.
+
+    python gemini_stub_server.py --port 8090 --fail-rate 0.3 --latency 0.5
+    GEMINI_API_BASE_URL=http://127.0.0.1:8090 python run_app.py
+"""
+import argparse
+import asyncio
+import json
+import random
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+app = FastAPI(title="Gemini Stub")
+settings = {"fail_rate": 0.0, "latency": 0.0, "exhausted": set()}
+
+STUB_ANSWER = [{
+    "symptoms": ["headache"],
+    "disease": "Migraine",
+    "probability": 70,
+    "urgency": "medium",
+    "possible_causes": "stub response",
+    "recommended_specialist": "Neurologist",
+    "advice": "stub response",
+    "patient_context": "stub patient context",
+}]
+
+
+@app.post("/v1beta/models/{model_action}")
+async def generate_content(model_action: str, request: Request):
+    model = model_action.split(":")[0]
+    await request.json()
+    await asyncio.sleep(settings["latency"] * random.uniform(0.5, 1.5))
+
+    if model in settings["exhausted"]:
+        return JSONResponse(status_code=429, content={"error": {"code": 429, "message": "Resource has been exhausted"}})
+    if random.random() < settings["fail_rate"]:
+        code = random.choice([429, 500, 503])
+        return JSONResponse(status_code=code, content={"error": {"code": code, "message": "stub failure"}})
+
+    text = "```json\n" + json.dumps(STUB_ANSWER) + "\n```"
+    return {"candidates": [{"content": {"parts": [{"text": text}], "role": "model"}}]}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8090)
+    parser.add_argument("--fail-rate", type=float, default=0.0)
+    parser.add_argument("--latency", type=float, default=0.2, help="mean seconds per response")
+    parser.add_argument("--exhausted", nargs="*", default=[], help="models that always return 429")
+    args = parser.parse_args()
+    settings.update(fail_rate=args.fail_rate, latency=args.latency, exhausted=set(args.exhausted))
+    uvicorn.run(app, host="127.0.0.1", port=args.port)
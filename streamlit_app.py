@@ -109,23 +109,28 @@ def show_patient_main_dashboard():
     elif page == "📋 Audio History":
         show_audio_history()
 
+def get_doctor_analytics(days=30):
+    response = requests.get(f"{API_BASE}/doctor/analytics",
+                            params={"token": st.session_state.doctor_token, "days": days})
+    if response.status_code == 200:
+        return response.json()
+    return None
+
 def show_doctor_overview():
     st.header("📊 Doctor Overview")
     col1, col2, col3 = st.columns(3)
     
     try:
-        response = requests.get(f"{API_BASE}/doctor/patients", params={"token": st.session_state.doctor_token})
-        if response.status_code == 200:
-            data = response.json()
+        data = get_doctor_analytics()
+        if data:
             with col1:
-                st.metric("Total Patients", data['total_patients'])
+                st.metric("Audits (30 days)", data['total_audits'])
+            with col2:
+                st.metric("High Urgency", data['by_urgency'].get('high', 0))
+            with col3:
+                st.metric("Alerts Sent", data['by_alert'].get('sent', 0))
     except:
         pass
-    
-    with col2:
-        st.metric("Today's Appointments", "5")
-    with col3:
-        st.metric("Pending Reviews", "3")
 
 def show_doctor_patients():
     st.header("👥 My Patients")
@@ -237,12 +242,30 @@ def show_doctor_patient_history():
 
 def show_doctor_analytics():
     st.header("📋 Analytics")
+    days = st.selectbox("Period (days)", [7, 30, 90, 365], index=1)
     try:
-        response = requests.get(f"{API_BASE}/doctor/audit-patients", params={"token": st.session_state.doctor_token})
-        if response.status_code == 200:
-            data = response.json()
-            if data["patients"]:
-                st.dataframe(data["patients"])
+        data = get_doctor_analytics(days)
+        if not data:
+            st.error("Failed to load analytics")
+            return
+        if not data["total_audits"]:
+            st.info("No audits in this period.")
+            return
+
+        st.metric("Total Audits", data["total_audits"])
+        st.subheader("📅 Audits per Day")
+        st.bar_chart(data["by_day"], x="day", y="total")
+
+        col1, col2 = st.columns(2)
+        with col1:
+            st.subheader("🚨 By Urgency")
+            st.bar_chart([{"urgency": k, "count": v} for k, v in data["by_urgency"].items()], x="urgency", y="count")
+        with col2:
+            st.subheader("📨 Alert Status")
+            st.bar_chart([{"alert": k, "count": v} for k, v in data["by_alert"].items()], x="alert", y="count")
+
+        st.subheader("🔬 Top Diseases")
+        st.dataframe([{"disease": name, "count": count} for name, count in data["by_disease"].items()])
     except Exception as e:
         st.error(f"Error: {str(e)}")
 
@@ -527,6 +550,16 @@ def show_doctor_dashboard():
                         st.error(f"❌ Verification failed: {response.json().get('detail')}")
                 except Exception as e:
                     st.error(f"❌ Connection error: {str(e)}")
+            
+            if st.form_submit_button("Resend OTP"):
+                try:
+                    response = requests.post(f"{API_BASE}/doctor/resend-otp", params={"email": verify_email})
+                    if response.status_code == 200:
+                        st.success("✅ A new OTP has been sent to your email.")
+                    else:
+                        st.error(f"❌ Resend failed: {response.json().get('detail')}")
+                except Exception as e:
+                    st.error(f"❌ Connection error: {str(e)}")
 
 def show_patient_dashboard():
     st.header("👤 Patient Dashboard")
@@ -597,6 +630,16 @@ def show_patient_dashboard():
                         st.error(f"❌ Verification failed: {response.json().get('detail')}")
                 except Exception as e:
                     st.error(f"❌ Connection error: {str(e)}")
+            
+            if st.form_submit_button("Resend OTP"):
+                try:
+                    response = requests.post(f"{API_BASE}/patient/resend-otp", params={"email": verify_email})
+                    if response.status_code == 200:
+                        st.success("✅ A new OTP has been sent to your email.")
+                    else:
+                        st.error(f"❌ Resend failed: {response.json().get('detail')}")
+                except Exception as e:
+                    st.error(f"❌ Connection error: {str(e)}")
 
 def show_audio_history():
     st.header("📋 Audio Analysis History")